@@ -0,0 +1,88 @@
+import os
+import threading
+import pygame
+
+from Setting.Configuration import IMG_DIR
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class AssetCache:
+    """
+    Reference-counted sprite store shared by every loaded room.
+
+    Each acquire() of a (sprite, scale) key bumps its count; release()
+    drops it, and the surface is freed as soon as no room holds it any
+    more, so memory tracks the set of rooms currently streamed in.
+    Safe to call from the world streaming thread and the main thread.
+    """
+    def __init__(self, image_dir=IMG_DIR):
+        self.image_dir = image_dir
+        self._surfaces = {}     # (sprite, scale) -> Surface or None
+        self._refcounts = {}    # (sprite, scale) -> int
+        self._lock = threading.Lock()
+
+    def acquire(self, sprite, scale=1.0):
+        """
+        Get a sprite and take a reference to it
+
+        Args:
+            sprite (str): Image file name inside image_dir
+            scale (float): Scale factor applied after loading
+
+        Returns:
+            pygame.Surface or None: The sprite, or None if it can't be loaded
+        """
+        key = (sprite, scale)
+        with self._lock:
+            if key in self._surfaces:
+                self._refcounts[key] += 1
+                return self._surfaces[key]
+
+        # Decode outside the lock so the main thread never waits on disk I/O
+        image = self._load(sprite, scale)
+
+        with self._lock:
+            if key in self._surfaces:
+                # Another thread loaded it meanwhile; keep theirs
+                image = self._surfaces[key]
+            else:
+                self._surfaces[key] = image
+                self._refcounts[key] = 0
+            self._refcounts[key] += 1
+            return image
+
+    def release(self, sprite, scale=1.0):
+        """Drop one reference; the surface is freed when none remain"""
+        key = (sprite, scale)
+        with self._lock:
+            count = self._refcounts.get(key)
+            if count is None:
+                return
+            if count <= 1:
+                del self._refcounts[key]
+                del self._surfaces[key]
+            else:
+                self._refcounts[key] = count - 1
+
+    def _load(self, sprite, scale):
+        """Load and scale a sprite from disk"""
+        try:
+            image = pygame.image.load(os.path.join(self.image_dir, sprite))
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            if scale != 1.0:
+                size = (round(image.get_width() * scale), round(image.get_height() * scale))
+                image = pygame.transform.scale(image, size)
+            return image
+        except (pygame.error, FileNotFoundError) as e:
+            logger.warning("Failed to load sprite %s: %s", sprite, e)
+            return None
+
+    def stats(self):
+        """Return (distinct surfaces, total references, approximate bytes)"""
+        with self._lock:
+            size = sum(s.get_width() * s.get_height() * s.get_bytesize()
+                       for s in self._surfaces.values() if s is not None)
+            return len(self._surfaces), sum(self._refcounts.values()), size
@@ -0,0 +1,344 @@
+import heapq
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from Setting.Configuration import PATHFINDING_WORKERS, PATH_CACHE_SIZE
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+# 4-neighbourhood used for flow fields (unit cost, exact BFS distances)
+CARDINALS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# 8-neighbourhood with octile costs used by A*
+NEIGHBOURS = ((1, 0, 1.0), (-1, 0, 1.0), (0, 1, 1.0), (0, -1, 1.0),
+              (1, 1, 1.414), (1, -1, 1.414), (-1, 1, 1.414), (-1, -1, 1.414))
+
+
+class FlowField:
+    """
+    Distance map toward a set of goal cells, shared by every NPC heading there.
+
+    distance[row, col] is the number of steps to the nearest goal
+    (UNREACHABLE for blocked or cut-off cells); directions[row, col] is the
+    unit (dx, dy) toward the best neighbour, so a whole crowd can steer with
+    one array lookup.
+    """
+    def __init__(self, key, goals, distance):
+        self.key = key
+        self.goals = goals
+        self.distance = distance
+        self.directions = np.zeros(distance.shape + (2,), dtype=np.float32)
+        self.update_directions()
+
+    def update_directions(self):
+        """Recompute the steering vectors from the distance map"""
+        rows, cols = self.distance.shape
+        padded = np.full((rows + 2, cols + 2), UNREACHABLE, dtype=np.int32)
+        padded[1:-1, 1:-1] = self.distance
+
+        best = self.distance.copy()
+        self.directions.fill(0)
+        for dx, dy in CARDINALS:
+            neighbour = padded[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx]
+            better = neighbour < best
+            best = np.where(better, neighbour, best)
+            self.directions[better] = (dx, dy)
+
+    def distance_at(self, col, row):
+        """Steps from a cell to the nearest goal, or UNREACHABLE"""
+        return int(self.distance[row, col])
+
+
+class Pathfinder:
+    """
+    Navigation over a room's collision grid.
+
+    - find_path / request_path: A* for one-off queries, cached per grid version.
+    - flow_field / request_flow_field: multi-source BFS distance maps toward
+      tagged points of interest (coffee_maker, water_cooler, desk, ...),
+      computed once and shared by every NPC going there.
+    - set_blocked: updates the grid and repairs cached flow fields locally
+      instead of recomputing them.
+
+    Requests run on a worker pool shared by all rooms; identical in-flight
+    requests are coalesced onto one Future.
+    """
+    executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, room):
+        """
+        Build navigation data for a room
+
+        Args:
+            room (RoomEnvironment): Room providing the collision grid and tagged props
+        """
+        self.tile_size = room.tile_size
+        self.grid = np.array([list(row) for row in room.collision_grid], dtype=bool)
+        self.rows, self.cols = self.grid.shape
+        self.version = 0
+        self.poi_cells = self._find_poi_cells(room)
+
+        self.fields = {}        # key -> FlowField
+        self.paths = {}         # (start, goal, version) -> path
+        self.inflight = {}      # request key -> Future
+        self.lock = threading.RLock()
+
+    @classmethod
+    def _get_executor(cls):
+        with cls._executor_lock:
+            if cls.executor is None:
+                cls.executor = ThreadPoolExecutor(max_workers=PATHFINDING_WORKERS,
+                                                  thread_name_prefix="pathfinding")
+            return cls.executor
+
+    def _find_poi_cells(self, room):
+        """Map each prop tag to the free cells bordering props with that tag"""
+        poi = {}
+        for prop in room.props:
+            tag = prop.get("tag")
+            if not tag:
+                continue
+            area = prop["hitbox"] or prop["rect"]
+            cells = poi.setdefault(tag, set())
+            for col, row in room._cells_overlapping(area):
+                for dx, dy in CARDINALS:
+                    c, r = col + dx, row + dy
+                    if 0 <= c < self.cols and 0 <= r < self.rows and not self.grid[r, c]:
+                        cells.add((c, r))
+        return {tag: sorted(cells) for tag, cells in poi.items() if cells}
+
+    def cell_at(self, x, y):
+        """Convert a pixel position to a (col, row) cell"""
+        return int(x // self.tile_size), int(y // self.tile_size)
+
+    def is_free(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows and not self.grid[row, col]
+
+    # ---- A* -------------------------------------------------------------
+
+    def find_path(self, start, goal):
+        """
+        A* between two cells (8-directional, no corner cutting)
+
+        Args:
+            start (tuple): (col, row)
+            goal (tuple): (col, row)
+
+        Returns:
+            list or None: Cells from start to goal inclusive, or None if unreachable
+        """
+        key = (start, goal, self.version)
+        if key in self.paths:
+            return self.paths[key]
+        if not self.is_free(*start) or not self.is_free(*goal):
+            return None
+
+        grid = self.grid
+        gx, gy = goal
+        open_heap = [(0.0, 0.0, start)]
+        came_from = {start: None}
+        cost = {start: 0.0}
+        path = None
+        while open_heap:
+            _, g, current = heapq.heappop(open_heap)
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = came_from[current]
+                path.reverse()
+                break
+            if g > cost[current]:
+                continue
+            cx, cy = current
+            for dx, dy, step in NEIGHBOURS:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < self.cols and 0 <= ny < self.rows) or grid[ny, nx]:
+                    continue
+                if dx and dy and (grid[cy, nx] or grid[ny, cx]):
+                    continue
+                new_cost = g + step
+                if new_cost < cost.get((nx, ny), float("inf")):
+                    cost[(nx, ny)] = new_cost
+                    came_from[(nx, ny)] = current
+                    ddx, ddy = abs(nx - gx), abs(ny - gy)
+                    heuristic = max(ddx, ddy) + 0.414 * min(ddx, ddy)
+                    heapq.heappush(open_heap, (new_cost + heuristic, new_cost, (nx, ny)))
+
+        with self.lock:
+            if len(self.paths) >= PATH_CACHE_SIZE:
+                self.paths.pop(next(iter(self.paths)))
+            self.paths[key] = path
+        return path
+
+    def request_path(self, start, goal):
+        """Run find_path on the worker pool; returns a Future"""
+        return self._submit(("path", start, goal, self.version), self.find_path, start, goal)
+
+    # ---- Flow fields ----------------------------------------------------
+
+    def flow_field(self, target):
+        """
+        Get (computing on first use) the flow field toward a point of interest
+
+        Args:
+            target (str or tuple): A prop tag such as "coffee_maker", or a (col, row) cell
+
+        Returns:
+            FlowField or None: None if the target has no reachable goal cells
+        """
+        with self.lock:
+            field = self.fields.get(target)
+        if field is not None:
+            return field
+
+        goals = self.poi_cells.get(target) if isinstance(target, str) else [target]
+        goals = [cell for cell in (goals or []) if self.is_free(*cell)]
+        if not goals:
+            return None
+
+        distance = np.full(self.grid.shape, UNREACHABLE, dtype=np.int32)
+        frontier = deque()
+        for col, row in goals:
+            distance[row, col] = 0
+            frontier.append((col, row))
+        self._propagate(distance, frontier)
+
+        field = FlowField(target, goals, distance)
+        with self.lock:
+            self.fields[target] = field
+        logger.debug("Computed flow field", extra={"fields": {"target": target, "goals": len(goals)}})
+        return field
+
+    def request_flow_field(self, target):
+        """Compute flow_field on the worker pool; concurrent callers share one Future"""
+        return self._submit(("field", target), self.flow_field, target)
+
+    def _propagate(self, distance, frontier):
+        """BFS relaxation from cells whose distance just decreased"""
+        grid = self.grid
+        while frontier:
+            col, row = frontier.popleft()
+            next_distance = distance[row, col] + 1
+            for dx, dy in CARDINALS:
+                c, r = col + dx, row + dy
+                if 0 <= c < self.cols and 0 <= r < self.rows and not grid[r, c] \
+                        and next_distance < distance[r, c]:
+                    distance[r, c] = next_distance
+                    frontier.append((c, r))
+
+    def set_blocked(self, cells, blocked=True):
+        """
+        Mark cells solid or free and repair cached flow fields incrementally
+
+        Args:
+            cells (iterable): (col, row) cells that changed
+            blocked (bool): New state for all of them
+        """
+        cells = [cell for cell in cells if 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows]
+        with self.lock:
+            for col, row in cells:
+                self.grid[row, col] = blocked
+            self.version += 1
+            self.paths.clear()
+            for key, field in list(self.fields.items()):
+                if blocked:
+                    self._repair_blocked(field, cells)
+                else:
+                    self._repair_unblocked(field, cells)
+                if not any(self.is_free(*goal) for goal in field.goals):
+                    del self.fields[key]
+                else:
+                    field.update_directions()
+
+    def _repair_blocked(self, field, cells):
+        """Invalidate only the cells whose shortest route went through a newly blocked cell"""
+        distance = field.distance
+        invalid = set()
+        queue = deque()
+        for col, row in cells:
+            if distance[row, col] != UNREACHABLE:
+                invalid.add((col, row))
+                queue.append((col, row, distance[row, col]))
+                distance[row, col] = UNREACHABLE
+
+        # Raise phase: cells that lost every supporting neighbour, in distance order
+        while queue:
+            col, row, old = queue.popleft()
+            for dx, dy in CARDINALS:
+                c, r = col + dx, row + dy
+                if not (0 <= c < self.cols and 0 <= r < self.rows) or (c, r) in invalid:
+                    continue
+                if distance[r, c] != old + 1:
+                    continue
+                supported = False
+                for sx, sy in CARDINALS:
+                    sc, sr = c + sx, r + sy
+                    if 0 <= sc < self.cols and 0 <= sr < self.rows and (sc, sr) not in invalid \
+                            and distance[sr, sc] == old:
+                        supported = True
+                        break
+                if not supported:
+                    invalid.add((c, r))
+                    queue.append((c, r, distance[r, c]))
+                    distance[r, c] = UNREACHABLE
+
+        # Lower phase: re-seed the invalidated region from its valid border
+        seeds = []
+        for col, row in invalid:
+            if self.grid[row, col]:
+                continue
+            best = UNREACHABLE
+            for dx, dy in CARDINALS:
+                c, r = col + dx, row + dy
+                if 0 <= c < self.cols and 0 <= r < self.rows and distance[r, c] != UNREACHABLE:
+                    best = min(best, distance[r, c] + 1)
+            if best != UNREACHABLE:
+                seeds.append((best, col, row))
+        seeds.sort()
+        frontier = deque()
+        for best, col, row in seeds:
+            if best < distance[row, col]:
+                distance[row, col] = best
+            frontier.append((col, row))
+        self._propagate(distance, frontier)
+
+    def _repair_unblocked(self, field, cells):
+        """Let distances flow through newly opened cells"""
+        distance = field.distance
+        frontier = deque()
+        for col, row in cells:
+            if (col, row) in field.goals:
+                distance[row, col] = 0
+            else:
+                best = UNREACHABLE
+                for dx, dy in CARDINALS:
+                    c, r = col + dx, row + dy
+                    if 0 <= c < self.cols and 0 <= r < self.rows and distance[r, c] != UNREACHABLE:
+                        best = min(best, distance[r, c] + 1)
+                distance[row, col] = best
+            if distance[row, col] != UNREACHABLE:
+                frontier.append((col, row))
+        self._propagate(distance, frontier)
+
+    # ---- Worker pool ----------------------------------------------------
+
+    def _submit(self, key, fn, *args):
+        """Submit work, coalescing identical in-flight requests"""
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                return future
+            future = self._get_executor().submit(fn, *args)
+            self.inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
@@ -0,0 +1,284 @@
+import json
+import os
+import pygame
+
+from Env.AssetCache import AssetCache
+from Setting.Configuration import (
+    MAP_DIR, DEFAULT_ROOM_MAP, CHUNK_TILES, CHUNK_PRELOAD_LIMIT,
+    FLOOR_COLOR, BLACK
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class RoomEnvironment:
+    """
+    Tile-map room loaded from a JSON map file.
+
+    Map format (see Assets/maps/office.json):
+        tile_size     - tile edge length in pixels
+        width, height - map size in tiles
+        tiles         - legend: one character -> {name, color, texture, solid}
+        layout        - list of strings, one character per tile
+        props         - object layer in pixels: {sprite, x, y, scale, solid, hitbox, tag}
+
+    At load the collision grid, the obstacle rects and a per-cell obstacle
+    index are computed once. Static layers (tiles + props) are rasterised
+    into CHUNK_TILES x CHUNK_TILES chunk surfaces, and draw_room only blits
+    the chunks that intersect the view.
+    """
+    def __init__(self, map_file=DEFAULT_ROOM_MAP, asset_cache=None):
+        """
+        Load a room map
+
+        Args:
+            map_file (str): Map file name inside MAP_DIR, or an absolute path
+            asset_cache (AssetCache): Optional sprite store shared between rooms
+        """
+        self.map_path = map_file if os.path.isabs(map_file) else os.path.join(MAP_DIR, map_file)
+        self.asset_cache = asset_cache if asset_cache is not None else AssetCache()
+        self.images = {}            # (sprite, scale) -> Surface held by this room
+
+        with open(self.map_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.name = data.get("name", os.path.splitext(os.path.basename(self.map_path))[0])
+        self.tile_size = data["tile_size"]
+        self.cols = data["width"]
+        self.rows = data["height"]
+        self.pixel_width = self.cols * self.tile_size
+        self.pixel_height = self.rows * self.tile_size
+        self.tile_types = data["tiles"]
+        self.layout = data["layout"]
+        self.props = [self._parse_prop(prop) for prop in data.get("props", [])]
+
+        # Chunk grid
+        self.chunk_size = CHUNK_TILES * self.tile_size
+        self.chunk_cols = -(-self.cols // CHUNK_TILES)
+        self.chunk_rows = -(-self.rows // CHUNK_TILES)
+        self.chunks = {}            # (cx, cy) -> pre-rendered Surface
+        self.chunk_props = {}       # (cx, cy) -> list of props overlapping the chunk
+        for prop in self.props:
+            for key in self._chunks_overlapping(prop["rect"]):
+                self.chunk_props.setdefault(key, []).append(prop)
+
+        # Collision data
+        self.collision_grid = [bytearray(self.cols) for _ in range(self.rows)]
+        self.obstacles = ()         # Cached tuple of obstacle rects
+        self.cell_obstacles = {}    # (col, row) -> tuple of obstacle rects touching that cell
+        self._build_collision()
+
+        if self.chunk_cols * self.chunk_rows <= CHUNK_PRELOAD_LIMIT:
+            self.prerender_chunks()
+
+        logger.info("Loaded room map", extra={"fields": {
+            "map": self.name, "tiles": (self.cols, self.rows),
+            "props": len(self.props), "obstacles": len(self.obstacles)}})
+
+    def _parse_prop(self, prop):
+        """Resolve a prop entry into its sprite size, draw rect and hitbox"""
+        image = self.get_image(prop["sprite"], prop.get("scale", 1.0))
+        width, height = image.get_size() if image else (self.tile_size, self.tile_size)
+        rect = pygame.Rect(prop["x"], prop["y"], width, height)
+
+        hitbox = None
+        if prop.get("solid", True):
+            if "hitbox" in prop:
+                hx, hy, hw, hh = prop["hitbox"]
+                hitbox = pygame.Rect(rect.x + hx, rect.y + hy, hw, hh)
+            else:
+                hitbox = rect.copy()
+
+        return {
+            "sprite": prop["sprite"],
+            "scale": prop.get("scale", 1.0),
+            "tag": prop.get("tag"),
+            "rect": rect,
+            "hitbox": hitbox,
+        }
+
+    def get_image(self, sprite, scale=1.0):
+        """
+        Get a sprite, taking one reference in the asset cache per room
+
+        Args:
+            sprite (str): Image file name
+            scale (float): Scale factor applied after loading
+
+        Returns:
+            pygame.Surface or None: The sprite, or None if it can't be loaded
+        """
+        key = (sprite, scale)
+        if key not in self.images:
+            self.images[key] = self.asset_cache.acquire(sprite, scale)
+        return self.images[key]
+
+    def unload(self):
+        """Drop pre-rendered chunks and release every sprite this room holds"""
+        self.chunks.clear()
+        for sprite, scale in self.images:
+            self.asset_cache.release(sprite, scale)
+        self.images.clear()
+
+    def _build_collision(self):
+        """Compute the collision grid, merged obstacle rects and per-cell index"""
+        ts = self.tile_size
+        obstacles = []
+
+        # Solid tiles: merge horizontal runs into one rect each
+        for row, line in enumerate(self.layout):
+            col = 0
+            while col < self.cols:
+                tile = self.tile_types.get(line[col], {})
+                if not tile.get("solid", False):
+                    col += 1
+                    continue
+                start = col
+                while col < self.cols and self.tile_types.get(line[col], {}).get("solid", False):
+                    self.collision_grid[row][col] = 1
+                    col += 1
+                obstacles.append(pygame.Rect(start * ts, row * ts, (col - start) * ts, ts))
+
+        # Solid props: exact hitboxes, and every cell they touch is blocked
+        for prop in self.props:
+            hitbox = prop["hitbox"]
+            if hitbox is None:
+                continue
+            obstacles.append(hitbox)
+            for col, row in self._cells_overlapping(hitbox):
+                self.collision_grid[row][col] = 1
+
+        self.obstacles = tuple(obstacles)
+
+        cell_obstacles = {}
+        for rect in self.obstacles:
+            for cell in self._cells_overlapping(rect):
+                cell_obstacles.setdefault(cell, []).append(rect)
+        self.cell_obstacles = {cell: tuple(rects) for cell, rects in cell_obstacles.items()}
+
+    def _cells_overlapping(self, rect):
+        """Yield (col, row) for every tile cell a rect overlaps"""
+        ts = self.tile_size
+        first_col = max(0, rect.left // ts)
+        last_col = min(self.cols - 1, (rect.right - 1) // ts)
+        first_row = max(0, rect.top // ts)
+        last_row = min(self.rows - 1, (rect.bottom - 1) // ts)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                yield col, row
+
+    def _chunks_overlapping(self, rect):
+        """Yield (cx, cy) for every chunk a rect overlaps"""
+        cs = self.chunk_size
+        first_cx = max(0, rect.left // cs)
+        last_cx = min(self.chunk_cols - 1, (rect.right - 1) // cs)
+        first_cy = max(0, rect.top // cs)
+        last_cy = min(self.chunk_rows - 1, (rect.bottom - 1) // cs)
+        for cy in range(first_cy, last_cy + 1):
+            for cx in range(first_cx, last_cx + 1):
+                yield cx, cy
+
+    def is_blocked(self, col, row):
+        """Return True if the tile cell is solid or outside the map"""
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return bool(self.collision_grid[row][col])
+        return True
+
+    def get_obstacles(self, area=None):
+        """
+        Get obstacle rects for collision checks
+
+        Args:
+            area (pygame.Rect): Optional region of interest; only obstacles
+                touching cells under it are returned
+
+        Returns:
+            tuple: Cached obstacle rects (do not mutate)
+        """
+        if area is None:
+            return self.obstacles
+
+        found = []
+        for cell in self._cells_overlapping(area):
+            for rect in self.cell_obstacles.get(cell, ()):
+                if rect not in found:
+                    found.append(rect)
+        return found
+
+    def prerender_chunks(self):
+        """Rasterise every chunk up front"""
+        for cy in range(self.chunk_rows):
+            for cx in range(self.chunk_cols):
+                self._get_chunk(cx, cy)
+
+    def _get_chunk(self, cx, cy):
+        """Return the static surface for a chunk, rendering it on first use"""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk
+
+        ts = self.tile_size
+        cs = self.chunk_size
+        origin_x, origin_y = cx * cs, cy * cs
+        chunk = pygame.Surface((cs, cs))
+        chunk.fill(FLOOR_COLOR)
+
+        # Tile layer; textured tiles sample a world-aligned pattern so
+        # textures stay seamless across tile and chunk boundaries
+        patterns = {}
+        first_col, first_row = cx * CHUNK_TILES, cy * CHUNK_TILES
+        for row in range(first_row, min(first_row + CHUNK_TILES, self.rows)):
+            line = self.layout[row]
+            for col in range(first_col, min(first_col + CHUNK_TILES, self.cols)):
+                tile = self.tile_types.get(line[col], {})
+                dest = (col * ts - origin_x, row * ts - origin_y)
+                texture_name = tile.get("texture")
+                texture = self.get_image(texture_name) if texture_name else None
+                if texture is not None:
+                    pattern = patterns.get(texture_name)
+                    if pattern is None:
+                        pattern = self._build_pattern(texture, origin_x, origin_y)
+                        patterns[texture_name] = pattern
+                    chunk.blit(pattern, dest, pygame.Rect(dest, (ts, ts)))
+                else:
+                    chunk.fill(tile.get("color", FLOOR_COLOR), pygame.Rect(dest, (ts, ts)))
+
+        # Prop layer (already clipped to the chunk by the surface bounds)
+        for prop in sorted(self.chunk_props.get((cx, cy), ()), key=lambda p: p["rect"].bottom):
+            image = self.get_image(prop["sprite"], prop["scale"])
+            if image is not None:
+                chunk.blit(image, (prop["rect"].x - origin_x, prop["rect"].y - origin_y))
+
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert()
+        self.chunks[(cx, cy)] = chunk
+        return chunk
+
+    def _build_pattern(self, texture, origin_x, origin_y):
+        """Tile a texture over a chunk-sized surface aligned to world coordinates"""
+        cs = self.chunk_size
+        tw, th = texture.get_size()
+        pattern = pygame.Surface((cs, cs))
+        start_x = -(origin_x % tw)
+        start_y = -(origin_y % th)
+        for y in range(start_y, cs, th):
+            for x in range(start_x, cs, tw):
+                pattern.blit(texture, (x, y))
+        return pattern
+
+    def draw_room(self, screen, camera=(0, 0)):
+        """
+        Draw the visible part of the room
+
+        Args:
+            screen: Pygame surface to draw on
+            camera (tuple): World position of the screen's top-left corner
+        """
+        cam_x, cam_y = camera
+        view = pygame.Rect(cam_x, cam_y, screen.get_width(), screen.get_height())
+        if not pygame.Rect(0, 0, self.pixel_width, self.pixel_height).contains(view):
+            screen.fill(BLACK)
+        for cx, cy in self._chunks_overlapping(view):
+            screen.blit(self._get_chunk(cx, cy),
+                        (cx * self.chunk_size - cam_x, cy * self.chunk_size - cam_y))
@@ -0,0 +1,235 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+from Env.AssetCache import AssetCache
+from Env.Pathfinder import Pathfinder
+from Env.RoomEnvironment import RoomEnvironment
+from Player.AnimationSheet import AnimationSheet
+from Player.NPCPopulation import NPCPopulation
+from Setting.Configuration import MAP_DIR, WORLD_FILE, WORLD_PRELOAD_DEPTH, NPC_SPRITE_OFFSET
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class LoadedRoom:
+    """A streamed-in room: geometry, NPC population and exits"""
+    def __init__(self, room_id, environment, pathfinder, population, npcs, exits, crowd_sheets):
+        self.room_id = room_id
+        self.environment = environment
+        self.pathfinder = pathfinder
+        self.population = population
+        self.npcs = npcs                    # Views of the named story NPCs
+        self.exits = exits                  # list of (trigger Rect, target room id, spawn (x, y))
+        self.crowd_sheets = crowd_sheets    # AnimationSheets holding the crowd's images
+
+    def unload(self):
+        """Release the room's sprites and chunk surfaces"""
+        self.environment.unload()
+        for sheet in self.crowd_sheets:
+            sheet.release()
+        self.population.set_sheets([])
+
+
+class WorldManager:
+    """
+    Building of rooms connected by exits, streamed around the player.
+
+    The world file (Assets/maps/world.json) lists rooms with their map,
+    named NPCs, ambient crowd and exits. The current room and every room within
+    WORLD_PRELOAD_DEPTH exits of it are kept loaded; others are unloaded
+    and their sprites released from the shared AssetCache. Loading runs on
+    a single background thread. Walking into an exit only switches rooms
+    once the target has finished loading, so the frame never waits on I/O.
+    """
+    def __init__(self, world_file=WORLD_FILE, preload_depth=WORLD_PRELOAD_DEPTH):
+        """
+        Load the world definition and the start room
+
+        Args:
+            world_file (str): World file name inside MAP_DIR, or an absolute path
+            preload_depth (int): How many exits away rooms stay preloaded
+        """
+        path = world_file if os.path.isabs(world_file) else os.path.join(MAP_DIR, world_file)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.definitions = data["rooms"]
+        self.preload_depth = preload_depth
+        self.asset_cache = AssetCache()
+
+        self.rooms = {}                 # room id -> LoadedRoom
+        self.pending = {}               # room id -> Future[LoadedRoom]
+        self.pending_transition = None  # (room id, spawn) waiting for its room to load
+        self.restores = {}              # room id -> callable(LoadedRoom) from a loaded save, run once the room is in
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="world-stream")
+
+        # The start room is loaded synchronously; there is nothing to show without it
+        self.current_id = data["start"]
+        self.spawn = tuple(data.get("spawn", (0, 0)))
+        self.rooms[self.current_id] = self._load_room(self.current_id)
+        self._stream_neighbours()
+
+    @property
+    def current_room(self):
+        """The LoadedRoom the player is in"""
+        return self.rooms[self.current_id]
+
+    def _load_room(self, room_id):
+        """Build a LoadedRoom (runs on the streaming thread except for the start room)"""
+        definition = self.definitions[room_id]
+        environment = RoomEnvironment(definition["map"], self.asset_cache)
+        pathfinder = Pathfinder(environment)
+
+        margin = environment.tile_size
+        population = NPCPopulation(
+            collision_grid=environment.collision_grid,
+            tile_size=environment.tile_size,
+            bounds=(margin, margin, environment.pixel_width - margin, environment.pixel_height - margin),
+            pathfinder=pathfinder,
+        )
+        npcs = [
+            population.view(population.add(
+                npc["x"], npc["y"], npc["name"], npc.get("type", "animal"), npc.get("personality", "friendly")))
+            for npc in definition.get("npcs", [])
+        ]
+
+        crowd = definition.get("crowd", {})
+        crowd_sheets = self._load_sheets(crowd)
+        population.set_sheets(crowd_sheets)
+        if crowd_sheets:
+            population.spawn_crowd(crowd.get("count", 0), list(range(len(crowd_sheets))))
+
+        exits = [
+            (pygame.Rect(exit_["rect"]), exit_["to"], tuple(exit_["spawn"]))
+            for exit_ in definition.get("exits", [])
+        ]
+        return LoadedRoom(room_id, environment, pathfinder, population, npcs, exits, crowd_sheets)
+
+    def _load_sheets(self, crowd):
+        """Animation sheets for a crowd: "animations" files plus still "sprites" (missing ones are skipped)"""
+        sheets = []
+        for sprite in crowd.get("sprites", []):
+            try:
+                sheets.append(AnimationSheet.still(sprite, self.asset_cache, NPC_SPRITE_OFFSET))
+            except ValueError as e:
+                logger.warning("Skipping crowd sprite %s: %s", sprite, e)
+        for file_name in crowd.get("animations", []):
+            try:
+                sheets.append(AnimationSheet.load(file_name, self.asset_cache))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping crowd animation %s: %s", file_name, e)
+        return sheets
+
+    def _neighbourhood(self, room_id):
+        """Room ids within preload_depth exits of room_id (inclusive)"""
+        found = {room_id: 0}
+        frontier = deque([room_id])
+        while frontier:
+            current = frontier.popleft()
+            depth = found[current]
+            if depth >= self.preload_depth:
+                continue
+            for exit_ in self.definitions[current].get("exits", []):
+                target = exit_["to"]
+                if target not in found and target in self.definitions:
+                    found[target] = depth + 1
+                    frontier.append(target)
+        return set(found)
+
+    def _request(self, room_id):
+        """Queue a room for background loading if it isn't loaded or loading"""
+        if room_id not in self.rooms and room_id not in self.pending:
+            self.pending[room_id] = self.executor.submit(self._load_room, room_id)
+
+    def _collect(self):
+        """Move finished background loads into the loaded set"""
+        for room_id, future in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[room_id]
+            try:
+                room = future.result()
+            except Exception as e:
+                logger.error("Failed to load room %s: %s", room_id, e)
+                if self.pending_transition and self.pending_transition[0] == room_id:
+                    self.pending_transition = None
+                continue
+            self.rooms[room_id] = room
+            self._restore(room_id)
+            logger.debug("Room streamed in", extra={"fields": {"room": room_id}})
+
+    def _restore(self, room_id):
+        restore = self.restores.pop(room_id, None)
+        if restore is not None:
+            restore(self.rooms[room_id])
+
+    def _stream_neighbours(self):
+        """Preload rooms around the current one and unload everything else"""
+        wanted = self._neighbourhood(self.current_id)
+        if self.pending_transition:
+            wanted.add(self.pending_transition[0])
+        for room_id in wanted:
+            self._request(room_id)
+        for room_id in list(self.rooms):
+            if room_id not in wanted:
+                self.rooms.pop(room_id).unload()
+                self.restores.pop(room_id, None)
+                logger.debug("Room streamed out", extra={"fields": {"room": room_id}})
+
+    def update(self, player_rect):
+        """
+        Advance streaming and handle exits; call once per frame
+
+        Args:
+            player_rect (pygame.Rect): Player collision rect in room coordinates
+
+        Returns:
+            bool: True if the player moved to another room this frame
+                  (see current_room and spawn)
+        """
+        self._collect()
+
+        if self.pending_transition is None:
+            for trigger, target, spawn in self.current_room.exits:
+                if player_rect.colliderect(trigger) and target in self.definitions:
+                    self.pending_transition = (target, spawn)
+                    self._request(target)
+                    break
+
+        if self.pending_transition and self.pending_transition[0] in self.rooms:
+            self.current_id, self.spawn = self.pending_transition
+            self.pending_transition = None
+            self._stream_neighbours()
+            logger.info("Entered room %s", self.current_id)
+            return True
+        return False
+
+    def jump_to(self, room_id, restores=None):
+        """
+        Make a room current at once, loading it on this thread if needed (restoring a save)
+
+        Args:
+            room_id (str): Room to enter; its spawn is left unchanged
+            restores (dict): Room id -> callable(LoadedRoom), applied to rooms already
+                             loaded now and to the others when they stream in
+        """
+        if room_id not in self.definitions:
+            raise KeyError(f"Unknown room {room_id}")
+        self.restores = dict(restores or {})
+        self.pending_transition = None
+        if room_id not in self.rooms:
+            future = self.pending.pop(room_id, None)
+            self.rooms[room_id] = future.result() if future is not None else self._load_room(room_id)
+        self.current_id = room_id
+        self._stream_neighbours()
+        for loaded_id in list(self.rooms):
+            self._restore(loaded_id)
+        logger.info("Jumped to room %s", room_id)
+
+    def shutdown(self):
+        """Stop the streaming thread"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,117 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Init.WorldSnapshot import WorldSnapshot
+from Setting.Configuration import (SAVE_DIR, AUTOSAVE_FILE, AUTOSAVE_INTERVAL, AUTOSAVE_FULL_EVERY,
+                                   AUTOSAVE_BUDGET_MS)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class Autosave:
+    """
+    Periodic saves of the running game that never hold up a frame.
+
+    Every AUTOSAVE_INTERVAL seconds the world is captured on the main thread
+    (byte copies of the state, timed against AUTOSAVE_BUDGET_MS) and handed
+    to a single writer thread, which diffs, compresses and writes it. Every
+    AUTOSAVE_FULL_EVERY-th save is a full snapshot; the ones in between are
+    deltas against it. An autosave is skipped while the previous one is
+    still being written, so a slow disk delays saves, not frames.
+    Quicksaves (save_to) go through the same writer thread.
+    """
+    def __init__(self, path=None, interval=AUTOSAVE_INTERVAL, full_every=AUTOSAVE_FULL_EVERY):
+        """
+        Args:
+            path (str): Full snapshot file (deltas go to <path>.delta); defaults to AUTOSAVE_FILE in SAVE_DIR
+            interval (float): Seconds between autosaves
+            full_every (int): Saves per full snapshot
+        """
+        self.path = path or os.path.join(SAVE_DIR, AUTOSAVE_FILE)
+        self.interval = interval
+        self.full_every = max(1, full_every)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self.future = None
+        self.base = None            # Last full snapshot written (writer thread only)
+        self.saves = 0
+        self.chunk_cache = {}       # Encoded transcript chunks (see WorldSnapshot.capture)
+        self.next_time = time.monotonic() + interval
+
+    def update(self, game):
+        """Autosave if it is time and the previous save has been written (call once per frame)"""
+        now = time.monotonic()
+        if now < self.next_time or (self.future is not None and not self.future.done()):
+            return
+        self.next_time = now + self.interval
+        self.save(game)
+
+    def save(self, game, full=False):
+        """
+        Capture the game now and write it in the background
+
+        Args:
+            game (Game): Loaded game
+            full (bool): Write a full snapshot even if a delta is due
+
+        Returns:
+            Future: Resolves to the number of bytes written
+        """
+        start = time.perf_counter()
+        snapshot = WorldSnapshot.capture(game, self.saves + 1, self.chunk_cache)
+        capture_ms = (time.perf_counter() - start) * 1000
+        if capture_ms > AUTOSAVE_BUDGET_MS:
+            logger.warning("Slow autosave capture", extra={"fields": {
+                "capture_ms": round(capture_ms, 2), "budget_ms": AUTOSAVE_BUDGET_MS}})
+        full = full or self.saves % self.full_every == 0
+        self.saves += 1
+        self.future = self.executor.submit(self._write, snapshot, full, capture_ms)
+        return self.future
+
+    def _write(self, snapshot, full, capture_ms):
+        """Writer thread: encode and write one save"""
+        start = time.perf_counter()
+        try:
+            if full or self.base is None:
+                # Deltas written against the previous full save (or by an earlier run) no longer apply
+                if os.path.exists(self.path + ".delta"):
+                    os.remove(self.path + ".delta")
+                size = snapshot.write(self.path)
+                self.base = snapshot
+            else:
+                size = snapshot.write(self.path + ".delta", self.base)
+        except OSError as e:
+            logger.error("Autosave failed: %s", e)
+            return 0
+        logger.debug("Autosaved", extra={"fields": {
+            "sequence": snapshot.sequence, "full": snapshot is self.base, "bytes": size,
+            "capture_ms": round(capture_ms, 2), "write_ms": round((time.perf_counter() - start) * 1000, 2)}})
+        return size
+
+    def save_to(self, game, path):
+        """
+        Capture the game now and write a full snapshot to another file in the background (quicksave)
+
+        Returns:
+            Future: Resolves to the number of bytes written (0 if the write failed, which is logged)
+        """
+        snapshot = WorldSnapshot.capture(game, self.saves + 1, self.chunk_cache)
+        return self.executor.submit(self._write_to, snapshot, path)
+
+    @staticmethod
+    def _write_to(snapshot, path):
+        """Writer thread: write one quicksave"""
+        try:
+            size = snapshot.write(path)
+        except OSError as e:
+            logger.error("Could not save %s: %s", path, e)
+            return 0
+        logger.info("Game saved", extra={"fields": {"path": path, "bytes": size}})
+        return size
+
+    def close(self, game=None):
+        """Write a last full save of game (if given) and wait for pending writes"""
+        if game is not None:
+            self.save(game, full=True)
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,290 @@
+import hashlib
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from LLM.BackendPool import BackendPool
+from LLM.PregenDialogue import PregenDialogue, RECORD_SEPARATOR
+from LLM.PromptBuilder import PromptBuilder
+from Player.NPC import NPC
+from Setting.Configuration import (
+    MAP_DIR, WORLD_FILE, OLLAMA_MODEL, SCHEDULER_RESERVED_INTERACTIVE, PREGEN_DIALOGUE_FILE,
+    PREGEN_CONCURRENCY, PREGEN_RETRIES, PREGEN_RETRY_DELAY, PREGEN_SLOWDOWN
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Job:
+    """One reply variant to generate"""
+    def __init__(self, npc, message, history, variant):
+        self.npc = npc
+        self.message = message
+        self.variant = variant
+        self.key = PregenDialogue.key(npc.name, message)
+        self.system_prompt = npc.get_personality_prompt()
+        self.prompt = PromptBuilder.build(history, npc.name, message)
+        # Identifies the exact request, so edited personalities or histories are generated again
+        self.digest = hashlib.sha1(f"{self.system_prompt}\0{self.prompt}".encode("utf-8")).hexdigest()
+        self.attempts = 0
+
+
+class _Collector:
+    """Response queue for one attempt: keeps the outcome and the time to the first chunk"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_chunk = None
+        self.outcome = None
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        with self.lock:
+            if item[0] == 'chunk':
+                if self.first_chunk is None and item[1]:
+                    self.first_chunk = time.perf_counter()
+            else:
+                self.outcome = item
+
+    @property
+    def ttft(self):
+        return self.first_chunk - self.started if self.first_chunk is not None else None
+
+
+class DialoguePregen:
+    """
+    Batch generation of NPC replies for scripted events and kiosk demos.
+
+    The corpus lists player messages (optionally per NPC, with a preceding
+    conversation and a number of variants); NPCs are the ones in the world
+    file plus any the corpus defines, and every reply is generated with
+    the same personality prompt and PromptBuilder prompt the game uses.
+
+    Jobs run at SUMMARY priority on a BackendPool. The number in flight
+    follows an AIMD window: it grows by one per window of good replies and
+    halves when the time to first token rises above PREGEN_SLOWDOWN times
+    the best seen, which is when OLLAMA starts queueing requests - ours or
+    a game's. The batch so keeps the backend busy while an interactive
+    request waits for at most about one reply. Failed attempts are retried
+    with exponential backoff.
+
+    Every finished reply is appended to a checkpoint next to the output,
+    so an interrupted run continues where it stopped. Think traces are
+    removed; action tags are kept for the game to act on. The result is
+    written as a PregenDialogue file, which the game answers from without
+    calling the backend.
+    """
+    def __init__(self, corpus_file, output_file=None, concurrency=PREGEN_CONCURRENCY, model_name=OLLAMA_MODEL,
+                 record_file=None, replay_file=None, replay_speed=1.0):
+        """
+        Args:
+            corpus_file (str): JSON corpus, or JSONL with one prompt entry per line
+            output_file (str): Dialogue file to write (default: PREGEN_DIALOGUE_FILE)
+            concurrency (int): Most generations in flight
+            model_name (str): Model to generate with
+            record_file, replay_file, replay_speed: Passed to BackendPool
+        """
+        self.corpus_file = corpus_file
+        self.output_file = output_file or PREGEN_DIALOGUE_FILE
+        self.checkpoint_file = self.output_file + ".checkpoint.jsonl"
+        self.concurrency = max(1, concurrency)
+        self.model_name = model_name
+        self.trace_options = {"record_file": record_file, "replay_file": replay_file, "replay_speed": replay_speed}
+        self.window = 1.0
+        self.best_ttft = None
+        self.checkpoint_cut = False  # the checkpoint's last line was cut short
+
+    # Corpus
+
+    def _read_corpus(self):
+        with open(self.corpus_file, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            corpus = json.loads(text)
+        except ValueError:
+            corpus = {"prompts": [json.loads(line) for line in text.splitlines() if line.strip()]}
+        if isinstance(corpus, list):
+            corpus = {"prompts": corpus}
+        return corpus
+
+    @staticmethod
+    def _world_npcs():
+        """Definitions of every named NPC in the world file (the NPCs Game.create_npcs serves)"""
+        path = WORLD_FILE if os.path.isabs(WORLD_FILE) else os.path.join(MAP_DIR, WORLD_FILE)
+        with open(path, "r", encoding="utf-8") as f:
+            rooms = json.load(f)["rooms"]
+        return [npc for room in rooms.values() for npc in room.get("npcs", [])]
+
+    def build_jobs(self):
+        """
+        Expand the corpus into one job per NPC, message and variant
+
+        Corpus format:
+            {"npcs": [{"name", "type", "personality"}, ...],      (optional, added to the world's NPCs)
+             "variants": 1,                                       (optional default)
+             "prompts": ["message", {"message", "npc": name | [names], "history": [...], "variants"}, ...]}
+
+        Returns:
+            list: _Job per reply to generate
+        """
+        corpus = self._read_corpus()
+        npcs = {}
+        for definition in self._world_npcs() + corpus.get("npcs", []):
+            npcs[definition["name"]] = NPC(0, 0, definition["name"], definition.get("type", "animal"),
+                                           definition.get("personality", "friendly"))
+        default_variants = corpus.get("variants", 1)
+
+        jobs = {}
+        for entry in corpus.get("prompts", []):
+            if isinstance(entry, str):
+                entry = {"message": entry}
+            names = entry.get("npc") or list(npcs)
+            for name in [names] if isinstance(names, str) else names:
+                npc = npcs.get(name)
+                if npc is None:
+                    logger.warning("Unknown NPC in corpus: %s", name)
+                    continue
+                # Without a history the prompt is the one for a first message after the greeting
+                history = entry.get("history") or [f"Hello! I'm {npc.name}. How can I help you?"]
+                for variant in range(entry.get("variants", default_variants)):
+                    job = _Job(npc, entry["message"], history, variant)
+                    jobs[(job.key, variant)] = job
+        return list(jobs.values())
+
+    # Checkpoint
+
+    def _load_checkpoint(self):
+        """(digest, variant) -> reply of every reply finished by earlier runs"""
+        finished = {}
+        self.checkpoint_cut = False
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.checkpoint_cut = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    finished[(record["digest"], record["variant"])] = record["reply"]
+        except FileNotFoundError:
+            pass
+        return finished
+
+    # Generation
+
+    @staticmethod
+    def _reply(collector):
+        """The cleaned reply of a finished attempt, or None if it has to be retried"""
+        if collector.outcome is None or collector.outcome[0] != 'done':
+            return None
+        raw = collector.outcome[1]
+        if "<think>" in raw and "</think>" not in raw:
+            return None  # cut off while thinking
+        reply = PromptBuilder.remove_think_tags(raw).replace(RECORD_SEPARATOR, "").strip()
+        return reply or None
+
+    def _adjust_window(self, ttft):
+        """AIMD on the time to first token (None for a failed attempt)"""
+        if ttft is not None and (self.best_ttft is None or ttft < self.best_ttft):
+            self.best_ttft = ttft
+        if ttft is None or ttft > self.best_ttft * PREGEN_SLOWDOWN:
+            self.window = max(1.0, self.window / 2)
+        else:
+            self.window = min(float(self.concurrency), self.window + 1 / self.window)
+
+    def run(self):
+        """
+        Generate everything not in the checkpoint yet and write the dialogue file
+
+        Returns:
+            dict: Run report
+        """
+        started = time.perf_counter()
+        jobs = self.build_jobs()
+        finished = self._load_checkpoint()
+        pending = deque(job for job in jobs if (job.digest, job.variant) not in finished)
+        resumed = len(jobs) - len(pending)
+        logger.info("Pre-generating dialogue", extra={"fields": {
+            "replies": len(jobs), "resumed": resumed, "output": self.output_file}})
+
+        # Every job is background work, so the slots reserved for interactive replies come on top
+        pool = BackendPool(self.model_name, self.concurrency + SCHEDULER_RESERVED_INTERACTIVE,
+                           **self.trace_options)
+        retries = []      # heap of (time, sequence, job)
+        in_flight = {}    # Future -> (job, collector)
+        generated = failed = sequence = 0
+        directory = os.path.dirname(self.checkpoint_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.checkpoint_file, "a", encoding="utf-8") as checkpoint:
+                if self.checkpoint_cut:
+                    checkpoint.write("\n")
+                while pending or retries or in_flight:
+                    now = time.monotonic()
+                    while retries and retries[0][0] <= now:
+                        pending.appendleft(heapq.heappop(retries)[2])
+                    while pending and len(in_flight) < int(self.window):
+                        job = pending.popleft()
+                        collector = _Collector()
+                        future = pool.generate(job.prompt, job.system_prompt, collector, priority=pool.SUMMARY)
+                        in_flight[future] = (job, collector)
+                    if not in_flight:
+                        time.sleep(max(0.0, retries[0][0] - now))
+                        continue
+
+                    timeout = max(0.0, retries[0][0] - now) if retries else None
+                    done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job, collector = in_flight.pop(future)
+                        reply = self._reply(collector)
+                        self._adjust_window(collector.ttft if reply is not None else None)
+                        if reply is not None:
+                            finished[(job.digest, job.variant)] = reply
+                            checkpoint.write(json.dumps({
+                                "digest": job.digest, "variant": job.variant, "npc": job.npc.name,
+                                "message": job.message, "reply": reply}, ensure_ascii=False) + "\n")
+                            checkpoint.flush()
+                            generated += 1
+                            continue
+                        job.attempts += 1
+                        error = collector.outcome[1] if collector.outcome else "no reply"
+                        if job.attempts > PREGEN_RETRIES:
+                            failed += 1
+                            logger.warning("Giving up on prompt", extra={"fields": {
+                                "npc": job.npc.name, "message": job.message, "error": error}})
+                            continue
+                        delay = PREGEN_RETRY_DELAY * 2 ** (job.attempts - 1)
+                        logger.info("Retrying prompt", extra={"fields": {
+                            "npc": job.npc.name, "attempt": job.attempts, "delay_s": delay, "error": error}})
+                        sequence += 1
+                        heapq.heappush(retries, (time.monotonic() + delay, sequence, job))
+        finally:
+            pool.shutdown()
+
+        replies = {}
+        for job in sorted(jobs, key=lambda job: job.variant):
+            reply = finished.get((job.digest, job.variant))
+            if reply is not None:
+                replies.setdefault(job.key, []).append(reply)
+        PregenDialogue.write(self.output_file, replies)
+
+        seconds = time.perf_counter() - started
+        report = {
+            "output": self.output_file,
+            "keys": len(replies),
+            "replies": sum(len(variants) for variants in replies.values()),
+            "generated": generated,
+            "resumed": resumed,
+            "failed": failed,
+            "bytes": os.path.getsize(self.output_file),
+            "seconds": round(seconds, 1),
+            "replies_per_minute": round(generated / seconds * 60, 1) if seconds else 0.0,
+            "best_ttft_ms": round(self.best_ttft * 1000, 1) if self.best_ttft is not None else None,
+        }
+        logger.info("Dialogue file written", extra={"fields": report})
+        return report
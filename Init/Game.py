@@ -1,102 +1,207 @@
 import pygame
+import os
 import sys
 import math
 import time
-import requests
 
 from Setting.Configuration import (
     SCREEN_WIDTH, SCREEN_HEIGHT, FPS, OLLAMA_MODEL,
-    SKY_BLUE, WHITE, YELLOW, WALL_COLOR, FLOOR_COLOR, PLAYER_BLUE, BLACK
+    SKY_BLUE, WHITE, YELLOW, WALL_COLOR, FLOOR_COLOR, PLAYER_BLUE, BLACK, GRAY, GREEN, RED,
+    RESPONSE_CACHE_ENABLED, LOCAL_BACKEND_CONCURRENCY, LLM_WORKER_ENABLED,
+    AMBIENT_ENABLED, AMBIENT_BUBBLE_RADIUS, AMBIENT_BUBBLE_SECONDS, AMBIENT_BUBBLE_COOLDOWN,
+    AUTOSAVE_ENABLED, SAVE_DIR, QUICKSAVE_FILE
 )
-from LLM.OllamaAPI import OllamaAPI
+from Init.Profiler import Profiler
+from Init.Startup import StartupLoader
+from LLM.BackendMonitor import BackendMonitor
 from Player.Player import Player
-from Player.NPC import NPC
-from Setting.ChineseFontManager import ChineseFontManager
-from Setting.EnglishFontManager import EnglishFontManager
-from Env.RoomEnvironment import RoomEnvironment
+from Setting.MixedFontManager import MixedFontManager
 from Setting.DialogueSystem import DialogueSystem
+from Setting.Framebuffer import Framebuffer
+from Setting.LogManager import LogManager, get_logger
+
+logger = get_logger(__name__)
 
 
 class Game:
     """Main game class"""
-    def __init__(self):
-        # Initialize display
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("LLM RPG Game - AI Dialogue Edition")
+    def __init__(self, launch_time=None, server_address=None, record_file=None, replay_file=None, replay_speed=1.0,
+                 llm_worker=LLM_WORKER_ENABLED, load_file=None):
+        """
+        Open the window and start loading in the background.
+        Fonts, world, sprites and the LLM client load in parallel while
+        the main loop shows a loading screen; see finish_loading.
+
+        Args:
+            launch_time (float): time.perf_counter() at process start, for the startup metric
+            server_address (tuple): (host, port) of a dialogue server; None talks to OLLAMA directly
+            record_file (str): Record every LLM generation to this trace file
+            replay_file (str): Replay LLM generations from this trace instead of calling OLLAMA
+            replay_speed (float): Multiplier for recorded chunk timings when replaying
+            llm_worker (bool): Run the LLM client in a separate process (LLMWorker)
+            load_file (str): World snapshot to restore once loading has finished
+        """
+        # Initialize display: the world is drawn at SCREEN_WIDTH x SCREEN_HEIGHT and scaled to the window
+        self.framebuffer = Framebuffer((SCREEN_WIDTH, SCREEN_HEIGHT), "LLM RPG Game - AI Dialogue Edition")
+        self.screen = self.framebuffer.world
         self.clock = pygame.time.Clock()
         
-        # Initialize Chinese font support
-        self.font_manager = EnglishFontManager()
-        self.font = self.font_manager.font
-        self.small_font = self.font_manager.small_font
-        self.tiny_font = self.font_manager.tiny_font
-        
-        # Initialize Ollama API
-        self.ollama_api = OllamaAPI(OLLAMA_MODEL)
-        
-        # Create game objects
-        self.player = Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.room_env = RoomEnvironment()
-        self.dialogue_system = DialogueSystem(self.font, self.small_font, self.tiny_font)
-        
-        # Create NPCs
-        self.npcs = self.create_npcs()
-        
         # Game state
         self.running = True
         self.show_title = False
         self.game_started = True
+        self.loading = True
+        self.world = None
+        self.status_surface = None
+        self.status_message = None
+        self.server_address = server_address
+        self.llm_worker = llm_worker
+        self.trace_options = {"record_file": record_file, "replay_file": replay_file, "replay_speed": replay_speed}
+        self.ambient = None
+        self.load_file = load_file
+        self.autosave = None
+        self.speech_bubbles = {}     # NPC name -> (rendered line, expiry time)
+        self.pending_errands = {}    # NPC index -> point of interest to walk to after the dialogue
+        self.bubble_cooldowns = {}   # NPC name -> time the NPC may speak again
+        
+        # Probe the LLM backend in the background; the HUD shows the result
+        self.backend_monitor = BackendMonitor(OLLAMA_MODEL)
 
-    def create_npcs(self):
-        """Create and return a list of NPCs"""
-        npcs = []
+        # Sampling profiler, toggled with F10 (LLMRPG_PROFILE=1, or =alloc to track allocations, starts it at once)
+        self.profiler = Profiler()
+        profile = os.environ.get("LLMRPG_PROFILE", "0")
+        if profile not in ("", "0"):
+            self.profiler.start(allocations=profile == "alloc")
+        self.backend_monitor.start()
         
-        # Colleague 1 (cat)
-        librarian = NPC(124, 217, "Colleague 1", "animal", "wise")
-        npcs.append(librarian)
+        # Load everything else in parallel (pygame's built-in font is ready immediately)
+        self.loading_font = pygame.font.Font(None, 32)
+        self.startup = StartupLoader(launch_time)
+        self.startup.add_task("fonts", self.load_fonts)
+        self.startup.add_task("world", self.load_world)
+        self.startup.add_task("player", self.load_player)
+        self.startup.add_task("llm", self.load_llm)
+        self.startup.add_task("pregen", self.load_pregen)
+
+    def load_fonts(self):
+        """Startup task: resolve and create the UI fonts"""
+        font_manager = MixedFontManager()
+        return font_manager, font_manager.font, font_manager.small_font, font_manager.tiny_font
+
+    def load_world(self):
+        """Startup task: load the world and the start room (imports numpy on first use)"""
+        from Env.WorldManager import WorldManager
+        return WorldManager()
+
+    def load_player(self):
+        """Startup task: create the player and load its sprites"""
+        return Player(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+
+    def load_llm(self):
+        """Startup task: create the LLM backend pool and open the response cache"""
+        if self.server_address:
+            # Thin client: the dialogue server owns prompts, NPC memory and the cache
+            from Server.DialogueClient import DialogueClient
+            return DialogueClient(*self.server_address).connect(), None
+        if self.llm_worker:
+            # The worker process opens the response cache and talks to OLLAMA
+            from LLM.LLMWorker import LLMWorker
+            worker = LLMWorker(OLLAMA_MODEL, LOCAL_BACKEND_CONCURRENCY, RESPONSE_CACHE_ENABLED, **self.trace_options)
+            return worker.start(), None
+        from LLM.BackendPool import BackendPool
+        response_cache = None
+        if RESPONSE_CACHE_ENABLED:
+            from LLM.ResponseCache import ResponseCache
+            response_cache = ResponseCache()
+        pool = BackendPool(OLLAMA_MODEL, LOCAL_BACKEND_CONCURRENCY, response_cache, **self.trace_options)
+        return pool, pool.response_cache
+
+    def load_pregen(self):
+        """Startup task: open the pre-generated dialogue file, if there is one"""
+        from LLM.PregenDialogue import PregenDialogue
+        return PregenDialogue.open_default()
+
+    def finish_loading(self):
+        """Wire up the objects produced by the startup tasks (main thread)"""
+        results = self.startup.results
+        self.font_manager, self.font, self.small_font, self.tiny_font = results["fonts"]
+        self.ollama_api, self.response_cache = results["llm"]
         
-        # Colleague 2 (rabbit)
-        woman = NPC(193, 217, "Colleague 2", "animal", "mysterious")
-        npcs.append(woman)
+        # Create game objects
+        self.world = results["world"]
+        self.room_env = self.world.current_room.environment
+        self.player = results["player"]
+        self.player.x, self.player.y = self.world.spawn
+        self.dialogue_system = DialogueSystem(self.font, self.small_font, self.tiny_font)
+        self.dialogue_system.pregen = results["pregen"]
+        self.dialogue_system.input.blur()   # Text input (and the IME) only while a conversation is open
         
-        # Colleague 3 (bear)
-        butler = NPC(194, 348, "Colleague 3", "animal", "friendly")
-        npcs.append(butler)
+        # Ambient chatter needs the local scheduler (a thin client has none)
+        if AMBIENT_ENABLED and hasattr(self.ollama_api, "idle"):
+            from LLM.AmbientChatter import AmbientChatter
+            self.ambient = AmbientChatter(self.ollama_api)
         
-        # Resident (fox)
-        resident = NPC(374, 348, "GTP", "animal", "playful")
-        npcs.append(resident)
+        # Create NPCs
+        self.npcs = self.create_npcs()
+        self.loading = False
 
-        # Programmer NPC
-        programmer = NPC(363, 217, "Lee Chong Keat", "animal", "programmer")
-        npcs.append(programmer)
-        
-        return npcs
+        # Saves are captured here and written on a background thread
+        from Init.Autosave import Autosave
+        self.autosave = Autosave()
+        if self.load_file:
+            self.load_game(self.load_file)
+
+    def create_npcs(self):
+        """Return the NPCs of the current room (defined in Assets/maps/world.json)"""
+        self.npc_population = self.world.current_room.population
+        return self.world.current_room.npcs
+
+    def change_room(self):
+        """Swap in the room the world manager just switched to"""
+        self.room_env = self.world.current_room.environment
+        self.npcs = self.create_npcs()
+        self.player.x, self.player.y = self.world.spawn
+        self.speech_bubbles.clear()
 
     def check_npc_interaction(self):
         """Check if player is close enough to interact with an NPC"""
         if self.dialogue_system.active:
             return None
             
-        for npc in self.npcs:
+        npc = self.npc_population.nearest(self.player.x, self.player.y, 40)
+        if npc:
             distance = math.sqrt((self.player.x - npc.x)**2 + (self.player.y - npc.y)**2)
-            if distance < 40:
-                print(f"Detected NPC: {npc.name}, Distance: {distance:.2f}")
-                return npc
-        return None
+            logger.debug("Detected NPC", extra={"fields": {"npc": npc.name, "distance": round(distance, 2)}})
+        return npc
 
     def handle_events(self):
         """Handle all user input and events"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
-                print("Game exiting...")
+                logger.info("Game exiting...")
+            elif event.type == pygame.VIDEORESIZE:
+                # Only the scaling changes; nothing is reloaded
+                self.framebuffer.resize()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F10:
+                self.profiler.toggle(self, allocations=bool(event.mod & pygame.KMOD_SHIFT))
+
+            # Nothing but quitting while the startup tasks run
+            if self.loading:
+                continue
+
+            # Quicksave / quickload (in or out of a conversation)
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_F5, pygame.K_F9) and not self.show_title:
+                if event.key == pygame.K_F5:
+                    self.save_game(os.path.join(SAVE_DIR, QUICKSAVE_FILE))
+                else:
+                    self.load_game(os.path.join(SAVE_DIR, QUICKSAVE_FILE))
 
             # Title screen input
-            if self.show_title:
+            elif self.show_title:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
-                        print("Game started")
+                        logger.info("Game started")
                         self.show_title = False
                         self.game_started = True
 
@@ -104,43 +209,55 @@ class Game:
             elif self.dialogue_system.active:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
-                        print("Exiting dialogue")
-                        self.dialogue_system.end_dialogue()
+                        logger.info("Exiting dialogue")
+                        self.end_dialogue()
                     elif event.key == pygame.K_RETURN:
                         if self.dialogue_system.input_active and not self.dialogue_system.is_thinking:
-                            # Rate limiting for message sending
-                            if not hasattr(self, '_last_send_time'):
-                                self._last_send_time = 0
-                            current_time = time.time()
-                            if current_time - self._last_send_time > 0.5:  # Minimum 0.5s between sends
-                                print("Sending message")
-                                self.dialogue_system.send_message(self.ollama_api)
-                                self._last_send_time = current_time
-                    elif event.key == pygame.K_BACKSPACE:
-                        self.dialogue_system.remove_input_char()
+                            # Rate limiting is the scheduler's per-session token bucket
+                            if self.dialogue_system.send_message(self.ollama_api):
+                                logger.debug("Message sent")
+                    elif event.key == pygame.K_END:
+                        # Caret to the end of the input; the conversation scrolls to the newest line
+                        # even while the input is locked during generation
+                        self.dialogue_system.handle_input_event(event)
+                        self.dialogue_system.scroll_to_end()
+                    elif self.dialogue_system.handle_input_event(event):
+                        pass  # Caret and editing keys
                     elif event.key == pygame.K_UP:
                         self.dialogue_system.scroll_up()
                     elif event.key == pygame.K_DOWN:
                         self.dialogue_system.scroll_down()
-                    else:
-                        # Handle printable characters
-                        if event.unicode and event.unicode.isprintable() and event.unicode != '\r':
-                            self.dialogue_system.add_input_char(event.unicode)
-                            print(f"Input character: {repr(event.unicode)}")
+                    elif event.key == pygame.K_PAGEUP:
+                        self.dialogue_system.page_up()
+                    elif event.key == pygame.K_PAGEDOWN:
+                        self.dialogue_system.page_down()
+                    elif event.key == pygame.K_TAB:
+                        self.dialogue_system.toggle_thoughts()
+                    elif event.key in (pygame.K_F1, pygame.K_F2, pygame.K_F3):
+                        self.dialogue_system.pick_suggestion(event.key - pygame.K_F1, self.ollama_api)
+                else:
+                    # Typed text and IME composition
+                    self.dialogue_system.handle_input_event(event)
             else:
                 # Game input (outside dialogue)
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_z:
-                        print("Z key pressed")
+                        logger.debug("Z key pressed")
                         npc = self.check_npc_interaction()
                         if npc:
-                            print(f"Starting dialogue with {npc.name}")
+                            logger.info("Starting dialogue with %s", npc.name)
                             self.dialogue_system.start_dialogue(npc)
+                            npc.in_dialogue = True
                         else:
-                            print("No NPC nearby")
+                            logger.debug("No NPC nearby")
 
     def update(self):
         """Update game logic"""
+        if self.loading:
+            if self.startup.poll():
+                self.finish_loading()
+            return
+        
         if self.show_title:
             return
             
@@ -148,7 +265,13 @@ class Game:
         if self.dialogue_system.active:
             self.dialogue_system.update_cursor()
             self.dialogue_system.update_thinking_process()
+            for action in self.dialogue_system.pop_actions():
+                self.apply_npc_action(self.dialogue_system.current_npc, *action)
             
+        # Advance NPC wandering and animation for the whole room in one vectorised step
+        dt = self.clock.get_time() / 1000.0
+        self.npc_population.update(dt)
+
         # Handle player movement
         keys = pygame.key.get_pressed()
         dx, dy = 0, 0
@@ -164,9 +287,92 @@ class Game:
             if keys[pygame.K_RIGHT]:
                 dx = 1
             
-            # Get obstacles from environment and move player
-            obstacles = self.room_env.get_obstacles()
+            # Get obstacles near the player from the environment's cell index and move
+            reach = self.player.speed * 2
+            obstacles = self.room_env.get_obstacles(self.player.get_rect().inflate(reach, reach))
             self.player.move(dx, dy, obstacles)
+        else:
+            self.player.is_moving = False
+        self.player.animate(dt)
+
+        # Stream rooms and follow exits
+        if self.world.update(self.player.get_rect()):
+            self.change_room()
+        
+        self.update_ambient()
+
+        if AUTOSAVE_ENABLED:
+            self.autosave.update(self)
+
+    def apply_npc_action(self, npc, name, argument):
+        """
+        Carry out an action tag from an NPC reply (emotion and end are shown by the dialogue box)
+
+        Args:
+            npc: NPC that sent the action
+            name (str): Action name
+            argument (str): Action argument, e.g. an item or place
+        """
+        if name == "give" and argument:
+            self.player.inventory.append(argument)
+            self.dialogue_system.notice = f"Received: {argument}"
+            logger.info("Player received item", extra={"fields": {"npc": npc.name, "item": argument}})
+        elif name == "walk" and argument and hasattr(npc, "index"):
+            # The NPC sets off once the conversation is over
+            self.pending_errands[npc.index] = argument
+
+    def end_dialogue(self):
+        """Close the dialogue and start any errands NPCs agreed to"""
+        self.dialogue_system.end_dialogue()
+        for index, tag in self.pending_errands.items():
+            if not self.npc_population.send_to(index, tag):
+                logger.debug("No route for errand", extra={"fields": {"target": tag}})
+        self.pending_errands.clear()
+
+    def save_game(self, path):
+        """Snapshot the game to a file (written in the background; the writer logs the outcome)"""
+        return self.autosave.save_to(self, path)
+
+    def load_game(self, path):
+        """
+        Restore a snapshot written by save_game or the autosave
+
+        Returns:
+            bool: False if the file couldn't be loaded (the game is left as it was)
+        """
+        from Init.WorldSnapshot import WorldSnapshot
+        start = time.perf_counter()
+        try:
+            snapshot = WorldSnapshot.read(path)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load %s: %s", path, e)
+            return False
+        try:
+            snapshot.apply(self)
+        except (KeyError, ValueError) as e:
+            logger.error("Could not restore %s: %s", path, e)
+            return False
+        self.pending_errands.clear()
+        self.bubble_cooldowns.clear()
+        logger.info("Game loaded", extra={"fields": {
+            "path": path, "ms": round((time.perf_counter() - start) * 1000, 2)}})
+        return True
+
+    def update_ambient(self):
+        """Refill ambient line pools and let nearby NPCs speak"""
+        if self.ambient is None or self.dialogue_system.active:
+            return
+        self.ambient.update(self.npcs)
+        
+        now = pygame.time.get_ticks() / 1000.0
+        for npc in self.npc_population.within(self.player.x, self.player.y, AMBIENT_BUBBLE_RADIUS):
+            if npc.in_dialogue or now < self.bubble_cooldowns.get(npc.name, 0):
+                continue
+            line = self.ambient.take(npc.name)
+            if line is None:
+                continue
+            self.speech_bubbles[npc.name] = (self.tiny_font.render(line, True, BLACK), now + AMBIENT_BUBBLE_SECONDS)
+            self.bubble_cooldowns[npc.name] = now + AMBIENT_BUBBLE_COOLDOWN
 
     def draw_title_screen(self):
         """Draw the title screen"""
@@ -224,20 +430,90 @@ class Game:
         # Draw player character
         pygame.draw.rect(self.screen, PLAYER_BLUE, (SCREEN_WIDTH//2 - 12, SCREEN_HEIGHT//2 + 220, 24, 24))
 
+    def draw_loading_screen(self):
+        """Draw the loading screen shown while startup tasks run (at native resolution)"""
+        ui = self.framebuffer.ui
+        ui.fill(BLACK)
+        center_x, center_y = ui.get_rect().center
+        finished, total = self.startup.progress
+        if self.startup.error:
+            text = f"Startup failed - {self.startup.error}"
+        else:
+            text = f"Loading... {finished}/{total}"
+        text_surface = self.loading_font.render(text, True, WHITE)
+        ui.blit(text_surface, text_surface.get_rect(center=(center_x, center_y)))
+        
+        # Progress bar
+        bar_rect = pygame.Rect(center_x - 150, center_y + 30, 300, 12)
+        pygame.draw.rect(ui, WHITE, bar_rect, 1)
+        if total:
+            fill_rect = bar_rect.inflate(-4, -4)
+            fill_rect.width = fill_rect.width * finished // total
+            pygame.draw.rect(ui, WHITE, fill_rect)
+        
+        backend_surface = self.loading_font.render(self.backend_monitor.message, True, GRAY)
+        ui.blit(backend_surface, backend_surface.get_rect(center=(center_x, center_y + 80)))
+
+    def draw_backend_status(self):
+        """Draw the LLM backend status in the top-right corner"""
+        monitor = self.backend_monitor
+        if monitor.message != self.status_message:
+            # Re-render only when the status changes
+            color = {
+                BackendMonitor.ONLINE: GREEN,
+                BackendMonitor.CHECKING: YELLOW,
+            }.get(monitor.status, RED)
+            self.status_surface = self.tiny_font.render(monitor.message, True, color)
+            self.status_message = monitor.message
+        ui = self.framebuffer.ui
+        width = self.status_surface.get_width()
+        status_rect = pygame.Rect(ui.get_width() - width - 20, 10, width + 10, 30)
+        pygame.draw.rect(ui, BLACK, status_rect)
+        pygame.draw.rect(ui, WHITE, status_rect, 1)
+        ui.blit(self.status_surface, (status_rect.x + 5, 15))
+
+    def draw_speech_bubbles(self):
+        """Draw ambient lines above the NPCs that said them"""
+        if not self.speech_bubbles:
+            return
+        ui = self.framebuffer.ui
+        now = pygame.time.get_ticks() / 1000.0
+        positions = {npc.name: npc for npc in self.npcs}
+        for name, (line_surface, expires) in list(self.speech_bubbles.items()):
+            npc = positions.get(name)
+            if npc is None or now > expires:
+                del self.speech_bubbles[name]
+                continue
+            width, height = line_surface.get_size()
+            bubble_rect = pygame.Rect(0, 0, width + 12, height + 8)
+            center_x, top = self.framebuffer.to_ui(int(npc.x) + npc.width // 2, int(npc.y))
+            bubble_rect.midbottom = (center_x, top - 44)  # above the name label
+            bubble_rect.clamp_ip(ui.get_rect())
+            pygame.draw.rect(ui, WHITE, bubble_rect, border_radius=6)
+            pygame.draw.rect(ui, BLACK, bubble_rect, 1, border_radius=6)
+            ui.blit(line_surface, (bubble_rect.x + 6, bubble_rect.y + 4))
+
     def draw_game(self):
-        """Draw the main game screen"""
+        """Draw the world into the framebuffer"""
         # Draw environment
         self.room_env.draw_room(self.screen)
         
         # Draw NPCs
-        for npc in self.npcs:
-            npc.draw(self.screen)
+        self.npc_population.draw(self.screen)
         
         # Draw player
         self.player.draw(self.screen)
+
+    def draw_ui(self):
+        """Draw text and HUD on top of the scaled world, at native resolution"""
+        ui = self.framebuffer.ui
+        
+        # Draw ambient speech bubbles
+        if not self.dialogue_system.active:
+            self.draw_speech_bubbles()
         
         # Draw dialogue box
-        self.dialogue_system.draw_dialogue_box(self.screen)
+        self.dialogue_system.draw_dialogue_box(ui)
         
         # Draw controls hint (when not in dialogue)
         if not self.dialogue_system.active:
@@ -246,77 +522,92 @@ class Game:
                 hint_surface = self.tiny_font.render(hint_text, True, WHITE)
                 # Background for better readability
                 hint_rect = pygame.Rect(10, 10, 350, 30)
-                pygame.draw.rect(self.screen, (0, 0, 0, 180), hint_rect)
-                pygame.draw.rect(self.screen, WHITE, hint_rect, 1)
-                self.screen.blit(hint_surface, (15, 15))
+                pygame.draw.rect(ui, (0, 0, 0, 180), hint_rect)
+                pygame.draw.rect(ui, WHITE, hint_rect, 1)
+                ui.blit(hint_surface, (15, 15))
             except:
                 pass
         
+        # Draw backend status
+        if not self.dialogue_system.active:
+            self.draw_backend_status()
+        
         # Draw NPC labels when nearby
         if not self.dialogue_system.active:
-            for npc in self.npcs:
-                distance = math.sqrt((self.player.x - npc.x)**2 + (self.player.y - npc.y)**2)
-                if distance < 60:
-                    try:
-                        name_surface = self.small_font.render(npc.name, True, WHITE)
-                        name_width = name_surface.get_width()
-                        name_height = name_surface.get_height()
-                        
-                        # Position above NPC (centered)
-                        npc_center_x = npc.x + npc.width // 2
-                        npc_center_y = npc.y + npc.height // 2
-                        
-                        name_x = npc_center_x - name_width // 2
-                        name_y = npc_center_y - npc.height - 20
-                        
-                        # Background for readability
-                        name_bg_rect = pygame.Rect(name_x - 5, name_y - 5, name_width + 10, name_height + 10)
-                        pygame.draw.rect(self.screen, (0, 0, 0, 180), name_bg_rect)
-                        pygame.draw.rect(self.screen, WHITE, name_bg_rect, 1)
-                        self.screen.blit(name_surface, (name_x, name_y))
-                    except Exception as e:
-                        print(f"Error rendering NPC name: {e}")
+            for npc in self.npc_population.within(self.player.x, self.player.y, 60):
+                try:
+                    name_surface = self.small_font.render(npc.name, True, WHITE)
+                    name_width = name_surface.get_width()
+                    name_height = name_surface.get_height()
+                    
+                    # Position above NPC (centered)
+                    npc_center_x, npc_top = self.framebuffer.to_ui(npc.x + npc.width // 2, npc.y)
+                    
+                    name_x = npc_center_x - name_width // 2
+                    name_y = npc_top - npc.height // 2 - 20
+                    
+                    # Background for readability
+                    name_bg_rect = pygame.Rect(name_x - 5, name_y - 5, name_width + 10, name_height + 10)
+                    pygame.draw.rect(ui, (0, 0, 0, 180), name_bg_rect)
+                    pygame.draw.rect(ui, WHITE, name_bg_rect, 1)
+                    ui.blit(name_surface, (name_x, name_y))
+                except Exception as e:
+                    logger.warning("Error rendering NPC name: %s", e)
+
+        # Profiling indicator, so a recording isn't left running by accident
+        if self.profiler.running:
+            label = "PROFILING + ALLOCATIONS" if self.profiler.base_snapshot is not None else "PROFILING"
+            profiling_surface = self.tiny_font.render(f"{label} (F10 to stop)", True, RED)
+            ui.blit(profiling_surface, (ui.get_width() - profiling_surface.get_width() - 10, ui.get_height() - 20))
 
     def draw(self):
         """Draw the current screen"""
+        if self.loading:
+            self.draw_loading_screen()
+            pygame.display.flip()
+            self.startup.mark_first_frame()
+            return
+        
         if self.show_title:
             self.draw_title_screen()
+            self.framebuffer.present()
         else:
             self.draw_game()
+            self.framebuffer.present()
+            self.draw_ui()
         
         pygame.display.flip()
+        self.startup.mark_interactive()
 
     def run(self):
         """Main game loop"""
-        print("Starting game...")
-        print(f"Using OLLAMA model: Local large language model")
-        print("Please ensure the OLLAMA service is running")
-        
-        # Check OLLAMA service availability
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                models = [model['name'] for model in data.get('models', [])]
-                print("✓ OLLAMA service connected successfully")
-                if OLLAMA_MODEL in models:
-                    print(f"✓ Model found: {OLLAMA_MODEL}")
-                else:
-                    print(f"⚠ Model not found: {OLLAMA_MODEL}, please ensure it's downloaded")
-                    print("Available models:", models)
-            else:
-                print("⚠ Failed to connect to OLLAMA service, please ensure it's running")
-        except Exception as e:
-            print(f"⚠ Unable to connect to OLLAMA service: {e}")
-            print("Please ensure the OLLAMA service is running")
+        logger.info("Starting game...")
+        logger.info("Using OLLAMA model: %s", OLLAMA_MODEL)
         
-        # Main game loop
+        # Main game loop (the backend probe runs in the background)
         while self.running:
+            self.profiler.update(self)
             self.handle_events()
             self.update()
             self.draw()
             self.clock.tick(FPS)
         
         # Cleanup
+        self.profiler.stop()
+        if self.autosave is not None:
+            self.autosave.close(self if AUTOSAVE_ENABLED else None)
+        if getattr(self, "ollama_api", None) is not None:
+            if getattr(self.ollama_api, "is_remote", False):
+                self.ollama_api.close()
+            else:
+                self.ollama_api.shutdown()
+        if self.world:
+            self.world.shutdown()
+        dialogue_system = getattr(self, "dialogue_system", None)
+        if dialogue_system is not None:
+            dialogue_system.transcript.close()
+            if dialogue_system.pregen is not None:
+                dialogue_system.pregen.close()
+        LogManager.shutdown()
         pygame.quit()
         sys.exit()
\ No newline at end of file
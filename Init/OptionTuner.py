@@ -0,0 +1,279 @@
+import json
+import os
+import statistics
+import time
+
+from LLM.OllamaAPI import OllamaAPI
+from LLM.PersonalityRegistry import PersonalityRegistry
+from LLM.PromptBuilder import PromptBuilder
+from LLM.SessionRecorder import TRACE_FORMAT
+from Setting.Configuration import (
+    OLLAMA_PS_URL, GENERATION_PROFILE_FILE, TUNER_PROMPTS, TUNER_MAX_TOKENS, TUNER_REPLY_TOKENS,
+    TUNER_NUM_CTX, TUNER_NUM_BATCH, TUNER_KEEP_ALIVE, TUNER_TOLERANCE, TUNER_PREDICT_CAP
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# Player lines for the synthetic conversations used when no trace is given
+_PLAYER_LINES = (
+    "Hi! What are you working on today?",
+    "Do you know where the printer is?",
+    "I'm new here. Any advice for my first week?",
+    "What do you think about the coffee in this office?",
+    "Can you tell me more about yourself?",
+    "Thanks, that helps a lot. One more question: who should I ask about the project deadline?",
+)
+
+
+class OptionTuner:
+    """
+    Finds backend options that suit this host: num_thread, num_batch and
+    num_ctx are swept one at a time (keeping the best value of each)
+    over prompts made from the real NPC personality prompts and either
+    recorded traces or short synthetic conversations.
+
+    Every candidate is scored by the time to a typical full reply,
+    TTFT + TUNER_REPLY_TOKENS / tokens per second, using the timings
+    OLLAMA reports. Candidates within TUNER_TOLERANCE of each other are
+    separated by the memory the loaded model takes (/api/ps). num_predict
+    is then set from the length of unrestricted replies with the winning
+    options (and left unset if those replies run into TUNER_PREDICT_CAP),
+    and the result is written as the generation profile that
+    OllamaAPI loads at startup.
+    """
+    def __init__(self, model_name, trace_files=(), prompt_count=TUNER_PROMPTS, profile_file=None):
+        """
+        Args:
+            model_name (str): Model to tune
+            trace_files (list): Traces written with --record to take prompts from
+            prompt_count (int): Prompts measured per candidate
+            profile_file (str): Where to write the profile (default: GENERATION_PROFILE_FILE)
+        """
+        # requests is only needed by the tuning command
+        import requests
+
+        self.api = OllamaAPI(model_name)
+        self.session = requests.Session()
+        self.base_options = {key: value for key, value in self.api.options.items()
+                             if key in ("temperature", "top_p", "repeat_penalty")}
+        self.trace_files = list(trace_files)
+        self.prompt_count = prompt_count
+        self.profile_file = profile_file or os.environ.get("LLMRPG_GENERATION_PROFILE", GENERATION_PROFILE_FILE)
+        self.prompts = []
+        self.results = []
+
+    # Prompt set
+
+    def _trace_prompts(self):
+        prompts = []
+        for path in self.trace_files:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("format") != TRACE_FORMAT and "prompt" in record:
+                        prompts.append((record["system"], record["prompt"]))
+        return prompts
+
+    def _synthetic_prompts(self):
+        registry = PersonalityRegistry.shared()
+        prompts = []
+        for i, personality in enumerate(registry.names()):
+            name = f"{personality.title()} NPC"
+            system_prompt = registry.prompt(personality, name, "human")
+            # Conversations of growing length, so short and long contexts are both measured
+            history = [f"Hello! I'm {name}. How can I help you?"]
+            for turn in range(i % len(_PLAYER_LINES)):
+                history.append(f"Player: {_PLAYER_LINES[turn]}")
+                history.append(f"{name}: Sure, happy to help with that. Let me think about it for a moment.")
+            message = _PLAYER_LINES[i % len(_PLAYER_LINES)]
+            prompts.append((system_prompt, PromptBuilder.build(history, name, message)))
+        return prompts
+
+    def build_prompt_set(self):
+        """Pick prompt_count prompts spread evenly over the range of prompt lengths"""
+        prompts = self._trace_prompts() if self.trace_files else self._synthetic_prompts()
+        if not prompts:
+            raise RuntimeError("No prompts to tune with")
+        prompts.sort(key=lambda pair: len(pair[0]) + len(pair[1]))
+        count = min(self.prompt_count, len(prompts))
+        step = (len(prompts) - 1) / max(1, count - 1)
+        self.prompts = [prompts[round(i * step)] for i in range(count)]
+        return self.prompts
+
+    # Measurement
+
+    def _measure(self, system_prompt, prompt, options):
+        """One streamed generation; timings come from OLLAMA's final message"""
+        payload = {"model": self.api.model_name, "prompt": prompt, "system": system_prompt,
+                   "stream": True, "options": options, "keep_alive": TUNER_KEEP_ALIVE}
+        started = time.perf_counter()
+        first_token = None
+        final = None
+        with self.session.post(self.api.url, json=payload, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("response") and first_token is None:
+                    first_token = time.perf_counter()
+                if data.get("done"):
+                    final = data
+                    break
+        if final is None:
+            raise RuntimeError("Stream ended without a final message")
+        eval_seconds = final.get("eval_duration", 0) / 1e9
+        return {
+            "ttft_ms": ((first_token or time.perf_counter()) - started) * 1000,
+            "tokens_per_second": final.get("eval_count", 0) / eval_seconds if eval_seconds else 0.0,
+            "prompt_tokens": final.get("prompt_eval_count", 0),
+            "tokens": final.get("eval_count", 0),
+            "load_ms": final.get("load_duration", 0) / 1e6,
+        }
+
+    def _memory(self):
+        """(size, size_vram) in MB of the loaded model, as reported by /api/ps"""
+        try:
+            models = self.session.get(OLLAMA_PS_URL, timeout=10).json().get("models", [])
+        except Exception as e:
+            logger.debug("Memory query failed: %s", e)
+            return None, None
+        for model in models:
+            if self.api.model_name in (model.get("name"), model.get("model")):
+                return round(model.get("size", 0) / 2**20), round(model.get("size_vram", 0) / 2**20)
+        return None, None
+
+    def evaluate(self, candidate):
+        """
+        Measure one set of options over the prompt set
+
+        Returns:
+            dict: Candidate, median TTFT and tokens/s, score (ms to a typical reply), memory
+        """
+        options = dict(self.base_options, num_predict=TUNER_MAX_TOKENS, **candidate)
+        result = {"options": candidate}
+        try:
+            # Changing num_ctx/num_batch/num_thread reloads the model: keep that out of the timings
+            warmup = self._measure(*self.prompts[0], options)
+            samples = [self._measure(system_prompt, prompt, options) for system_prompt, prompt in self.prompts]
+        except Exception as e:
+            logger.warning("Candidate failed", extra={"fields": {"options": candidate, "error": str(e)}})
+            result.update(score_ms=float("inf"), error=str(e))
+            self.results.append(result)
+            return result
+        ttft = statistics.median(sample["ttft_ms"] for sample in samples)
+        tps = statistics.median(sample["tokens_per_second"] for sample in samples)
+        memory_mb, vram_mb = self._memory()
+        result.update(
+            ttft_ms=round(ttft, 1),
+            tokens_per_second=round(tps, 2),
+            score_ms=round(ttft + (TUNER_REPLY_TOKENS / tps * 1000 if tps else float("inf")), 1),
+            load_ms=round(warmup["load_ms"], 1),
+            max_prompt_tokens=max(sample["prompt_tokens"] for sample in samples),
+            memory_mb=memory_mb,
+            vram_mb=vram_mb,
+        )
+        logger.info("Candidate measured", extra={"fields": {
+            "options": candidate, "ttft_ms": result["ttft_ms"], "tps": result["tokens_per_second"],
+            "score_ms": result["score_ms"], "memory_mb": memory_mb}})
+        self.results.append(result)
+        return result
+
+    @staticmethod
+    def _better(result, best):
+        if result["score_ms"] < best["score_ms"] * (1 - TUNER_TOLERANCE):
+            return True
+        if result["score_ms"] > best["score_ms"] * (1 + TUNER_TOLERANCE):
+            return False
+        # A tie on speed: the smaller footprint wins
+        memory, best_memory = result.get("memory_mb"), best.get("memory_mb")
+        return memory is not None and best_memory is not None and memory < best_memory
+
+    def _num_predict(self, options):
+        """
+        Reply budget from unrestricted replies: p95 length plus a margin, in steps of 32
+
+        Returns:
+            int: num_predict, or None if unknown or p95 replies reach TUNER_PREDICT_CAP (capping would cut them off)
+        """
+        lengths = []
+        for system_prompt, prompt in self.prompts:
+            try:
+                sample = self._measure(system_prompt, prompt,
+                                       dict(self.base_options, num_predict=TUNER_PREDICT_CAP, **options))
+                lengths.append(sample["tokens"])
+            except Exception as e:
+                logger.warning("Reply length measurement failed: %s", e)
+        if not lengths:
+            return None
+        lengths.sort()
+        p95 = lengths[min(len(lengths) - 1, int(0.95 * len(lengths)))]
+        if p95 >= TUNER_PREDICT_CAP:
+            logger.info("Replies reach the measurement cap, leaving num_predict unset",
+                        extra={"fields": {"p95_tokens": p95, "cap": TUNER_PREDICT_CAP}})
+            return None
+        return min(TUNER_PREDICT_CAP, max(128, -(-int(p95 * 1.25) // 32) * 32))
+
+    def run(self):
+        """
+        Sweep, pick the best options and write the profile
+
+        Returns:
+            dict: The profile that was written
+        """
+        started = time.perf_counter()
+        self.build_prompt_set()
+        logger.info("Tuning generation options", extra={"fields": {
+            "model": self.api.model_name, "prompts": len(self.prompts)}})
+
+        best_options = {}
+        best = self.evaluate(best_options)
+        if best["score_ms"] == float("inf"):
+            raise RuntimeError(f"Backend unusable with default options: {best.get('error')}")
+
+        cpus = os.cpu_count() or 1
+        needed_ctx = best["max_prompt_tokens"] + TUNER_MAX_TOKENS
+        sweeps = (
+            ("num_thread", sorted({max(1, cpus // 2), cpus})),
+            ("num_batch", TUNER_NUM_BATCH),
+            # Contexts too small for the longest prompt would truncate it
+            ("num_ctx", [ctx for ctx in TUNER_NUM_CTX if ctx >= needed_ctx] or [max(TUNER_NUM_CTX)]),
+        )
+        for option, values in sweeps:
+            for value in values:
+                candidate = dict(best_options, **{option: value})
+                if candidate == best_options:
+                    continue
+                result = self.evaluate(candidate)
+                if self._better(result, best):
+                    best_options, best = candidate, result
+
+        options = dict(best_options)
+        num_predict = self._num_predict(options)
+        if num_predict:
+            options["num_predict"] = num_predict
+
+        profile = {
+            "model": self.api.model_name,
+            "url": self.api.url,
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "options": options,
+            "keep_alive": TUNER_KEEP_ALIVE,
+            "measurements": {key: best.get(key) for key in
+                             ("ttft_ms", "tokens_per_second", "score_ms", "memory_mb", "vram_mb")},
+            "candidates": [dict(result, score_ms=None) if result["score_ms"] == float("inf") else result
+                           for result in self.results],
+            "seconds": round(time.perf_counter() - started, 1),
+        }
+        directory = os.path.dirname(self.profile_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.profile_file, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=2)
+        logger.info("Generation profile written", extra={"fields": {
+            "path": self.profile_file, "options": options, "score_ms": best["score_ms"]}})
+        return profile
@@ -0,0 +1,291 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from Setting.Configuration import (PROJECT_ROOT, PROFILE_DIR, PROFILE_SAMPLE_MS, PROFILE_MAX_DEPTH,
+                                   PROFILE_ALLOCATION_FRAMES, PROFILE_TOP_SITES)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+_KIB = 1024.0
+
+
+def _short_path(filename):
+    """Path of a source file relative to the project (forward slashes), or its last two parts outside it"""
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, PROJECT_ROOT).replace(os.sep, "/")
+    head, tail = os.path.split(filename)
+    return f"{os.path.basename(head)}/{tail}" if head else tail
+
+
+def _in_project(filename):
+    return filename.startswith(PROJECT_ROOT + os.sep) and f"{os.sep}site-packages{os.sep}" not in filename
+
+
+class Profiler:
+    """
+    Sampling profiler and allocation tracker that can be switched on in a running game.
+
+    While running, a background thread reads the stack of every thread
+    (sys._current_frames) each PROFILE_SAMPLE_MS and counts identical
+    stacks, so the game threads only pay for the sampler holding the GIL
+    briefly. Every sample is tagged with the game state the main thread
+    last reported through update() (loading, world or dialogue, generating,
+    NPC count), which becomes the root frame of the stack.
+
+    Allocation tracking (tracemalloc) is optional because, unlike sampling,
+    it slows down every allocation in the process.
+
+    stop() writes to PROFILE_DIR:
+      profile-<time>.folded  stacks in collapsed format ("state;thread;caller;...;callee count"),
+                             for flamegraph.pl, speedscope or inferno
+      profile-<time>.json    run details, samples per state and, when tracking
+                             allocations, memory allocated and not freed since
+                             start() per subsystem (top-level package of the game
+                             code that made the allocation) with the biggest sites
+    """
+    def __init__(self, directory=PROFILE_DIR, interval_ms=PROFILE_SAMPLE_MS):
+        """
+        Args:
+            directory (str): Where reports are written
+            interval_ms (float): Milliseconds between samples
+        """
+        self.directory = directory
+        self.interval = interval_ms / 1000.0
+        self.state = "[loading]"        # Written by the main thread, read by the sampler
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.samples = Counter()        # (state, thread name, code objects innermost first) -> samples
+        self.thread_names = {}          # thread ident -> name
+        self.labels = {}                # code object -> frame label
+        self.sample_count = 0
+        self.sample_seconds = 0.0       # Time the sampler spent taking samples
+        self.started_at = 0.0
+        self.started_state = None
+        self.base_snapshot = None
+        self.own_tracing = False        # tracemalloc was started by us (and is stopped by us)
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    @staticmethod
+    def describe(game):
+        """Sample tag for the current game state, e.g. "[dialogue generating npcs<=64]" """
+        if game.loading:
+            return "[loading]"
+        dialogue = game.dialogue_system
+        parts = ["dialogue" if dialogue.active else "world"]
+        if dialogue.is_thinking:
+            parts.append("generating")
+        # Power-of-two buckets keep the number of distinct roots small
+        npcs = game.npc_population.count
+        parts.append(f"npcs<={1 << (npcs - 1).bit_length()}" if npcs else "npcs=0")
+        return f"[{' '.join(parts)}]"
+
+    def update(self, game):
+        """Report the game state for the next samples (call once per frame)"""
+        if self.thread is not None:
+            self.state = self.describe(game)
+
+    def toggle(self, game=None, allocations=False):
+        """Start, or stop and write the reports"""
+        if self.running:
+            self.stop()
+        else:
+            if game is not None:
+                self.state = self.describe(game)
+            self.start(allocations)
+
+    def start(self, allocations=False):
+        """
+        Start sampling
+
+        Args:
+            allocations (bool): Also track allocations until stop()
+        """
+        if self.running:
+            return
+        self.samples.clear()
+        self.sample_count = 0
+        self.sample_seconds = 0.0
+        self.started_at = time.time()
+        self.started_state = self.state
+        if allocations:
+            self.own_tracing = not tracemalloc.is_tracing()
+            if self.own_tracing:
+                tracemalloc.start(PROFILE_ALLOCATION_FRAMES)
+            self.base_snapshot = tracemalloc.take_snapshot()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self.thread.start()
+        logger.info("Profiler started", extra={"fields": {
+            "interval_ms": self.interval * 1000, "allocations": allocations}})
+
+    def stop(self):
+        """
+        Stop and write the reports
+
+        Returns:
+            list: Paths of the files written
+        """
+        if not self.running:
+            return []
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        snapshot = None
+        if self.base_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            memory = tracemalloc.get_traced_memory() + (tracemalloc.get_tracemalloc_memory(),)
+            if self.own_tracing:
+                tracemalloc.stop()
+
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        base_path = os.path.join(self.directory, f"profile-{stamp}")
+        report = {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "seconds": round(time.time() - self.started_at, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.sample_count,
+            "sampler_ms": round(self.sample_seconds * 1000, 1),
+            "state_at_start": self.started_state,
+            "state_at_stop": self.state,
+            "states": self._state_shares(),
+        }
+        if snapshot is not None:
+            report["allocations"] = self._allocations(snapshot, *memory)
+        self.base_snapshot = None
+
+        written = []
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(base_path + ".folded", "w", encoding="utf-8") as f:
+                f.writelines(f"{line} {count}\n" for line, count in sorted(self._collapsed().items()))
+            written.append(base_path + ".folded")
+            with open(base_path + ".json", "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            written.append(base_path + ".json")
+        except OSError as e:
+            logger.error("Could not write profile: %s", e)
+        logger.info("Profiler stopped", extra={"fields": {
+            "samples": self.sample_count, "sampler_ms": report["sampler_ms"], "files": written}})
+        return written
+
+    # Sampling
+
+    def _sample_loop(self):
+        """Sampler thread"""
+        own = threading.get_ident()
+        next_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            state = self.state
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                name = self.thread_names.get(ident)
+                if name is None:
+                    self.thread_names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                    name = self.thread_names.get(ident, str(ident))
+                codes = []
+                while frame is not None and len(codes) < PROFILE_MAX_DEPTH:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                if frame is not None:
+                    codes.append(None)      # Cut off: the outer frames are missing
+                self.samples[(state, name, tuple(codes))] += 1
+            frames = frame = None           # Don't keep the sampled frames alive until the next sample
+            self.sample_count += 1
+            self.sample_seconds += time.perf_counter() - start
+            next_time = max(next_time + self.interval, time.perf_counter())
+            self.stop_event.wait(next_time - time.perf_counter())
+
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            if code is None:
+                label = "(truncated)"
+            else:
+                label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self.labels[code] = label
+        return label
+
+    def _collapsed(self):
+        """Stacks as "state;thread;outermost;...;innermost" -> samples"""
+        lines = Counter()
+        for (state, name, codes), count in self.samples.items():
+            frames = [self._label(code) for code in reversed(codes)]
+            lines[";".join([state, name] + frames)] += count
+        return lines
+
+    def _state_shares(self):
+        """Share of main thread samples per game state"""
+        main = threading.main_thread().name
+        counts = Counter()
+        for (state, name, _), count in self.samples.items():
+            if name == main:
+                counts[state] += count
+        total = sum(counts.values()) or 1
+        return {state: round(count / total, 4) for state, count in counts.most_common()}
+
+    # Allocations
+
+    @staticmethod
+    def _site(traceback):
+        """
+        The frame an allocation is charged to: the innermost one in game code,
+        so a list grown inside the standard library counts for the game code calling it
+
+        Returns:
+            tuple: (subsystem, "file:line")
+        """
+        for frame in reversed(traceback):
+            if _in_project(frame.filename):
+                path = _short_path(frame.filename)
+                return path.split("/", 1)[0] if "/" in path else path, f"{path}:{frame.lineno}"
+        frame = traceback[-1]
+        return "python", f"{_short_path(frame.filename)}:{frame.lineno}"
+
+    def _allocations(self, snapshot, traced, peak, overhead):
+        """Memory allocated since start() and still held, per subsystem"""
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        snapshot = snapshot.filter_traces(ignore)
+        base = self.base_snapshot.filter_traces(ignore)
+
+        subsystems = {}
+        for stat in snapshot.compare_to(base, "traceback"):
+            if not stat.size_diff and not stat.count_diff:
+                continue
+            subsystem, site = self._site(stat.traceback)
+            entry = subsystems.setdefault(subsystem, {"size_diff": 0, "count_diff": 0, "size": 0, "sites": Counter(),
+                                                      "site_counts": Counter()})
+            entry["size_diff"] += stat.size_diff
+            entry["count_diff"] += stat.count_diff
+            entry["size"] += stat.size
+            entry["sites"][site] += stat.size_diff
+            entry["site_counts"][site] += stat.count_diff
+
+        report = []
+        for name, entry in sorted(subsystems.items(), key=lambda item: -abs(item[1]["size_diff"])):
+            top = sorted(entry["sites"].items(), key=lambda item: -abs(item[1]))[:PROFILE_TOP_SITES]
+            report.append({
+                "subsystem": name,
+                "size_diff_kib": round(entry["size_diff"] / _KIB, 1),
+                "count_diff": entry["count_diff"],
+                "size_kib": round(entry["size"] / _KIB, 1),
+                "sites": [{"site": site, "size_diff_kib": round(size / _KIB, 1),
+                           "count_diff": entry["site_counts"][site]} for site, size in top],
+            })
+        return {
+            "traced_kib": round(traced / _KIB, 1),
+            "peak_kib": round(peak / _KIB, 1),
+            "tracemalloc_overhead_kib": round(overhead / _KIB, 1),
+            "subsystems": report,
+        }
@@ -0,0 +1,149 @@
+import time
+
+import pygame
+
+from LLM.BackendPool import BackendPool
+from LLM.PromptBuilder import PromptBuilder
+from Player.NPC import NPC
+from Setting.Configuration import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, OLLAMA_MODEL, LOCAL_BACKEND_CONCURRENCY
+from Setting.DialogueSystem import DialogueSystem
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+def _percentiles(values):
+    """p50/p95/p99/max of a list of milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"p50": round(pick(0.50), 3), "p95": round(pick(0.95), 3),
+            "p99": round(pick(0.99), 3), "max": round(ordered[-1], 3)}
+
+
+class _TraceNPC(NPC):
+    """NPC that answers with the system prompt recorded in the trace"""
+    def __init__(self, name, system_prompt):
+        super().__init__(0, 0, name, "human")
+        self.system_prompt = system_prompt
+
+    def get_personality_prompt(self):
+        return self.system_prompt
+
+
+class ReplayBenchmark:
+    """
+    Drives the dialogue pipeline (DialogueSystem input -> scheduler ->
+    stream -> action parsing -> draw_dialogue_box) through a recorded
+    trace, headless and frame by frame, and reports the CPU cost per frame,
+    frame pacing and time to first visible text.
+
+    The player's messages and the NPCs are taken from the recorded prompts,
+    so a trace captured in production becomes a repeatable regression run.
+    """
+    def __init__(self, trace_file, time_scale=1.0, fps=FPS):
+        """
+        Args:
+            trace_file (str): Trace written with --record
+            time_scale (float): Multiplier for recorded chunk gaps (0 = no waiting)
+            fps (int): Frame rate the loop is paced at
+        """
+        self.trace_file = trace_file
+        self.time_scale = time_scale
+        self.fps = fps
+
+    @staticmethod
+    def _split_prompt(prompt):
+        """(player message, npc name) from a prompt built by PromptBuilder.build"""
+        _, _, tail = prompt.rstrip().rpartition("\nPlayer: ")
+        message, _, name = tail.rpartition("\n")
+        return message, name.rstrip(":").strip()
+
+    @staticmethod
+    def _is_dialogue(record):
+        """
+        True for a player turn: an interactive reply, or a quick reply answered in
+        the background that the player picked. Suggestions, unpicked quick replies
+        and ambient chatter are recorded too.
+        """
+        priority = record.get("priority")
+        if priority is not None:
+            return priority == "interactive" or record.get("attached", False)
+        # Traces recorded without priorities: tell player turns by their prompt
+        return (record["system"] != PromptBuilder.SUGGESTION_SYSTEM_PROMPT
+                and "\nPlayer: " in record["prompt"] and record["prompt"].rstrip().endswith(":"))
+
+    def run(self):
+        """
+        Replay every recorded generation
+
+        Returns:
+            dict: Benchmark report
+        """
+        pygame.font.init()
+        font = pygame.font.Font(None, 22)
+        screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        clock = pygame.time.Clock()
+
+        pool = BackendPool(OLLAMA_MODEL, LOCAL_BACKEND_CONCURRENCY, replay_file=self.trace_file,
+                           replay_speed=self.time_scale)
+        dialogue = DialogueSystem(font, font, font)
+        dialogue.SESSION = None    # no rate limit: the trace decides the pace
+        dialogue.suggest_replies = False   # picked quick replies are replayed as player turns below
+
+        work_ms, frame_ms, ttft_ms = [], [], []
+        started = time.perf_counter()
+
+        def frame():
+            begin = time.perf_counter()
+            dialogue.update_cursor()
+            dialogue.update_thinking_process()
+            dialogue.pop_actions()
+            screen.fill((0, 0, 0))
+            dialogue.draw_dialogue_box(screen)
+            work_ms.append((time.perf_counter() - begin) * 1000)
+            clock.tick(self.fps)
+            frame_ms.append(clock.get_time())
+
+        npc = None
+        turns = 0
+        for record in list(pool.api.sequence):
+            if not self._is_dialogue(record):
+                continue
+            turns += 1
+            message, name = self._split_prompt(record["prompt"])
+            if npc is None or npc.name != name or dialogue.closing:
+                npc = _TraceNPC(name, record["system"])
+                dialogue.start_dialogue(npc)
+            dialogue.player_input = message or "..."
+            sent = time.perf_counter()
+            if not dialogue.send_message(pool):
+                logger.warning("Benchmark could not send a message", extra={"fields": {"npc": name}})
+                continue
+            first_text = None
+            while dialogue.is_thinking:
+                frame()
+                if first_text is None and dialogue.processed_content:
+                    first_text = time.perf_counter()
+                    ttft_ms.append((first_text - sent) * 1000)
+            for _ in range(2):
+                frame()
+
+        pool.shutdown()
+        report = {
+            "trace": self.trace_file,
+            "generations": len(pool.api.sequence),
+            "turns": turns,
+            "frames": len(work_ms),
+            "seconds": round(time.perf_counter() - started, 3),
+            "frame_work_ms": _percentiles(work_ms),
+            "frame_interval_ms": _percentiles(frame_ms),
+            "time_to_first_text_ms": _percentiles(ttft_ms),
+        }
+        logger.info("Replay benchmark finished", extra={"fields": {
+            "frames": report["frames"], "work_p95_ms": report["frame_work_ms"].get("p95")}})
+        return report
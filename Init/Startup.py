@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Setting.Configuration import STARTUP_WORKERS
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class StartupLoader:
+    """
+    Runs startup tasks (fonts, world, sprites, LLM client) in parallel
+    while the main loop keeps drawing a loading screen.
+
+    Tasks are plain callables; their return values are collected in
+    `results` by name once everything has finished. Timing marks for
+    launch -> first frame -> first interactive frame are kept so the
+    startup metric can be reported.
+    """
+    def __init__(self, launch_time=None):
+        """
+        Args:
+            launch_time (float): time.perf_counter() at process start, if known
+        """
+        self.launch_time = launch_time if launch_time is not None else time.perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=STARTUP_WORKERS, thread_name_prefix="startup")
+        self.futures = {}       # name -> Future
+        self.durations = {}     # name -> seconds
+        self.results = {}
+        self.error = None
+        self.first_frame_time = None
+        self.interactive_time = None
+
+    def add_task(self, name, fn, *args):
+        """Start a named task on the startup pool"""
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            self.durations[name] = time.perf_counter() - started
+            return result
+        self.futures[name] = self.executor.submit(timed)
+
+    @property
+    def progress(self):
+        """(finished task count, total task count)"""
+        return sum(f.done() for f in self.futures.values()), len(self.futures)
+
+    def poll(self):
+        """
+        Check the tasks; call once per frame
+
+        Returns:
+            bool: True once every task has finished successfully
+        """
+        if self.error is not None:
+            return False
+        if not all(future.done() for future in self.futures.values()):
+            return False
+        for name, future in self.futures.items():
+            error = future.exception()
+            if error is not None:
+                self.error = f"{name}: {error}"
+                logger.error("Startup task %s failed: %s", name, error)
+                return False
+            self.results[name] = future.result()
+        self.executor.shutdown(wait=False)
+        return True
+
+    def mark_first_frame(self):
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter()
+
+    def mark_interactive(self):
+        """Record the first interactive frame and log the startup metric"""
+        if self.interactive_time is not None:
+            return
+        self.interactive_time = time.perf_counter()
+        fields = {
+            "first_frame_ms": round((self.first_frame_time - self.launch_time) * 1000, 1)
+            if self.first_frame_time else None,
+            "interactive_ms": round((self.interactive_time - self.launch_time) * 1000, 1),
+        }
+        fields.update({f"{name}_ms": round(seconds * 1000, 1) for name, seconds in self.durations.items()})
+        logger.info("Startup complete", extra={"fields": fields})
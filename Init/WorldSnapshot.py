@@ -0,0 +1,353 @@
+import os
+import struct
+import tempfile
+import zlib
+
+from Setting.Configuration import SNAPSHOT_TRANSCRIPT_CHUNK
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"LRPGSNAP"
+VERSION = 1
+FULL = 0
+DELTA = 1
+
+_HEADER = struct.Struct("<8sHBxIQQI")   # magic, version, kind, section count, sequence, base sequence, crc32 of body
+_SECTION = struct.Struct("<HI")         # key length, payload length; key and payload follow
+_DELETED = 0xFFFFFFFF                   # Payload length of a section removed since the base
+_PLAYER = struct.Struct("<ffBB")        # x, y, direction, last direction
+_TRANSCRIPT = struct.Struct("<I?")      # entries, thoughts collapsed
+_DIRECTIONS = ("down", "left", "right", "up")  # Player direction byte (part of the format)
+_COMPRESSION = 1                        # zlib level: snapshots are mostly float arrays, speed matters more
+
+
+class WorldSnapshot:
+    """
+    Versioned binary snapshot of the game world (or of a dialogue server session).
+
+    A snapshot is a flat map of section keys to bytes: "world" (current
+    room), "player", one section per NPCPopulation array or list of every
+    loaded room ("room/<id>/<field>"), "dialogue" and the conversation
+    transcript in chunks of SNAPSHOT_TRANSCRIPT_CHUNK entries
+    ("transcript/<n>"). On disk a fixed header (magic, version, kind,
+    sequence, CRC) is followed by the zlib-compressed sections.
+
+    A delta holds only the sections that differ from a base full snapshot,
+    plus tombstones for removed ones: static arrays (names, sprites) and
+    finished transcript chunks are left out, so frequent autosaves write
+    mostly NPC positions. Restoring reads the full file and at most one
+    delta on top of it.
+
+    capture() only copies bytes out of the live objects and belongs on the
+    main thread; encoding and writing touch nothing else and can run on a
+    background thread.
+    """
+    def __init__(self, sections=None, sequence=0):
+        """
+        Args:
+            sections (dict): Section key -> bytes
+            sequence (int): Number of the save; a delta names the sequence of its base
+        """
+        self.sections = sections if sections is not None else {}
+        self.sequence = sequence
+
+    # Strings
+
+    @staticmethod
+    def pack_strings(strings):
+        """Encode a list of strings (length-prefixed UTF-8)"""
+        parts = [struct.pack("<I", len(strings))]
+        for text in strings:
+            data = text.encode("utf-8")
+            parts.append(struct.pack("<I", len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+    @staticmethod
+    def unpack_strings(data):
+        """Decode pack_strings() output"""
+        count, = struct.unpack_from("<I", data)
+        offset = 4
+        strings = []
+        for _ in range(count):
+            length, = struct.unpack_from("<I", data, offset)
+            offset += 4
+            strings.append(data[offset:offset + length].decode("utf-8"))
+            offset += length
+        return strings
+
+    # Capture
+
+    @classmethod
+    def capture(cls, game, sequence=0, chunk_cache=None):
+        """
+        Copy the state of a running game (main thread)
+
+        Args:
+            game (Game): Loaded game
+            sequence (int): Save number
+            chunk_cache (dict): Encoded full transcript chunks kept between captures (optional)
+
+        Returns:
+            WorldSnapshot
+        """
+        sections = {}
+        world = game.world
+        sections["world"] = cls.pack_strings([world.current_id])
+
+        player = game.player
+        sections["player"] = _PLAYER.pack(player.x, player.y, _DIRECTIONS.index(player.direction),
+                                          _DIRECTIONS.index(player.last_direction))
+        sections["player/inventory"] = cls.pack_strings([str(item) for item in player.inventory])
+
+        for room_id, room in world.rooms.items():
+            arrays, lists = room.population.export_state()
+            for name, data in arrays.items():
+                sections[f"room/{room_id}/{name}"] = data
+            for name, strings in lists.items():
+                sections[f"room/{room_id}/{name}"] = cls.pack_strings(strings)
+
+        dialogue = game.dialogue_system
+        npc_name = dialogue.current_npc.name if dialogue.active and dialogue.current_npc is not None else ""
+        sections["dialogue"] = cls.pack_strings([npc_name, dialogue.player_input])
+        if npc_name:
+            sections.update(cls._capture_transcript(dialogue.transcript, chunk_cache))
+        return cls(sections, sequence)
+
+    @classmethod
+    def _capture_transcript(cls, transcript, chunk_cache):
+        """Transcript sections; full chunks never change, so they are encoded once per conversation"""
+        if chunk_cache is not None and chunk_cache.get("generation") != transcript.generation:
+            chunk_cache.clear()
+            chunk_cache["generation"] = transcript.generation
+        count = len(transcript)
+        sections = {"transcript": _TRANSCRIPT.pack(count, transcript.collapse_thoughts)}
+        size = SNAPSHOT_TRANSCRIPT_CHUNK
+        for first in range(0, count, size):
+            full = count - first >= size
+            data = chunk_cache.get(first) if chunk_cache is not None and full else None
+            if data is None:
+                fields = []
+                for index in range(first, min(first + size, count)):
+                    kind, speaker, text = transcript.entry(index)
+                    fields += [kind, speaker or "", text]
+                data = cls.pack_strings(fields)
+                if chunk_cache is not None and full:
+                    chunk_cache[first] = data
+            sections[f"transcript/{first // size}"] = data
+        return sections
+
+    # Encoding
+
+    def encode(self, base=None):
+        """
+        Serialise the snapshot
+
+        Args:
+            base (WorldSnapshot): Full snapshot to write a delta against (None for a full snapshot)
+
+        Returns:
+            bytes
+        """
+        if base is None:
+            changed, removed = self.sections, ()
+        else:
+            changed = {key: data for key, data in self.sections.items() if base.sections.get(key) != data}
+            removed = [key for key in base.sections if key not in self.sections]
+        parts = []
+        for key, data in changed.items():
+            name = key.encode("utf-8")
+            parts += [_SECTION.pack(len(name), len(data)), name, data]
+        for key in removed:
+            name = key.encode("utf-8")
+            parts += [_SECTION.pack(len(name), _DELETED), name]
+        body = zlib.compress(b"".join(parts), _COMPRESSION)
+        header = _HEADER.pack(MAGIC, VERSION, FULL if base is None else DELTA, len(changed) + len(removed),
+                              self.sequence, 0 if base is None else base.sequence, zlib.crc32(body))
+        return header + body
+
+    @classmethod
+    def decode(cls, data, base=None):
+        """
+        Parse encode() output
+
+        Args:
+            data (bytes): Encoded snapshot
+            base (WorldSnapshot): The full snapshot a delta was written against
+
+        Returns:
+            WorldSnapshot
+
+        Raises:
+            ValueError: Not a snapshot, another format version, corrupt, or a delta without its base
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated snapshot")
+        magic, version, kind, count, sequence, base_sequence, crc = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a world snapshot")
+        if version != VERSION:
+            raise ValueError(f"Snapshot format version {version}, expected {VERSION}")
+        body = data[_HEADER.size:]
+        if zlib.crc32(body) != crc:
+            raise ValueError("Corrupt snapshot")
+        if kind == DELTA and (base is None or base.sequence != base_sequence):
+            raise ValueError(f"Delta needs base snapshot {base_sequence}")
+
+        sections = dict(base.sections) if kind == DELTA else {}
+        body = zlib.decompress(body)
+        offset = 0
+        for _ in range(count):
+            key_length, length = _SECTION.unpack_from(body, offset)
+            offset += _SECTION.size
+            key = body[offset:offset + key_length].decode("utf-8")
+            offset += key_length
+            if length == _DELETED:
+                sections.pop(key, None)
+                continue
+            sections[key] = body[offset:offset + length]
+            offset += length
+        return cls(sections, sequence)
+
+    def write(self, path, base=None):
+        """
+        Write the snapshot atomically (temporary file, then rename)
+
+        Returns:
+            int: Bytes written
+        """
+        data = self.encode(base)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return len(data)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read a full snapshot and, if one was written against it, its delta (<path>.delta)
+
+        Raises:
+            OSError: The file can't be read
+            ValueError: The file isn't a usable snapshot
+        """
+        with open(path, "rb") as f:
+            snapshot = cls.decode(f.read())
+        try:
+            with open(path + ".delta", "rb") as f:
+                delta = f.read()
+        except FileNotFoundError:
+            return snapshot
+        try:
+            return cls.decode(delta, snapshot)
+        except ValueError as e:
+            # A delta from before the last full save; the full snapshot is newer
+            logger.debug("Ignoring delta: %s", e)
+            return snapshot
+
+    # Restore
+
+    def room_state(self, room_id):
+        """
+        NPCPopulation state of one room
+
+        Returns:
+            tuple: (arrays, lists) for NPCPopulation.import_state, or None if the room wasn't saved
+
+        Raises:
+            KeyError: A section is missing
+            ValueError: The arrays don't match the NPC count (corrupt, or saved by a build with other dtypes)
+        """
+        from Player.NPCPopulation import NPCPopulation
+        prefix = f"room/{room_id}/"
+        if prefix + "names" not in self.sections:
+            return None
+        arrays = {name: self.sections[prefix + name] for name in NPCPopulation.SNAPSHOT_ARRAYS}
+        lists = {name: self.unpack_strings(self.sections[prefix + name])
+                 for name in ("names", "types", "personality_names", "goals")}
+        NPCPopulation.check_state(arrays, lists)
+        return arrays, lists
+
+    def transcript_entries(self):
+        """
+        The saved conversation
+
+        Returns:
+            tuple: ([(kind, speaker, text), ...], thoughts collapsed or None if nothing was saved)
+        """
+        if "transcript" not in self.sections:
+            return [], None
+        count, collapsed = _TRANSCRIPT.unpack(self.sections["transcript"])
+        entries = []
+        for chunk in range((count + SNAPSHOT_TRANSCRIPT_CHUNK - 1) // SNAPSHOT_TRANSCRIPT_CHUNK):
+            fields = self.unpack_strings(self.sections[f"transcript/{chunk}"])
+            for i in range(0, len(fields), 3):
+                entries.append((fields[i], fields[i + 1] or None, fields[i + 2]))
+        return entries, collapsed
+
+    def apply(self, game):
+        """
+        Put a loaded game into the saved state
+
+        The current room is loaded at once if needed; saved neighbouring rooms
+        get their NPCs back when they finish streaming in. A reply that was
+        being generated when the snapshot was taken is not part of it.
+
+        Nothing is changed if the snapshot can't be applied.
+
+        Raises:
+            KeyError: The saved room doesn't exist in this world
+            ValueError: The snapshot is incomplete
+        """
+        try:
+            room_id, = self.unpack_strings(self.sections["world"])
+            x, y, direction, last_direction = _PLAYER.unpack(self.sections["player"])
+            inventory = self.unpack_strings(self.sections["player/inventory"])
+            npc_name, player_input = self.unpack_strings(self.sections["dialogue"])
+            direction, last_direction = _DIRECTIONS[direction], _DIRECTIONS[last_direction]
+            restores = {}
+            for saved_id in game.world.definitions:
+                state = self.room_state(saved_id)
+                if state is not None:
+                    restores[saved_id] = lambda room, state=state: room.population.import_state(*state)
+        except (KeyError, IndexError, struct.error) as e:
+            raise ValueError(f"Incomplete snapshot: {e!r}") from e
+        # Everything that can fail is checked before the game is touched
+        if room_id not in game.world.definitions:
+            raise KeyError(room_id)
+
+        if game.dialogue_system.active:
+            game.end_dialogue()
+        game.world.jump_to(room_id, restores)
+        game.change_room()
+
+        player = game.player
+        player.x, player.y = x, y
+        player.direction = direction
+        player.last_direction = last_direction
+        player.inventory = inventory
+
+        if npc_name:
+            population = game.npc_population
+            if npc_name in population.names:
+                npc = population.view(population.names.index(npc_name))
+                entries, collapsed = self.transcript_entries()
+                game.dialogue_system.resume_dialogue(npc, entries, player_input, collapsed)
+                npc.in_dialogue = True
+            else:
+                logger.warning("Saved conversation partner %s is not in room %s", npc_name, room_id)
+        logger.info("Snapshot restored", extra={"fields": {
+            "sequence": self.sequence, "room": room_id, "sections": len(self.sections)}})
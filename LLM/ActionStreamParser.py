@@ -0,0 +1,139 @@
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# Action tags NPCs may put in a reply, e.g. "<emotion happy/>", "<walk printer/>", "<end/>"
+ACTIONS = ("emotion", "walk", "give", "end")
+# Actions after which nothing more needs generating
+TERMINAL_ACTIONS = ("end",)
+# Longest tag we wait for before deciding a '<' was just text
+MAX_TAG_LENGTH = 64
+
+
+class ActionStreamParser:
+    """
+    Incremental splitter for NPC replies with inline action tags.
+
+    feed() takes each streamed chunk and returns (visible_text, actions):
+    visible text is everything outside action tags, with any tag still
+    being streamed held back so partial markup is never shown; actions are
+    (name, argument) tuples handed over the moment their tag closes.
+    <think> blocks pass through untouched (tags inside them are not
+    actions), and `in_think`, `think_start` and `answer_start` say where
+    in the visible text the current thoughts and the answer after them
+    begin. Each character is looked at once; nothing is re-scanned.
+
+    `complete` turns True once a terminal action or every `required`
+    action has arrived, so the caller may stop the generation early.
+    """
+    def __init__(self, required=()):
+        """
+        Args:
+            required (tuple): Action names that together make the reply complete
+        """
+        self.required = set(required)
+        self.seen = set()
+        self.tag = None           # text of the tag being read (from '<'), None when in plain text
+        self.in_think = False
+        self.length = 0           # visible text returned so far
+        self.think_start = None   # offset of the text after the last <think>
+        self.answer_start = None  # offset of the text after the last </think>
+        self.complete = False
+        self.actions = []         # every action so far
+
+    def _close_tag(self, tag):
+        """
+        Decide what a finished "<...>" was
+
+        Returns:
+            tuple: (text to show, action or None)
+        """
+        body = tag[1:-1].strip()
+        lowered = body.lower()
+        if lowered == "think":
+            self.in_think = True
+            self.think_start = self.length + len(tag)
+            return tag, None
+        if lowered == "/think":
+            self.in_think = False
+            self.answer_start = self.length + len(tag)
+            return tag, None
+        if self.in_think or not body.endswith("/"):
+            return tag, None
+        name, _, argument = body[:-1].strip().partition(" ")
+        name = name.lower()
+        if name not in ACTIONS:
+            return tag, None
+        return "", (name, argument.strip())
+
+    def feed(self, chunk):
+        """
+        Parse the next streamed chunk (anything after the reply is complete is ignored)
+
+        Returns:
+            tuple: (visible text from this chunk, list of (name, argument) actions)
+        """
+        visible = []
+        actions = []
+        if self.complete:
+            return "", actions
+        start = 0     # start of the pending plain-text run in chunk
+        for i, char in enumerate(chunk):
+            if self.tag is None:
+                if char == "<":
+                    self._emit(visible, chunk[start:i])
+                    self.tag = "<"
+                continue
+            self.tag += char
+            if char == ">":
+                text, action = self._close_tag(self.tag)
+                self.tag = None
+                start = i + 1
+                self._emit(visible, text)
+                if action is not None:
+                    actions.append(action)
+                    if self._record(action):
+                        start = len(chunk)
+                        break
+            elif char == "<" or len(self.tag) > MAX_TAG_LENGTH or (
+                    len(self.tag) == 2 and not (char.isalpha() or char == "/")):
+                # Not a tag after all: show what was held back (restart on a new '<')
+                restart = char == "<"
+                self._emit(visible, self.tag[:-1] if restart else self.tag)
+                self.tag = "<" if restart else None
+                start = i + 1
+        if self.tag is None:
+            self._emit(visible, chunk[start:])
+        return "".join(visible), actions
+
+    def _emit(self, visible, text):
+        visible.append(text)
+        self.length += len(text)
+
+    def _record(self, action):
+        """Remember an action; True once the reply is complete"""
+        self.actions.append(action)
+        self.seen.add(action[0])
+        if action[0] in TERMINAL_ACTIONS or (self.required and self.required <= self.seen):
+            self.complete = True
+        return self.complete
+
+    def close(self):
+        """
+        End of stream: a dangling '<...' that could still have been an
+        action tag is dropped, anything else is returned as text
+        """
+        tag, self.tag = self.tag, None
+        if tag is None:
+            return ""
+        name = tag[1:].strip().split(" ")[0].lower()
+        if any(action.startswith(name) for action in ACTIONS):
+            return ""
+        return tag
+
+    @classmethod
+    def strip(cls, text):
+        """Text with every action tag removed (for complete, non-streamed replies)"""
+        parser = cls()
+        visible, _ = parser.feed(text)
+        return visible + parser.close()
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+
+from LLM.PromptBuilder import PromptBuilder
+from Setting.Configuration import (
+    AMBIENT_POOL_SIZE, AMBIENT_LOW_WATERMARK, AMBIENT_LINE_TTL, AMBIENT_CHECK_INTERVAL, AMBIENT_RETRY_DELAY
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Collector:
+    """Queue stand-in that keeps only the outcome of a stream"""
+    def __init__(self):
+        self.text = None
+        self.error = None
+
+    def put(self, item):
+        msg_type, content = item
+        if msg_type == 'done':
+            self.text = content
+        elif msg_type == 'error':
+            self.error = content
+
+
+class AmbientChatter:
+    """
+    Per-NPC pools of short in-character lines, generated in batches while
+    the backend has nothing better to do.
+
+    A pool is refilled (one request asking for several lines) when it
+    drops below the low watermark and the backend's scheduler is idle; the
+    request runs at AMBIENT priority so it never delays a player's reply.
+    Lines older than AMBIENT_LINE_TTL are dropped unused.
+    """
+    def __init__(self, backend, pool_size=AMBIENT_POOL_SIZE, low_watermark=AMBIENT_LOW_WATERMARK,
+                 ttl=AMBIENT_LINE_TTL):
+        """
+        Args:
+            backend (BackendPool | LLMWorker): Backend the batches are generated on
+            pool_size (int): Lines kept per NPC
+            low_watermark (int): Refill threshold
+            ttl (float): Seconds a line stays usable
+        """
+        self.backend = backend
+        self.pool_size = pool_size
+        self.low_watermark = low_watermark
+        self.ttl = ttl
+        self.pools = {}           # NPC name -> deque of (created, line)
+        self.pending = set()      # NPC names with a refill in flight
+        self.retry_at = {}        # NPC name -> monotonic time before which no refill is tried
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+
+    def _fresh(self, name, now):
+        """The NPC's pool with stale lines dropped (lock held)"""
+        pool = self.pools.setdefault(name, deque())
+        while pool and now - pool[0][0] > self.ttl:
+            pool.popleft()
+        return pool
+
+    def update(self, npcs):
+        """
+        Top up pools that ran low; cheap to call every frame
+
+        Args:
+            npcs (list): NPCs that may speak soon (e.g. the current room's)
+        """
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + AMBIENT_CHECK_INTERVAL
+        if not self.backend.idle:
+            return
+
+        # One refill per check keeps the backend free for the player
+        with self.lock:
+            for npc in npcs:
+                if npc.name in self.pending or now < self.retry_at.get(npc.name, 0):
+                    continue
+                pool = self._fresh(npc.name, now)
+                if len(pool) < self.low_watermark:
+                    self.pending.add(npc.name)
+                    break
+            else:
+                return
+        self._refill(npc, self.pool_size - len(pool))
+
+    def _refill(self, npc, count):
+        collector = _Collector()
+        future = self.backend.generate(
+            PromptBuilder.build_ambient(npc.name, count), npc.get_personality_prompt(), collector,
+            priority=self.backend.AMBIENT)
+        future.add_done_callback(lambda _: self._store(npc.name, collector))
+        logger.debug("Ambient refill requested", extra={"fields": {"npc": npc.name, "lines": count}})
+
+    def _store(self, name, collector):
+        """Split a finished batch into lines and add them to the pool (worker thread)"""
+        now = time.monotonic()
+        lines = PromptBuilder.split_lines(collector.text) if collector.text else []
+
+        with self.lock:
+            self.pending.discard(name)
+            if not lines:
+                self.retry_at[name] = now + AMBIENT_RETRY_DELAY
+                logger.debug("Ambient refill failed", extra={"fields": {"npc": name, "error": collector.error}})
+                return
+            pool = self._fresh(name, now)
+            for line in lines[:self.pool_size - len(pool)]:
+                pool.append((now, line))
+
+    def take(self, name):
+        """
+        Pop a fresh line for an NPC
+
+        Returns:
+            str or None: The line, or None if the pool is empty
+        """
+        with self.lock:
+            pool = self._fresh(name, time.monotonic())
+            if pool:
+                return pool.popleft()[1]
+        return None
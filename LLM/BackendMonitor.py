@@ -0,0 +1,63 @@
+import threading
+
+from Setting.Configuration import OLLAMA_TAGS_URL, BACKEND_PROBE_TIMEOUT
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackendMonitor:
+    """
+    Probes the Ollama service and checks the configured model on a
+    background thread, so the game never blocks on the network at startup.
+    The HUD reads `status` / `message` every frame.
+    """
+    CHECKING = "checking"
+    ONLINE = "online"
+    MODEL_MISSING = "model missing"
+    OFFLINE = "offline"
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.status = self.CHECKING
+        self.message = "Checking OLLAMA service..."
+        self.models = []
+        self.thread = None
+
+    def start(self):
+        """Start (or restart) the probe in the background"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.status = self.CHECKING
+        self.message = "Checking OLLAMA service..."
+        self.thread = threading.Thread(target=self._probe, name="backend-probe", daemon=True)
+        self.thread.start()
+
+    def _probe(self):
+        # requests is only imported once something actually talks to the backend
+        import requests
+
+        try:
+            response = requests.get(OLLAMA_TAGS_URL, timeout=BACKEND_PROBE_TIMEOUT)
+            if response.status_code == 200:
+                data = response.json()
+                self.models = [model['name'] for model in data.get('models', [])]
+                logger.info("✓ OLLAMA service connected successfully")
+                if self.model_name in self.models:
+                    logger.info("✓ Model found: %s", self.model_name)
+                    self.status = self.ONLINE
+                    self.message = f"OLLAMA online ({self.model_name})"
+                else:
+                    logger.warning("⚠ Model not found: %s, please ensure it's downloaded", self.model_name)
+                    logger.warning("Available models: %s", self.models)
+                    self.status = self.MODEL_MISSING
+                    self.message = f"Model missing: ollama pull {self.model_name}"
+            else:
+                logger.warning("⚠ Failed to connect to OLLAMA service, please ensure it's running")
+                self.status = self.OFFLINE
+                self.message = f"OLLAMA error: HTTP {response.status_code}"
+        except Exception as e:
+            logger.warning("⚠ Unable to connect to OLLAMA service: %s", e)
+            logger.warning("Please ensure the OLLAMA service is running")
+            self.status = self.OFFLINE
+            self.message = "OLLAMA offline - start the service"
@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from LLM.GenerationScheduler import GenerationScheduler
+from LLM.OllamaAPI import OllamaAPI
+from Setting.Configuration import BACKEND_POOL_SIZE
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackendPool:
+    """
+    One LLM client shared by every dialogue session in the process.
+
+    Generations go through a GenerationScheduler that bounds concurrency on
+    the backend, orders work by priority class and rate-limits each session;
+    all of them reuse a single keep-alive HTTP connection pool, so hundreds
+    of sessions cost a bounded number of threads and sockets. Cache hits are
+    replayed on a separate thread pool and never take a backend slot.
+    """
+    INTERACTIVE = GenerationScheduler.INTERACTIVE
+    PREFETCH = GenerationScheduler.PREFETCH
+    AMBIENT = GenerationScheduler.AMBIENT
+    SUMMARY = GenerationScheduler.SUMMARY
+
+    def __init__(self, model_name, size=BACKEND_POOL_SIZE, response_cache=None,
+                 record_file=None, replay_file=None, replay_speed=1.0):
+        """
+        Args:
+            model_name (str): Model served to every session
+            size (int): Maximum concurrent generations
+            response_cache (ResponseCache): Optional cache shared by all sessions
+            record_file (str): Append every generation to this trace (SessionRecorder)
+            replay_file (str): Answer from this trace instead of OLLAMA (ReplayAPI)
+            replay_speed (float): Multiplier for the recorded chunk gaps when replaying
+        """
+        self.size = size
+        self.recording = False
+        if replay_file:
+            from LLM.ReplayAPI import ReplayAPI
+            self.api = ReplayAPI(replay_file, replay_speed)
+            self.api.model_name = self.api.model_name or model_name
+        else:
+            # requests is imported on first use to keep it off the startup path
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self.api = OllamaAPI(model_name)
+            self.api.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.api.session.mount("http://", adapter)
+            self.api.session.mount("https://", adapter)
+            if record_file:
+                from LLM.SessionRecorder import SessionRecorder
+                self.api = SessionRecorder(self.api, record_file)
+                self.recording = True
+
+        # A trace must see every generation, so cache hits are off while recording or replaying
+        if response_cache is not None and (record_file or replay_file):
+            logger.info("Response cache disabled while recording or replaying LLM sessions")
+            response_cache = None
+        self.response_cache = response_cache
+        self.scheduler = GenerationScheduler(size, name=model_name)
+        self.replay_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="llm-replay")
+
+    @property
+    def model_name(self):
+        return self.api.model_name
+
+    @property
+    def idle(self):
+        """True when nothing is running or queued"""
+        return self.scheduler.idle
+
+    def can_admit(self, session):
+        """True if the session may send another request right now"""
+        return self.scheduler.can_admit(session)
+
+    def generate(self, prompt, system_prompt, response_queue, context=None, message=None, npc_name=None,
+                 priority=INTERACTIVE, session=None, stop_event=None):
+        """
+        Queue one streamed generation
+
+        Args:
+            prompt (str): Full prompt
+            system_prompt (str): NPC system prompt
+            response_queue: Object with put(), receives ('chunk'|'done'|'error', text)
+            context (list): Conversation lines, for the response cache key
+            message (str): Player message, for the response cache key
+            npc_name (str): NPC name, for the response cache policy
+            priority (int): Scheduler priority class
+            session: Session key for rate limiting and fairness
+            stop_event (StopEvent): Set it to end the generation early, cancel it to drop the reply
+
+        Returns:
+            concurrent.futures.Future: Completes when the stream has ended
+        """
+        def reject(reason):
+            response_queue.put(('error', reason))
+
+        if self.response_cache is not None and message is not None:
+            key, chunks = self.response_cache.lookup(self.api, system_prompt, context or [], message, npc_name)
+            if chunks is not None:
+                return self.replay_executor.submit(self.response_cache.replay, chunks, response_queue)
+            return self.scheduler.submit(
+                self.response_cache.record, key, self.api, prompt, system_prompt, response_queue, stop_event,
+                self.response_cache.variants_for(npc_name), priority=priority, session=session, on_reject=reject)
+        # A trace notes the priority class, so a replay can tell player turns from background work
+        trace_args = (priority,) if self.recording else ()
+        return self.scheduler.submit(
+            self.api.generate_response_stream, prompt, system_prompt, response_queue, stop_event, *trace_args,
+            priority=priority, session=session, on_reject=reject)
+
+    def note_attached(self, system_prompt, prompt):
+        """A background (PREFETCH) reply was handed to the player; marked in the trace when recording"""
+        if self.recording:
+            self.api.note_attached(system_prompt, prompt)
+
+    def shutdown(self):
+        self.scheduler.shutdown()
+        self.replay_executor.shutdown(wait=False, cancel_futures=True)
+        if hasattr(self.api, "close"):
+            self.api.close()
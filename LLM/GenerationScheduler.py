@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from Setting.Configuration import (
+    SCHEDULER_SESSION_RATE, SCHEDULER_SESSION_BURST, SCHEDULER_RESERVED_INTERACTIVE,
+    SCHEDULER_QUEUE_BUDGETS
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class SchedulerRejected(Exception):
+    """A generation was refused at admission or shed from the queue"""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` saved up"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def peek(self):
+        """True if a token is available (without taking it)"""
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        """Take a token if one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _Job:
+    __slots__ = ("fn", "args", "priority", "session", "on_reject", "future", "enqueued")
+
+    def __init__(self, fn, args, priority, session, on_reject):
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.session = session
+        self.on_reject = on_reject
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class GenerationScheduler:
+    """
+    Central queue in front of one LLM backend.
+
+    - At most `concurrency` generations run at once; `reserved` of those
+      slots only ever run interactive replies, so a waiting player never
+      queues behind background work.
+    - Priority classes are served strictly in order (INTERACTIVE, PREFETCH,
+      AMBIENT, SUMMARY); within a class sessions take turns round-robin, so
+      one chatty session can't starve the others.
+    - Each session has a token bucket; submissions over its rate are
+      refused at admission.
+    - A job that waited longer than its class's queue budget is shed
+      instead of run (its result would be stale, and running it would only
+      push later work further back).
+
+    Jobs are plain callables run on the scheduler's worker threads.
+    submit() returns a concurrent.futures.Future; rejected and shed jobs
+    fail it with SchedulerRejected and call their on_reject callback.
+    """
+    INTERACTIVE = 0
+    PREFETCH = 1
+    AMBIENT = 2
+    SUMMARY = 3
+    PRIORITY_NAMES = ("interactive", "prefetch", "ambient", "summary")
+
+    def __init__(self, concurrency, name="llm", rate=SCHEDULER_SESSION_RATE, burst=SCHEDULER_SESSION_BURST,
+                 reserved=SCHEDULER_RESERVED_INTERACTIVE, budgets=SCHEDULER_QUEUE_BUDGETS):
+        """
+        Args:
+            concurrency (int): Maximum concurrent generations on the backend
+            name (str): Backend name for thread names and logs
+            rate (float): Requests per second each session may sustain
+            burst (int): Requests a session may make back to back
+            reserved (int): Slots kept free for interactive replies
+            budgets (dict): Priority name -> seconds a job may wait before it is shed
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.background_slots = max(1, concurrency - reserved)
+        self.rate = rate
+        self.burst = burst
+        self.budgets = [budgets.get(name, None) for name in self.PRIORITY_NAMES]
+        self.queues = [OrderedDict() for _ in self.PRIORITY_NAMES]   # session -> deque of jobs
+        self.buckets = {}                  # session -> TokenBucket
+        self.running = 0
+        self.running_background = 0
+        self.shed = [0] * len(self.PRIORITY_NAMES)
+        self.waits = [deque(maxlen=100) for _ in self.PRIORITY_NAMES]  # recent queue waits
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"{name}-sched-{i}", daemon=True)
+            for i in range(concurrency)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _bucket(self, session):
+        bucket = self.buckets.get(session)
+        if bucket is None:
+            bucket = self.buckets[session] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    @property
+    def idle(self):
+        """True when nothing is running or queued"""
+        with self.cond:
+            return self.running == 0 and not any(self.queues)
+
+    def can_admit(self, session):
+        """True if the session's rate limit would accept a submission now"""
+        if session is None:
+            return True
+        with self.cond:
+            return self._bucket(session).peek()
+
+    def submit(self, fn, *args, priority=INTERACTIVE, session=None, on_reject=None):
+        """
+        Queue a generation
+
+        Args:
+            fn: Callable run on a worker thread with *args
+            priority (int): One of INTERACTIVE, PREFETCH, AMBIENT, SUMMARY
+            session: Session key for rate limiting and fairness (None = exempt, shared queue)
+            on_reject: Optional callable(reason) for refused or shed jobs
+
+        Returns:
+            concurrent.futures.Future: Result of fn, or SchedulerRejected
+        """
+        job = _Job(fn, args, priority, session, on_reject)
+        with self.cond:
+            if self.stopped:
+                self._reject(job, "Scheduler stopped")
+                return job.future
+            if session is not None and not self._bucket(session).take():
+                self._reject(job, "Too many requests, please slow down")
+                return job.future
+            self._shed_expired()
+            queue = self.queues[priority]
+            if session not in queue:
+                queue[session] = deque()
+            queue[session].append(job)
+            self.cond.notify()
+        return job.future
+
+    def forget(self, session):
+        """Drop a finished session's rate limiter"""
+        with self.cond:
+            self.buckets.pop(session, None)
+
+    def _reject(self, job, reason):
+        if not job.future.set_running_or_notify_cancel():
+            return  # cancelled by the caller; nobody is waiting
+        job.future.set_exception(SchedulerRejected(reason))
+        if job.on_reject is not None:
+            job.on_reject(reason)
+
+    def _expired(self, job, now):
+        budget = self.budgets[job.priority]
+        return budget is not None and now - job.enqueued > budget
+
+    def _shed(self, job, now):
+        self.shed[job.priority] += 1
+        logger.warning("Shedding queued generation", extra={"fields": {
+            "backend": self.name, "class": self.PRIORITY_NAMES[job.priority],
+            "waited_s": round(now - job.enqueued, 2)}})
+        self._reject(job, "The server is busy, please try again")
+
+    def _shed_expired(self):
+        """Fail every queued job that is over its budget, so callers hear back promptly"""
+        now = time.monotonic()
+        for queue in self.queues:
+            for session in list(queue):
+                jobs = queue[session]
+                while jobs and self._expired(jobs[0], now):
+                    self._shed(jobs.popleft(), now)
+                if not jobs:
+                    del queue[session]
+
+    def _next_job(self):
+        """Pop the next runnable job (called with the lock held)"""
+        now = time.monotonic()
+        for priority, queue in enumerate(self.queues):
+            if priority != self.INTERACTIVE and self.running_background >= self.background_slots:
+                return None
+            while queue:
+                # Round-robin: take the head session's oldest job, move the session to the back
+                session, jobs = queue.popitem(last=False)
+                job = jobs.popleft()
+                if jobs:
+                    queue[session] = jobs
+                if job.future.cancelled():
+                    continue
+                if self._expired(job, now):
+                    self._shed(job, now)
+                    continue
+                self.waits[priority].append(now - job.enqueued)
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                job = None
+                while not self.stopped:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self.cond.wait()
+                if job is None:
+                    return
+                self.running += 1
+                background = job.priority != self.INTERACTIVE
+                if background:
+                    self.running_background += 1
+
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args))
+                except Exception as e:
+                    logger.exception("Generation job failed")
+                    job.future.set_exception(e)
+
+            with self.cond:
+                self.running -= 1
+                if background:
+                    self.running_background -= 1
+                self.cond.notify_all()
+
+    def stats(self):
+        """Queue depth, mean recent wait and shed count per priority class"""
+        with self.cond:
+            return {
+                "running": self.running,
+                "classes": {
+                    name: {
+                        "queued": sum(len(jobs) for jobs in self.queues[i].values()),
+                        "mean_wait_s": round(sum(self.waits[i]) / len(self.waits[i]), 3) if self.waits[i] else 0.0,
+                        "shed": self.shed[i],
+                    }
+                    for i, name in enumerate(self.PRIORITY_NAMES)
+                },
+            }
+
+    def shutdown(self):
+        """Stop the workers and refuse everything still queued"""
+        with self.cond:
+            self.stopped = True
+            for queue in self.queues:
+                for jobs in queue.values():
+                    for job in jobs:
+                        self._reject(job, "Scheduler stopped")
+                queue.clear()
+            self.cond.notify_all()
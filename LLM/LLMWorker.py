@@ -0,0 +1,434 @@
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future
+
+from LLM.GenerationScheduler import GenerationScheduler, TokenBucket
+from LLM.ReplyStream import ReplyStream
+from LLM.StopEvent import StopEvent
+from Setting.Configuration import (
+    LOCAL_BACKEND_CONCURRENCY, SCHEDULER_SESSION_RATE, SCHEDULER_SESSION_BURST,
+    WORKER_FLUSH_INTERVAL, WORKER_START_TIMEOUT, WORKER_HEALTH_INTERVAL, WORKER_HEALTH_TIMEOUT,
+    WORKER_RESTART_DELAY, WORKER_RESTART_DELAY_MAX
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# Messages on the pipe (tuples, pickled by multiprocessing):
+#   game -> worker: ('generate', id, prompt, system, context, message, npc_name, priority, parsed)
+#                   ('stop', id)  ('cancel', id)  ('attached', system, prompt)  ('ping', stamp)  ('shutdown',)
+#   worker -> game: ('ready', pid)  ('pong', stamp, idle)  ('event', id, msg_type, content)
+TERMINAL_EVENTS = ('final', 'done', 'error')
+
+
+# Worker process side
+
+class _ParsingSink:
+    """
+    Response queue for a reply the game displays: chunks are parsed here
+    and only display text, actions and the final (reply, thoughts) cross
+    the pipe. Text updates are coalesced and sent by the flusher, as
+    ('text', (offset, text, think_removed)) meaning "the display text from
+    offset on is now text".
+    """
+    def __init__(self, worker, request_id, stop_event):
+        self.worker = worker
+        self.request_id = request_id
+        self.stop_event = stop_event
+        self.stream = ReplyStream()
+        self.shown = 0           # length of the display text as of the last update
+        self.start = None        # offset the pending update replaces from, None when nothing is pending
+        self.pending = ""
+        self.ended = False
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        msg_type, content = item
+        with self.lock:
+            if self.ended:
+                return
+            if msg_type == 'chunk':
+                display, actions = self.stream.feed(content)
+                start = self.stream.changed_from
+                if start < len(display) or len(display) != self.shown:
+                    self._queue(start, display[start:])
+                    self.shown = len(display)
+                if actions:
+                    self._flush()
+                    for action in actions:
+                        self.worker.send_event(self.request_id, 'action', action)
+                if self.stream.complete:
+                    self.stop_event.set()
+                return
+            self._flush()
+            self.ended = True
+            if msg_type == 'done':
+                self.worker.send_event(self.request_id, 'final', self.stream.finish())
+            else:
+                self.worker.send_event(self.request_id, msg_type, content)
+
+    def _queue(self, start, text):
+        if self.start is not None and start >= self.start:
+            self.pending = self.pending[:start - self.start] + text
+        else:
+            self.start, self.pending = start, text
+
+    def _flush(self):
+        if self.start is not None:
+            self.worker.send_event(self.request_id, 'text', (self.start, self.pending, self.stream.think_removed))
+            self.start, self.pending = None, ""
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+
+class _OutcomeSink:
+    """Response queue for background requests: only ('done'|'error', text) is sent back"""
+    def __init__(self, worker, request_id):
+        self.worker = worker
+        self.request_id = request_id
+        self.ended = False
+
+    def put(self, item):
+        msg_type, content = item
+        if msg_type != 'chunk' and not self.ended:
+            self.ended = True
+            self.worker.send_event(self.request_id, msg_type, content)
+
+    def flush(self):
+        pass
+
+
+class _WorkerServer:
+    """Runs in the worker process: a BackendPool driven by requests from the pipe"""
+    def __init__(self, conn, pool):
+        self.conn = conn
+        self.pool = pool
+        self.send_lock = threading.Lock()
+        self.sinks = {}           # request id -> sink
+        self.stop_events = {}     # request id -> StopEvent
+        self.lock = threading.Lock()
+        self.running = True
+
+    def send(self, message):
+        with self.send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, ValueError):
+                self.running = False   # the game went away
+
+    def send_event(self, request_id, msg_type, content):
+        self.send(('event', request_id, msg_type, content))
+
+    def _flush_loop(self):
+        while self.running:
+            time.sleep(WORKER_FLUSH_INTERVAL)
+            with self.lock:
+                sinks = list(self.sinks.values())
+            for sink in sinks:
+                sink.flush()
+
+    def _generate(self, request_id, prompt, system_prompt, context, message, npc_name, priority, parsed):
+        stop_event = StopEvent()
+        sink = _ParsingSink(self, request_id, stop_event) if parsed else _OutcomeSink(self, request_id)
+        with self.lock:
+            self.sinks[request_id] = sink
+            self.stop_events[request_id] = stop_event
+        future = self.pool.generate(prompt, system_prompt, sink, context=context, message=message,
+                                    npc_name=npc_name, priority=priority, stop_event=stop_event)
+        future.add_done_callback(lambda _: self._finished(request_id, sink))
+
+    def _finished(self, request_id, sink):
+        # Every request gets exactly one terminal event, even if its job was dropped
+        sink.put(('error', 'Generation did not complete'))
+        with self.lock:
+            self.sinks.pop(request_id, None)
+            self.stop_events.pop(request_id, None)
+
+    def run(self):
+        threading.Thread(target=self._flush_loop, name="llm-worker-flush", daemon=True).start()
+        self.send(('ready', multiprocessing.current_process().pid))
+        while self.running:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            op = message[0]
+            if op == 'generate':
+                self._generate(*message[1:])
+            elif op in ('stop', 'cancel'):
+                with self.lock:
+                    stop_event = self.stop_events.get(message[1])
+                if stop_event is not None and op == 'cancel':
+                    stop_event.cancel()
+                elif stop_event is not None:
+                    stop_event.set()
+            elif op == 'attached':
+                self.pool.note_attached(*message[1:])
+            elif op == 'ping':
+                self.send(('pong', message[1], self.pool.idle))
+            elif op == 'shutdown':
+                break
+        self.running = False
+        self.pool.shutdown()
+
+
+def _serve(conn, model_name, size, response_cache_enabled, trace_options):
+    """Entry point of the worker process"""
+    from LLM.BackendPool import BackendPool
+    response_cache = None
+    if response_cache_enabled:
+        from LLM.ResponseCache import ResponseCache
+        response_cache = ResponseCache()
+    pool = BackendPool(model_name, size, response_cache, **trace_options)
+    logger.info("LLM worker ready", extra={"fields": {"model": model_name, "concurrency": size}})
+    _WorkerServer(conn, pool).run()
+
+
+# Game process side
+
+class _Request:
+    __slots__ = ("queue", "future", "stop_event", "stop_sent")
+
+    def __init__(self, response_queue, future, stop_event):
+        self.queue = response_queue
+        self.future = future
+        self.stop_event = stop_event
+        self.stop_sent = False
+
+
+class LLMWorker:
+    """
+    Game-side handle on an LLM client running in a separate process.
+
+    The worker process owns the HTTP connection, JSON decoding, the
+    scheduler, the response cache and, for replies the player watches,
+    action and <think> parsing. Back over a pipe come only finished display
+    text updates (coalesced to about one per frame), actions and the final
+    reply, so the game process does no per-token work and its GIL is left
+    to update and draw.
+
+    Stands in for BackendPool (generate, can_admit, idle, shutdown). A
+    monitor thread pings the worker, forwards cancellations and restarts
+    the process if it dies or stops answering; requests in flight at that
+    moment fail with an error message.
+    """
+    parses_replies = True   # DialogueSystem asks for parsed events
+
+    INTERACTIVE = GenerationScheduler.INTERACTIVE
+    PREFETCH = GenerationScheduler.PREFETCH
+    AMBIENT = GenerationScheduler.AMBIENT
+    SUMMARY = GenerationScheduler.SUMMARY
+
+    def __init__(self, model_name, size=LOCAL_BACKEND_CONCURRENCY, response_cache_enabled=True,
+                 record_file=None, replay_file=None, replay_speed=1.0):
+        """
+        Args:
+            model_name (str): Model to generate with
+            size (int): Maximum concurrent generations in the worker
+            response_cache_enabled (bool): Open the response cache in the worker
+            record_file (str): Record generations to this trace (in the worker)
+            replay_file (str): Replay generations from this trace (in the worker)
+            replay_speed (float): Multiplier for recorded chunk gaps when replaying
+        """
+        self.model_name = model_name
+        self.size = size
+        self.response_cache_enabled = response_cache_enabled
+        self.trace_options = {"record_file": record_file, "replay_file": replay_file,
+                              "replay_speed": replay_speed}
+        self.pending = {}                   # request id -> _Request
+        self.request_ids = itertools.count(1)
+        self.buckets = {}                   # session -> TokenBucket (rate limits are enforced here)
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.process = None
+        self.conn = None
+        self.worker_idle = True
+        self.last_pong = 0.0
+        self.failures = 0
+        self.closed = False
+        self.monitor_thread = None
+
+    def start(self):
+        """Spawn the worker and wait until it is ready (raises RuntimeError if it is not)"""
+        self._spawn()
+        self.monitor_thread = threading.Thread(target=self._monitor_loop, name="llm-worker-monitor", daemon=True)
+        self.monitor_thread.start()
+        return self
+
+    def _spawn(self):
+        # spawn, not fork: the game process has SDL and several threads running
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_serve, name="llm-worker", daemon=True,
+            args=(child_conn, self.model_name, self.size, self.response_cache_enabled, self.trace_options))
+        process.start()
+        child_conn.close()
+        if not parent_conn.poll(WORKER_START_TIMEOUT):
+            process.terminate()
+            parent_conn.close()
+            raise RuntimeError("LLM worker did not start")
+        try:
+            _, pid = parent_conn.recv()
+        except (EOFError, OSError):
+            parent_conn.close()
+            raise RuntimeError("LLM worker exited during startup")
+        self.process, self.conn = process, parent_conn
+        self.last_pong = time.monotonic()
+        threading.Thread(target=self._read_loop, args=(parent_conn,), name="llm-worker-reader",
+                         daemon=True).start()
+        logger.info("LLM worker started", extra={"fields": {"pid": pid}})
+
+    def _send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+    def _read_loop(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return
+            if message[0] == 'event':
+                _, request_id, msg_type, content = message
+                with self.lock:
+                    request = self.pending.get(request_id)
+                    if request is not None and msg_type in TERMINAL_EVENTS:
+                        del self.pending[request_id]
+                if request is None:
+                    continue
+                request.queue.put((msg_type, content))
+                if msg_type in TERMINAL_EVENTS:
+                    request.future.set_result(None)
+            elif message[0] == 'pong':
+                self.last_pong = time.monotonic()
+                self.worker_idle = message[2]
+
+    def _monitor_loop(self):
+        next_ping = 0.0
+        while not self.closed:
+            time.sleep(0.05)
+            now = time.monotonic()
+            try:
+                with self.lock:
+                    stops = [(request_id, request) for request_id, request in self.pending.items()
+                             if request.stop_event is not None and request.stop_event.is_set()
+                             and not request.stop_sent]
+                    # A cancelled request is over here and now: whatever the worker still sends is dropped
+                    for request_id, request in stops:
+                        if request.stop_event.cancelled:
+                            del self.pending[request_id]
+                for request_id, request in stops:
+                    request.stop_sent = True
+                    if request.stop_event.cancelled:
+                        request.future.set_result(None)
+                        self._send(('cancel', request_id))
+                    else:
+                        self._send(('stop', request_id))
+                if now >= next_ping:
+                    next_ping = now + WORKER_HEALTH_INTERVAL
+                    self._send(('ping', now))
+                healthy = self.process.is_alive() and now - self.last_pong < WORKER_HEALTH_TIMEOUT
+            except (OSError, ValueError):
+                healthy = False
+            if healthy:
+                self.failures = 0
+            elif not self.closed:
+                self._restart()
+
+    def _restart(self):
+        self.failures += 1
+        logger.warning("LLM worker is not responding, restarting", extra={"fields": {
+            "exitcode": self.process.exitcode, "attempt": self.failures}})
+        with self.lock:
+            failed, self.pending = self.pending, {}
+        for request in failed.values():
+            request.queue.put(('error', 'LLM worker restarted'))
+            request.future.set_result(None)
+        self._stop_process()
+        time.sleep(min(WORKER_RESTART_DELAY * 2 ** (self.failures - 1), WORKER_RESTART_DELAY_MAX))
+        if self.closed:
+            return
+        try:
+            self._spawn()
+        except RuntimeError as e:
+            logger.error("LLM worker restart failed: %s", e)
+
+    def _stop_process(self):
+        self.conn.close()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2)
+
+    @property
+    def idle(self):
+        """True when no generation is in flight"""
+        return not self.pending and self.worker_idle
+
+    def can_admit(self, session):
+        """True if the session's rate limit would accept a request now"""
+        if session is None:
+            return True
+        with self.lock:
+            return self._bucket(session).peek()
+
+    def _bucket(self, session):
+        bucket = self.buckets.get(session)
+        if bucket is None:
+            bucket = self.buckets[session] = TokenBucket(SCHEDULER_SESSION_RATE, SCHEDULER_SESSION_BURST)
+        return bucket
+
+    def generate(self, prompt, system_prompt, response_queue, context=None, message=None, npc_name=None,
+                 priority=INTERACTIVE, session=None, stop_event=None, parsed=False):
+        """
+        Queue one generation in the worker (same arguments as BackendPool.generate)
+
+        Args:
+            parsed (bool): Send ('text' | 'action' | 'final' | 'error') events for display
+                instead of the stream; without it only ('done'|'error', text) arrives
+
+        Returns:
+            concurrent.futures.Future: Completes when the request has ended
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self.lock:
+            admitted = session is None or self._bucket(session).take()
+            request_id = next(self.request_ids)
+            if admitted:
+                self.pending[request_id] = _Request(response_queue, future, stop_event)
+        if not admitted:
+            response_queue.put(('error', "Too many requests, please slow down"))
+            future.set_result(None)
+            return future
+        try:
+            self._send(('generate', request_id, prompt, system_prompt, context, message, npc_name,
+                        priority, parsed))
+        except (OSError, ValueError):
+            with self.lock:
+                self.pending.pop(request_id, None)
+            response_queue.put(('error', 'LLM worker unavailable'))
+            future.set_result(None)
+        return future
+
+    def note_attached(self, system_prompt, prompt):
+        """Same as BackendPool.note_attached (the trace is recorded in the worker)"""
+        try:
+            self._send(('attached', system_prompt, prompt))
+        except (OSError, ValueError):
+            pass
+
+    def shutdown(self):
+        self.closed = True
+        if self.conn is None:
+            return
+        try:
+            self._send(('shutdown',))
+        except (OSError, ValueError):
+            pass
+        self._stop_process()
@@ -1,7 +1,12 @@
-import requests
 import json
+import os
 import queue
 
+from Setting.Configuration import GENERATION_PROFILE_FILE
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
 
 class OllamaAPI:
     """OLLAMA API interface class"""
@@ -19,9 +24,51 @@ class OllamaAPI:
         """
         self.model_name = model_name
         self.url = self.OLLAMA_URL
-        print(f"Initializing OLLAMA API with model: {self.model_name}")
+        self.options = {
+            "temperature": 0.7,    # Controls randomness (higher = more creative)
+            "top_p": 0.9,          # Nucleus sampling threshold
+            "repeat_penalty": 1.1  # Reduce repetition
+        }
+        self.keep_alive = None  # How long OLLAMA keeps the model loaded (server default when None)
+        self.session = None  # Optional requests.Session shared by pooled callers
+        logger.info("Initializing OLLAMA API with model: %s", self.model_name)
+        
+        # Host-specific options written by `main.py --tune`
+        profile = self.load_profile(model_name)
+        if profile:
+            self.options.update(profile.get("options", {}))
+            self.keep_alive = profile.get("keep_alive")
+            logger.info("Using generation profile", extra={"fields": {
+                "options": self.options, "keep_alive": self.keep_alive}})
 
-    def generate_response_stream(self, prompt: str, system_prompt: str, response_queue: queue.Queue):
+    @staticmethod
+    def load_profile(model_name, path=None):
+        """
+        Read the generation profile for a model
+        
+        Args:
+            model_name (str): Model the profile must have been tuned for
+            path (str): Profile file (default: LLMRPG_GENERATION_PROFILE or GENERATION_PROFILE_FILE)
+            
+        Returns:
+            dict: The profile, or None if there is none for this model
+        """
+        path = path or os.environ.get("LLMRPG_GENERATION_PROFILE", GENERATION_PROFILE_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable generation profile %s: %s", path, e)
+            return None
+        if profile.get("model") != model_name:
+            logger.info("Generation profile %s was tuned for %s, not %s", path, profile.get("model"), model_name)
+            return None
+        return profile
+
+    def generate_response_stream(self, prompt: str, system_prompt: str, response_queue: queue.Queue,
+                                 stop_event=None):
         """
         Streamed call to OLLAMA API to generate responses - with Chinese encoding support
         
@@ -29,9 +76,18 @@ class OllamaAPI:
             prompt (str): User input prompt
             system_prompt (str): System-level instruction/prompt
             response_queue (queue.Queue): Thread-safe queue to send response chunks
+            stop_event (StopEvent): Optional; once set, the stream is closed
+                and what arrived so far is sent as the final response; once
+                cancelled, it is closed and nothing more is sent
         """
+        # requests is imported on first use to keep it off the startup path
+        import requests
+
+        if stop_event is not None and stop_event.cancelled:
+            return  # Dropped while it waited for a slot
+
         try:
-            print(f"Sending streaming request to OLLAMA (Model: {self.model_name})")
+            logger.info("Sending streaming request to OLLAMA (Model: %s)", self.model_name)
             
             # Prepare the request payload
             payload = {
@@ -39,15 +95,14 @@ class OllamaAPI:
                 "prompt": prompt,
                 "system": system_prompt,
                 "stream": True,  # Enable streaming response
-                "options": {
-                    "temperature": 0.7,    # Controls randomness (higher = more creative)
-                    "top_p": 0.9,          # Nucleus sampling threshold
-                    "repeat_penalty": 1.1  # Reduce repetition
-                }
+                "options": self.options
             }
+            if self.keep_alive is not None:
+                payload["keep_alive"] = self.keep_alive
 
             # Make POST request with proper headers and streaming enabled
-            response = requests.post(
+            http = self.session or requests
+            response = http.post(
                 self.url,
                 json=payload,
                 timeout=120,  # 2-minute timeout
@@ -65,12 +120,23 @@ class OllamaAPI:
                             
                             # If response chunk is received, add to output
                             if 'response' in data:
+                                # Nobody is waiting for this reply any more: stop without a result
+                                if stop_event is not None and stop_event.cancelled:
+                                    response.close()
+                                    break
                                 chunk = data['response']
                                 full_response += chunk
                                 response_queue.put(('chunk', chunk))
+                                
+                                # The caller has everything it needs: stop generating
+                                if stop_event is not None and stop_event.is_set():
+                                    response.close()
+                                    response_queue.put(('done', full_response))
+                                    break
                             
                             # If generation is complete, send final message
-                            elif 'done' in data and data['done']:
+                            # (OLLAMA's last line carries an empty 'response' as well)
+                            if data.get('done'):
                                 response_queue.put(('done', full_response))
                                 break
                                 
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+
+from Setting.Configuration import PERSONALITY_DIR, PERSONALITY_DEFAULT, PERSONALITY_RELOAD_INTERVAL
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+SHARED_FILE = "_shared.json"
+
+
+class CompiledPersonality:
+    """
+    A personality compiled into a fixed prompt prefix plus a short per-NPC
+    suffix template. Every NPC of the archetype shares the prefix byte for
+    byte, so the backend's prompt-prefix cache can be reused across them.
+    """
+    def __init__(self, name, prefix, npc_template):
+        self.name = name
+        self.prefix = prefix
+        self.npc_template = npc_template
+
+    def render(self, **variables):
+        """Full system prompt for one NPC (variables: name, character_type)"""
+        return self.prefix + self.npc_template.format_map(variables)
+
+
+class PersonalityRegistry:
+    """
+    Personalities loaded from PERSONALITY_DIR and compiled once.
+
+    Prompt layout, most shared first:
+        _shared.json instructions   (identical for every NPC)
+        <personality>.json          (identical for every NPC of the archetype)
+        npc_template                (name and other per-NPC variables, last)
+
+    Files are re-read when their modification times change (checked at most
+    every PERSONALITY_RELOAD_INTERVAL seconds on access); a file that fails
+    to load or compile keeps the previous version.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, directory=PERSONALITY_DIR):
+        self.directory = directory
+        self.personalities = {}   # name -> CompiledPersonality
+        self.prompts = {}         # (personality, name, character_type) -> rendered prompt
+        self.mtimes = {}
+        self.next_check = 0.0
+        self.lock = threading.RLock()
+        self.reload()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide registry"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _scan(self):
+        """File name -> mtime for every personality file"""
+        try:
+            return {entry.name: entry.stat().st_mtime for entry in os.scandir(self.directory)
+                    if entry.name.endswith(".json")}
+        except OSError as e:
+            logger.error("Cannot read personality directory %s: %s", self.directory, e)
+            return {}
+
+    def _read(self, file_name):
+        with open(os.path.join(self.directory, file_name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def reload(self):
+        """Load and compile every personality file"""
+        with self.lock:
+            mtimes = self._scan()
+            try:
+                shared = self._read(SHARED_FILE)
+            except (OSError, ValueError) as e:
+                logger.error("Cannot load %s: %s", SHARED_FILE, e)
+                shared = {}
+            shared_block = "".join(line + "\n" for line in shared.get("instructions", []))
+            default_template = shared.get("npc_template", "Your name is {name}.")
+
+            personalities = {}
+            for file_name in sorted(mtimes):
+                if file_name == SHARED_FILE:
+                    continue
+                name = os.path.splitext(file_name)[0]
+                try:
+                    data = self._read(file_name)
+                    compiled = CompiledPersonality(
+                        name,
+                        shared_block + "".join(line + "\n" for line in data["instructions"]),
+                        data.get("npc_template", default_template))
+                    compiled.render(name="", character_type="")  # reject unknown placeholders now
+                except (OSError, ValueError, KeyError, IndexError) as e:
+                    logger.error("Cannot load personality %s: %s", file_name, e)
+                    if name in self.personalities:
+                        personalities[name] = self.personalities[name]
+                    continue
+                personalities[name] = compiled
+
+            if self.personalities:
+                logger.info("Personalities reloaded", extra={"fields": {"count": len(personalities)}})
+            self.personalities = personalities
+            self.prompts = {}
+            self.mtimes = mtimes
+            self.next_check = time.monotonic() + PERSONALITY_RELOAD_INTERVAL
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + PERSONALITY_RELOAD_INTERVAL
+        if self._scan() != self.mtimes:
+            self.reload()
+
+    def names(self):
+        """Names of every loaded personality"""
+        with self.lock:
+            self._maybe_reload()
+            return sorted(self.personalities)
+
+    def get(self, personality):
+        """CompiledPersonality by name, falling back to PERSONALITY_DEFAULT"""
+        with self.lock:
+            self._maybe_reload()
+            return self.personalities.get(personality) or self.personalities.get(PERSONALITY_DEFAULT)
+
+    def prompt(self, personality, name, character_type="human"):
+        """
+        System prompt for one NPC
+
+        Args:
+            personality (str): Personality name
+            name (str): NPC name
+            character_type (str): NPC character type
+
+        Returns:
+            str: Rendered prompt (memoised until the next reload)
+        """
+        with self.lock:
+            self._maybe_reload()
+            key = (personality, name, character_type)
+            prompt = self.prompts.get(key)
+            if prompt is None:
+                compiled = self.get(personality)
+                if compiled is None:
+                    return f"You are an NPC named {name}."
+                prompt = self.prompts[key] = compiled.render(name=name, character_type=character_type)
+            return prompt
@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import random
+import re
+import struct
+import zlib
+
+from Setting.Configuration import PREGEN_DIALOGUE_FILE
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# File layout (all integers little-endian):
+#   header  MAGIC, version (u16), record count (u32), index offset (u64)
+#   records zlib-compressed UTF-8 reply variants separated by RECORD_SEPARATOR, back to back
+#   index   one entry per record, sorted by key: sha1 digest, offset (u64), length (u32)
+MAGIC = b"LRPGDLG\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sHIQ")
+_ENTRY = struct.Struct("<20sQI")
+RECORD_SEPARATOR = "\x1e"
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?。！？]+$")
+
+
+class PregenDialogue:
+    """
+    Read-only dialogue file written by `main.py --pregen` (Init/DialoguePregen.py).
+
+    Replies are keyed by NPC name and player message. The file is memory
+    mapped and only its fixed-width index is searched, so a lookup is a
+    binary search plus one small decompression, cheap enough for the
+    frame that sends the message.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): File written by PregenDialogue.write
+
+        Raises:
+            ValueError: The file is not a dialogue file of this version
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.count, self.index_offset = _HEADER.unpack_from(self.data, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} dialogue file")
+        except Exception:
+            self.file.close()
+            raise
+        self.hits = 0
+
+    @classmethod
+    def open_default(cls):
+        """
+        Open LLMRPG_PREGEN_FILE or PREGEN_DIALOGUE_FILE if it exists
+
+        Returns:
+            PregenDialogue or None
+        """
+        path = os.environ.get("LLMRPG_PREGEN_FILE", PREGEN_DIALOGUE_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            dialogue = cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring unreadable dialogue file %s: %s", path, e)
+            return None
+        logger.info("Pre-generated dialogue loaded", extra={"fields": {"path": path, "keys": dialogue.count}})
+        return dialogue
+
+    @staticmethod
+    def normalise(text):
+        """Lower-case, collapse whitespace and drop trailing punctuation"""
+        return _TRAILING_PUNCTUATION.sub("", re.sub(r"\s+", " ", text).strip().lower())
+
+    @classmethod
+    def key(cls, npc_name, message):
+        """20-byte key of an NPC's reply to a player message"""
+        material = f"{cls.normalise(npc_name)}\n{cls.normalise(message)}"
+        return hashlib.sha1(material.encode("utf-8")).digest()
+
+    def _find(self, key):
+        """(offset, length) of a key's record, by binary search over the index"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, offset, length = _ENTRY.unpack_from(self.data, self.index_offset + middle * _ENTRY.size)
+            if entry_key == key:
+                return offset, length
+            if entry_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def variants(self, npc_name, message):
+        """Every stored reply of an NPC to a message (empty list if there are none)"""
+        found = self._find(self.key(npc_name, message))
+        if found is None:
+            return []
+        offset, length = found
+        return _decode(self.data[offset:offset + length])
+
+    def lookup(self, npc_name, message):
+        """
+        Pick one stored reply
+
+        Returns:
+            str: Reply text (may contain action tags), or None on a miss
+        """
+        variants = self.variants(npc_name, message)
+        if not variants:
+            return None
+        self.hits += 1
+        logger.debug("Pre-generated reply", extra={"fields": {"npc": npc_name, "variants": len(variants)}})
+        return random.choice(variants)
+
+    @staticmethod
+    def replay(reply, response_queue):
+        """Send a stored reply the way a finished stream would end"""
+        response_queue.put(('chunk', reply))
+        response_queue.put(('done', reply))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    @staticmethod
+    def write(path, replies):
+        """
+        Write a dialogue file atomically
+
+        Args:
+            path (str): Destination
+            replies (dict): key (bytes from PregenDialogue.key) -> list of reply strings
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp"
+        index = []
+        with open(temporary, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            for key in sorted(replies):
+                record = _encode(replies[key])
+                index.append((key, f.tell(), len(record)))
+                f.write(record)
+            index_offset = f.tell()
+            for entry in index:
+                f.write(_ENTRY.pack(*entry))
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, len(index), index_offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+
+def _encode(variants):
+    return zlib.compress(RECORD_SEPARATOR.join(variants).encode("utf-8"), 9)
+
+
+def _decode(record):
+    return zlib.decompress(record).decode("utf-8").split(RECORD_SEPARATOR)
@@ -0,0 +1,136 @@
+import re
+
+from LLM.ActionStreamParser import ActionStreamParser
+
+# Leading "1.", "2)", "-" or "*" the model adds despite being asked not to
+_LIST_MARKER = re.compile(r'^\s*(?:\d+[.)]|[-*•])\s*')
+_QUOTES = '"\'“”'
+
+
+class PromptBuilder:
+    """Builds the dialogue prompt sent to the model (shared by the game and the server)"""
+
+    HISTORY_TURNS = 10  # Use recent history only (last 10 messages)
+    SUGGESTION_SYSTEM_PROMPT = ("You help the player of a role-playing game set in an office "
+                                "by suggesting what they could say next.")
+
+    @classmethod
+    def recent_history(cls, conversation_history):
+        """Return the slice of history that goes into the prompt"""
+        return conversation_history[-cls.HISTORY_TURNS:]
+
+    @classmethod
+    def build(cls, conversation_history, npc_name, user_message):
+        """
+        Build the completion prompt for one player message
+
+        Args:
+            conversation_history (list): Conversation lines so far
+            npc_name (str): Name of the NPC answering
+            user_message (str): Player message
+
+        Returns:
+            str: Prompt ending with the NPC's name, ready for the model to continue
+        """
+        conversation_context = "\n".join(cls.recent_history(conversation_history))
+        return f"{conversation_context}\nPlayer: {user_message}\n{npc_name}: "
+
+    @staticmethod
+    def build_ambient(npc_name, count):
+        """
+        Build the prompt asking for a batch of ambient lines (barks)
+
+        Args:
+            npc_name (str): NPC the lines are for
+            count (int): Number of lines wanted
+
+        Returns:
+            str: Prompt; the reply has one line per bark
+        """
+        return (f"Write {count} different short things {npc_name} might say out loud "
+                "while going about their day in the office, when nobody is talking to them. "
+                "One per line, at most 12 words each, no numbering, no quotes, no names.")
+
+    @classmethod
+    def build_suggestions(cls, conversation_history, npc_name, count):
+        """
+        Build the prompt asking for likely next player lines (sent with SUGGESTION_SYSTEM_PROMPT)
+
+        Args:
+            conversation_history (list): Conversation lines so far
+            npc_name (str): NPC the player is talking to
+            count (int): Number of suggestions wanted
+
+        Returns:
+            str: Prompt; the reply has one suggestion per line
+        """
+        conversation_context = "\n".join(cls.recent_history(conversation_history))
+        return (f"{conversation_context}\n\n"
+                f"Write {count} different short things the Player might say next to {npc_name}. "
+                "One per line, at most 12 words each, no numbering, no quotes, no names.")
+
+    @staticmethod
+    def split_lines(text):
+        """
+        Lines of a one-per-line batch reply (ambient lines, suggestions)
+
+        Args:
+            text (str): Complete reply
+
+        Returns:
+            list: Non-empty lines without thoughts, action tags, list markers or quotes
+        """
+        text = PromptBuilder.remove_think_tags(ActionStreamParser.strip(text))
+        lines = []
+        for line in text.splitlines():
+            line = _LIST_MARKER.sub("", line).strip().strip(_QUOTES).strip()
+            if line:
+                lines.append(line)
+        return lines
+
+    @staticmethod
+    def extract_thoughts(text):
+        """
+        Content of the complete <think>...</think> blocks in text
+
+        Args:
+            text (str): Raw reply
+
+        Returns:
+            str: Thought text, blocks separated by newlines
+        """
+        thoughts = []
+        end_idx = 0
+        while True:
+            start_idx = text.find("<think>", end_idx)
+            end_idx = text.find("</think>", start_idx + 7)
+            if start_idx < 0 or end_idx < 0:
+                break
+            thoughts.append(text[start_idx + 7:end_idx].strip())
+        return "\n".join(thought for thought in thoughts if thought)
+
+    @staticmethod
+    def remove_think_tags(text):
+        """
+        Remove <think> tags from text, replacing them with thinking indicators
+
+        Args:
+            text (str): Text containing <think> tags
+
+        Returns:
+            str: Cleaned text
+        """
+        result = text
+        # Remove all <think>...</think> blocks
+        while "<think>" in result and "</think>" in result:
+            start_idx = result.find("<think>")
+            end_idx = result.find("</think>") + 8
+            if start_idx >= 0 and end_idx > start_idx:
+                result = result[:start_idx] + result[end_idx:]
+            else:
+                break
+
+        # Replace remaining tags
+        result = result.replace("</think>", "")
+        result = result.replace("<think>", "Thinking...")
+        return result.strip()
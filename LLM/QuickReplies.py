@@ -0,0 +1,185 @@
+import threading
+
+from LLM.PromptBuilder import PromptBuilder
+from LLM.StopEvent import StopEvent
+from Setting.Configuration import QUICK_REPLY_COUNT, QUICK_REPLY_MAX_CHARS
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Speculation:
+    """
+    Response queue for a background generation: buffers the stream until
+    the player picks it, then hands what arrived (and everything after) to
+    the dialogue's queue.
+    """
+    def __init__(self, text=None):
+        self.text = text                  # suggested player line (None for the suggestion request)
+        self.system_prompt = None         # what it was generated from (for the session trace)
+        self.prompt = None
+        self.stop_event = StopEvent()
+        self.future = None
+        self.chunks = []
+        self.outcome = None               # ('done' | 'error', text) once finished
+        self.target = None                # dialogue queue after attach()
+        self.forwarded = False            # a chunk has reached the target
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        with self.lock:
+            if self.stop_event.cancelled:
+                return
+            if self.target is None:
+                if item[0] == 'chunk':
+                    self.chunks.append(item[1])
+                else:
+                    self.outcome = item
+                return
+            if item[0] == 'chunk':
+                self.forwarded = True
+            elif item[0] == 'done' and not self.forwarded:
+                # Backends that only report the outcome (LLMWorker) send no chunks
+                self.target.put(('chunk', item[1]))
+            self.target.put(item)
+
+    @property
+    def ready(self):
+        """The answer is complete"""
+        return self.outcome is not None and self.outcome[0] == 'done'
+
+    @property
+    def failed(self):
+        return self.outcome is not None and self.outcome[0] == 'error'
+
+    def attach(self, target):
+        """Send this generation's reply to target: at once if complete, as it streams otherwise"""
+        with self.lock:
+            self.target = target
+            if self.ready:
+                target.put(('chunk', self.outcome[1]))
+                target.put(self.outcome)
+                return
+            for chunk in self.chunks:
+                target.put(('chunk', chunk))
+            self.forwarded = bool(self.chunks)
+            self.chunks = []
+
+    def cancel(self):
+        self.stop_event.cancel()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class QuickReplies:
+    """
+    Suggested player replies with speculatively generated NPC answers.
+
+    After each NPC answer propose() asks the backend for a few likely
+    player lines, then generates the NPC's reply to each of them, all at
+    PREFETCH priority so they only use background slots. When the player
+    sends one of the lines, its answer is attached to the dialogue and
+    shows at once (or continues streaming if it is not finished yet).
+    Typing anything the line does not start with cancels that line's
+    generation, queued or running.
+    """
+    def __init__(self, backend, count=QUICK_REPLY_COUNT):
+        """
+        Args:
+            backend (BackendPool | LLMWorker): Backend the speculations run on
+            count (int): Suggestions per round
+        """
+        self.backend = backend
+        self.count = count
+        self.suggestions = []     # _Speculation per suggested line, in display order
+        self.request = None       # the pending suggestion request
+        self.round = 0            # bumped by cancel(); late results of older rounds are dropped
+        self.lock = threading.Lock()
+
+    def propose(self, npc, history):
+        """
+        Start a round of suggestions for the conversation as it stands
+
+        Args:
+            npc: NPC the player is talking to
+            history (list): Conversation lines, newest last
+        """
+        self.cancel()
+        with self.lock:
+            current = self.round
+            request = self.request = _Speculation()
+        request.future = self.backend.generate(
+            PromptBuilder.build_suggestions(history, npc.name, self.count), PromptBuilder.SUGGESTION_SYSTEM_PROMPT,
+            request, priority=self.backend.PREFETCH, stop_event=request.stop_event)
+        request.future.add_done_callback(lambda _: self._suggested(current, request, npc, list(history)))
+
+    def _suggested(self, current, request, npc, history):
+        """Start speculating on each suggested line (runs on a backend thread)"""
+        lines = PromptBuilder.split_lines(request.outcome[1]) if request.ready else []
+        unique = []
+        for line in lines:
+            line = line[:QUICK_REPLY_MAX_CHARS]
+            if line.lower() not in (seen.lower() for seen in unique):
+                unique.append(line)
+        with self.lock:
+            if current != self.round:
+                return
+            self.request = None
+            self.suggestions = [_Speculation(line) for line in unique[:self.count]]
+            speculations = list(self.suggestions)
+        logger.debug("Quick replies suggested", extra={"fields": {"npc": npc.name, "count": len(speculations)}})
+        for speculation in speculations:
+            speculation.system_prompt = npc.get_personality_prompt()
+            speculation.prompt = PromptBuilder.build(history, npc.name, speculation.text)
+            # Exempt from the player's rate limit: these are not the player's requests
+            speculation.future = self.backend.generate(
+                speculation.prompt, speculation.system_prompt,
+                speculation, context=PromptBuilder.recent_history(history), message=speculation.text,
+                npc_name=npc.name, priority=self.backend.PREFETCH, stop_event=speculation.stop_event)
+
+    def filter(self, typed):
+        """Cancel the suggestions the player's input no longer matches"""
+        typed = typed.strip().lower()
+        with self.lock:
+            keep = []
+            for speculation in self.suggestions:
+                if speculation.text.lower().startswith(typed):
+                    keep.append(speculation)
+                else:
+                    speculation.cancel()
+            self.suggestions = keep
+
+    def match(self, message):
+        """The suggestion equal to message (ignoring case), if its speculation has not failed"""
+        message = message.strip().lower()
+        with self.lock:
+            for speculation in self.suggestions:
+                if speculation.text.lower() == message and not speculation.failed:
+                    return speculation
+        return None
+
+    def take(self, message):
+        """
+        Claim the speculation for a sent message; every other one is cancelled
+
+        Returns:
+            _Speculation or None
+        """
+        speculation = self.match(message)
+        with self.lock:
+            if speculation in self.suggestions:
+                self.suggestions.remove(speculation)
+        self.cancel()
+        if speculation is not None:
+            self.backend.note_attached(speculation.system_prompt, speculation.prompt)
+        return speculation
+
+    def cancel(self):
+        """Drop the current round"""
+        with self.lock:
+            self.round += 1
+            pending = self.suggestions + ([self.request] if self.request else [])
+            self.suggestions = []
+            self.request = None
+        for speculation in pending:
+            speculation.cancel()
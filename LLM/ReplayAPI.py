@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from LLM.SessionRecorder import TRACE_FORMAT, request_key
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReplayAPI:
+    """
+    Stand-in for OllamaAPI that plays back a trace written by SessionRecorder.
+
+    A request is answered by the next unused recording with the same system
+    prompt and prompt; if there is none (the prompts changed since the trace
+    was taken) the next unused recording in file order is used instead.
+    Chunks are delivered with their recorded gaps multiplied by time_scale
+    (1.0 = as recorded, 0 = as fast as possible), so a replay reproduces
+    both the text and the pacing of the original session.
+
+    A background recording the player was shown (an "attached" line in the
+    trace) is flagged with "attached": True.
+    """
+    def __init__(self, path, time_scale=1.0):
+        """
+        Args:
+            path (str): Trace file
+            time_scale (float): Multiplier for recorded gaps
+        """
+        self.path = path
+        self.time_scale = time_scale
+        self.by_key = defaultdict(deque)     # request key -> recordings in file order
+        self.sequence = []
+        self.used = set()                    # ids of recordings already replayed
+        self.cursor = 0
+        self.lock = threading.Lock()
+        self.model_name = None
+        self.options = {}
+        self._load()
+
+    def _load(self):
+        attached = Counter()                 # request key -> background replies shown to the player
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash while recording can leave a torn last line
+                    logger.warning("Skipping unreadable trace line %d in %s", number, self.path)
+                    continue
+                if record.get("format") == TRACE_FORMAT:
+                    continue
+                if "attached" in record:
+                    attached[record["attached"]] += 1
+                    continue
+                self.sequence.append(record)
+                self.by_key[record["key"]].append(record)
+        # The mark can come before its recording, which is written when the stream ends
+        for record in self.sequence:
+            if attached[record["key"]] and record.get("priority") not in (None, "interactive"):
+                attached[record["key"]] -= 1
+                record["attached"] = True
+        if self.sequence:
+            self.model_name = self.sequence[0].get("model")
+            self.options = self.sequence[0].get("options", {})
+        logger.info("Loaded LLM trace", extra={"fields": {
+            "path": self.path, "generations": len(self.sequence), "time_scale": self.time_scale}})
+
+    def _next_recording(self, system_prompt, prompt):
+        with self.lock:
+            candidates = self.by_key.get(request_key(system_prompt, prompt))
+            while candidates:
+                record = candidates.popleft()
+                if id(record) not in self.used:
+                    self.used.add(id(record))
+                    return record
+            while self.cursor < len(self.sequence):
+                record = self.sequence[self.cursor]
+                self.cursor += 1
+                if id(record) not in self.used:
+                    self.used.add(id(record))
+                    logger.debug("Replaying out of order: no recording for this prompt")
+                    return record
+        return None
+
+    def _wait(self, gap_ms):
+        if self.time_scale > 0 and gap_ms > 0:
+            time.sleep(gap_ms / 1000.0 * self.time_scale)
+
+    def generate_response_stream(self, prompt, system_prompt, response_queue, stop_event=None):
+        """Same contract as OllamaAPI.generate_response_stream"""
+        record = self._next_recording(system_prompt, prompt)
+        if record is None:
+            response_queue.put(('error', 'Replay trace exhausted'))
+            return
+
+        full_response = ""
+        for gap_ms, chunk in record["chunks"]:
+            self._wait(gap_ms)
+            if stop_event is not None and stop_event.cancelled:
+                return
+            full_response += chunk
+            response_queue.put(('chunk', chunk))
+            if stop_event is not None and stop_event.is_set():
+                response_queue.put(('done', full_response))
+                return
+        self._wait(record.get("end_gap_ms", 0))
+        response_queue.put((record["end"], record["final"]))
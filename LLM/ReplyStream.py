@@ -0,0 +1,62 @@
+from LLM.ActionStreamParser import ActionStreamParser
+from LLM.PromptBuilder import PromptBuilder
+
+
+class ReplyStream:
+    """
+    Assembles one streamed NPC reply: action tags are split off as they
+    complete and the text to display is derived from what is left, showing
+    the live <think> block until it closes and the answer after that.
+    The display text only grows, except where the parser reports a <think>
+    tag, so each chunk costs its own length.
+
+    Used by DialogueSystem for in-process backends and by the LLM worker
+    process, which sends only the resulting display text to the game.
+    """
+    def __init__(self):
+        self.parser = ActionStreamParser()
+        self.raw = ""                # visible text so far, <think> blocks included
+        self.display = ""            # text to display now
+        self.changed_from = 0        # offset in display the last feed() changed from
+        self.think_removed = False   # a <think> tag has been seen: display the cleaned text
+
+    @property
+    def complete(self):
+        """True once the reply has everything it needs (generation may stop)"""
+        return self.parser.complete
+
+    def feed(self, chunk):
+        """
+        Add the next streamed chunk
+
+        Returns:
+            tuple: (text to display now, list of (name, argument) actions)
+        """
+        parser = self.parser
+        think_tags = (parser.think_start, parser.answer_start)
+        visible, actions = parser.feed(chunk)
+        self.raw += visible
+        if think_tags == (parser.think_start, parser.answer_start):
+            if self.think_removed and not parser.in_think and not self.display:
+                visible = visible.lstrip()
+            self.changed_from = len(self.display)
+            self.display += visible
+        else:
+            # A <think> tag opened or closed: show the thoughts so far, or the answer after them
+            self.think_removed = True
+            self.changed_from = 0
+            if parser.in_think:
+                self.display = "Thinking..." + self.raw[parser.think_start:]
+            else:
+                self.display = self.raw[parser.answer_start:].lstrip()
+        return self.display, actions
+
+    def finish(self):
+        """
+        End of stream
+
+        Returns:
+            tuple: (reply without thoughts or tags, thought text)
+        """
+        raw = self.raw + self.parser.close()
+        return PromptBuilder.remove_think_tags(raw), PromptBuilder.extract_thoughts(raw)
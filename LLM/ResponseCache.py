@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from Setting.Configuration import (
+    RESPONSE_CACHE_FILE, RESPONSE_CACHE_MEMORY_ENTRIES, RESPONSE_CACHE_MEMORY_BYTES,
+    RESPONSE_CACHE_DISK_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_CONTEXT_TURNS,
+    RESPONSE_CACHE_VARIANTS, RESPONSE_CACHE_NPC_VARIANTS, RESPONSE_CACHE_REPLAY_CHUNKS_PER_SECOND
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class _RecordingQueue:
+    """Forwards stream messages to the real queue and keeps the chunks"""
+    def __init__(self, target):
+        self.target = target
+        self.chunks = []
+        self.done = False
+
+    def put(self, item):
+        msg_type, content = item
+        if msg_type == 'chunk':
+            self.chunks.append(content)
+        elif msg_type == 'done':
+            self.done = True
+        self.target.put(item)
+
+
+class ResponseCache:
+    """
+    Two-level cache of complete NPC replies.
+
+    Keys hash the model, generation options, system prompt, the last
+    RESPONSE_CACHE_CONTEXT_TURNS lines of context and the player message,
+    all whitespace/case-normalised. Each key holds up to N variants (per-NPC
+    policy); until N are stored a miss generates a fresh reply, after that a
+    random variant is served. Hits are replayed chunk by chunk through the
+    same response queue as live generations, so the dialogue UI can't tell
+    the difference.
+
+    Level 1 is an in-memory LRU bounded by entry count and bytes; level 2 is
+    a SQLite file bounded by entry count, both expiring after the TTL.
+    """
+    def __init__(self, path=RESPONSE_CACHE_FILE, replay_speed=RESPONSE_CACHE_REPLAY_CHUNKS_PER_SECOND):
+        """
+        Open (or create) the cache
+
+        Args:
+            path (str): SQLite file for the persistent store, None for memory only
+            replay_speed (float): Chunks per second when replaying a hit (0 = instant)
+        """
+        self.replay_speed = replay_speed
+        self.memory = OrderedDict()     # key -> list of (created, chunks)
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT NOT NULL, created REAL NOT NULL, chunks TEXT NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_key ON responses (key)")
+            self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - RESPONSE_CACHE_TTL,))
+            self.db.commit()
+
+    @staticmethod
+    def normalise(text):
+        """Lower-case and collapse whitespace so trivial edits share a key"""
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    def make_key(self, model, options, system_prompt, context, message):
+        """
+        Build the cache key for one request
+
+        Args:
+            model (str): Model name
+            options (dict): Generation options sent to the backend
+            system_prompt (str): NPC system prompt
+            context (list): Conversation lines preceding the message
+            message (str): Player message
+        """
+        recent = context[-RESPONSE_CACHE_CONTEXT_TURNS:] if RESPONSE_CACHE_CONTEXT_TURNS else []
+        material = json.dumps([
+            model,
+            options,
+            system_prompt,
+            [self.normalise(line) for line in recent],
+            self.normalise(message),
+        ], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+    def variants_for(self, npc_name):
+        """Number of variants to collect for an NPC (0 disables caching)"""
+        return RESPONSE_CACHE_NPC_VARIANTS.get(npc_name, RESPONSE_CACHE_VARIANTS)
+
+    def get_variants(self, key):
+        """Return the unexpired variants for a key (memory first, then disk)"""
+        now = time.time()
+        with self.lock:
+            variants = self.memory.get(key)
+            if variants is not None:
+                self.memory.move_to_end(key)
+            else:
+                variants = self._load(key, now)
+                if variants:
+                    self._remember(key, variants)
+            if not variants:
+                return []
+            return [chunks for created, chunks in variants if now - created < RESPONSE_CACHE_TTL]
+
+    def _load(self, key, now):
+        """Unexpired variants of a key on disk, oldest first (lock held)"""
+        if self.db is None:
+            return []
+        rows = self.db.execute(
+            "SELECT created, chunks FROM responses WHERE key = ? AND created >= ? ORDER BY created",
+            (key, now - RESPONSE_CACHE_TTL)).fetchall()
+        return [(created, json.loads(chunks)) for created, chunks in rows]
+
+    def store(self, key, chunks, variants=RESPONSE_CACHE_VARIANTS):
+        """
+        Add one variant for a key to both levels, keeping the newest ones
+
+        Args:
+            key (str): Cache key
+            chunks (list): Reply chunks
+            variants (int): Variants kept per key (the NPC's policy, see variants_for)
+        """
+        created = time.time()
+        limit = max(1, variants)
+        with self.lock:
+            # A key evicted from memory may still have variants on disk; both levels keep the same set
+            stored = self.memory.get(key)
+            if stored is None:
+                stored = self._load(key, created)
+            stored = [variant for variant in stored if created - variant[0] < RESPONSE_CACHE_TTL]
+            self._remember(key, (stored + [(created, chunks)])[-limit:])
+            if self.db is not None:
+                self.db.execute("INSERT INTO responses (key, created, chunks) VALUES (?, ?, ?)",
+                                (key, created, json.dumps(chunks, ensure_ascii=False)))
+                self.db.execute(
+                    "DELETE FROM responses WHERE key = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM responses WHERE key = ? ORDER BY created DESC LIMIT ?)",
+                    (key, key, limit))
+                self.db.execute(
+                    "DELETE FROM responses WHERE rowid NOT IN "
+                    "(SELECT rowid FROM responses ORDER BY created DESC LIMIT ?)",
+                    (RESPONSE_CACHE_DISK_ENTRIES,))
+                self.db.commit()
+
+    @staticmethod
+    def _size(variants):
+        return sum(len(chunk) for _, chunks in variants for chunk in chunks)
+
+    def _remember(self, key, variants):
+        """Insert into the memory LRU and evict down to the limits (lock held)"""
+        if key in self.memory:
+            self.memory_bytes -= self._size(self.memory.pop(key))
+        self.memory[key] = variants
+        self.memory_bytes += self._size(variants)
+        while self.memory and (len(self.memory) > RESPONSE_CACHE_MEMORY_ENTRIES
+                               or self.memory_bytes > RESPONSE_CACHE_MEMORY_BYTES):
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= self._size(evicted)
+
+    def replay(self, chunks, response_queue):
+        """Feed cached chunks into a response queue at the configured speed"""
+        delay = 1.0 / self.replay_speed if self.replay_speed > 0 else 0
+        for chunk in chunks:
+            response_queue.put(('chunk', chunk))
+            if delay:
+                time.sleep(delay)
+        response_queue.put(('done', "".join(chunks)))
+
+    def lookup(self, ollama_api, system_prompt, context, message, npc_name=None):
+        """
+        Check the cache without generating anything
+
+        Returns:
+            tuple: (key, chunks) - chunks to replay on a hit, None on a miss;
+                   key is None when caching is disabled for this NPC
+        """
+        wanted = self.variants_for(npc_name)
+        if wanted <= 0:
+            return None, None
+
+        key = self.make_key(ollama_api.model_name, ollama_api.options, system_prompt, context, message)
+        variants = self.get_variants(key)
+        if len(variants) >= wanted:
+            self.hits += 1
+            logger.debug("Response cache hit", extra={"fields": {"npc": npc_name, "variants": len(variants)}})
+            return key, random.choice(variants)
+        self.misses += 1
+        return key, None
+
+    def record(self, key, ollama_api, prompt, system_prompt, response_queue, stop_event=None,
+               variants=RESPONSE_CACHE_VARIANTS):
+        """Generate a reply on a miss and store it under key (None = don't store), keeping `variants` per key"""
+        if key is None:
+            ollama_api.generate_response_stream(prompt, system_prompt, response_queue, stop_event)
+            return
+        recorder = _RecordingQueue(response_queue)
+        ollama_api.generate_response_stream(prompt, system_prompt, recorder, stop_event)
+        if recorder.done and recorder.chunks:
+            self.store(key, recorder.chunks, variants)
+
+    def generate_response_stream(self, ollama_api, system_prompt, context, message, prompt,
+                                 response_queue, npc_name=None):
+        """
+        Serve a request from the cache or generate it and record the result.
+        Blocks like OllamaAPI.generate_response_stream; run it on a worker thread.
+
+        Args:
+            ollama_api (OllamaAPI): Backend used on a miss
+            system_prompt (str): NPC system prompt
+            context (list): Conversation lines preceding the message
+            message (str): Player message
+            prompt (str): Full prompt sent to the backend on a miss
+            response_queue (queue.Queue): Queue the UI reads chunks from
+            npc_name (str): NPC name for the variant policy
+        """
+        key, chunks = self.lookup(ollama_api, system_prompt, context, message, npc_name)
+        if chunks is not None:
+            self.replay(chunks, response_queue)
+            return
+        self.record(key, ollama_api, prompt, system_prompt, response_queue,
+                    variants=self.variants_for(npc_name))
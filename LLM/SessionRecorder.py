@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from LLM.GenerationScheduler import GenerationScheduler
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+TRACE_FORMAT = "llmrpg-trace"
+TRACE_VERSION = 1
+
+
+def request_key(system_prompt, prompt):
+    """Identity of a request in a trace (model and options are recorded but not matched)"""
+    return hashlib.sha1(f"{system_prompt}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class _TimingQueue:
+    """Forwards stream messages and notes when each one arrived"""
+    def __init__(self, target):
+        self.target = target
+        self.started = time.perf_counter()
+        self.chunks = []          # [milliseconds since the previous message, text]
+        self.last = self.started
+        self.outcome = None       # ('done' | 'error', content, ms)
+
+    def put(self, item):
+        now = time.perf_counter()
+        gap = round((now - self.last) * 1000, 1)
+        self.last = now
+        msg_type, content = item
+        if msg_type == 'chunk':
+            self.chunks.append([gap, content])
+        else:
+            self.outcome = (msg_type, content, gap)
+        self.target.put(item)
+
+
+class SessionRecorder:
+    """
+    Records every generation that passes through it into an append-only
+    trace file, one JSON object per line:
+
+        {"format": "llmrpg-trace", "version": 1}                   (header, once)
+        {"key", "time", "model", "options", "system", "prompt", "priority",
+         "chunks": [[gap_ms, text], ...], "end": "done"|"error", "end_gap_ms", "final"}
+        {"attached": key, "time"}                                   (see note_attached)
+
+    Gaps are measured from the previous message (the first one is the time
+    to first token), so ReplayAPI can reproduce the stream's pacing.
+    "priority" is the scheduler class ("interactive", "prefetch", ...), or
+    None when the caller did not say.
+
+    The recorder wraps an OllamaAPI and exposes the same interface, so it
+    drops in wherever the API object is used.
+    """
+    def __init__(self, api, path):
+        """
+        Args:
+            api (OllamaAPI): Backend whose generations are recorded
+            path (str): Trace file (appended to, created if missing)
+        """
+        self.api = api
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", encoding="utf-8")
+        if new_file:
+            self._write({"format": TRACE_FORMAT, "version": TRACE_VERSION})
+        logger.info("Recording LLM sessions", extra={"fields": {"path": path}})
+
+    @property
+    def model_name(self):
+        return self.api.model_name
+
+    @property
+    def options(self):
+        return self.api.options
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self.lock:
+            if self.file.closed:
+                return  # a generation finished after shutdown
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def generate_response_stream(self, prompt, system_prompt, response_queue, stop_event=None, priority=None):
+        """
+        Same contract as OllamaAPI.generate_response_stream; the stream is recorded
+
+        Args:
+            priority (int): Scheduler priority class the request ran at
+        """
+        recorder = _TimingQueue(response_queue)
+        wall_time = time.time()
+        self.api.generate_response_stream(prompt, system_prompt, recorder, stop_event)
+        if stop_event is not None and stop_event.cancelled:
+            return  # Nobody saw the reply, so there is nothing to replay
+        end, final, end_gap = recorder.outcome or ('error', 'Stream ended without a result', 0.0)
+        self._write({
+            "key": request_key(system_prompt, prompt),
+            "time": round(wall_time, 3),
+            "model": self.api.model_name,
+            "options": self.api.options,
+            "system": system_prompt,
+            "prompt": prompt,
+            "priority": GenerationScheduler.PRIORITY_NAMES[priority] if priority is not None else None,
+            "chunks": recorder.chunks,
+            "end": end,
+            "end_gap_ms": end_gap,
+            "final": final,
+        })
+
+    def note_attached(self, system_prompt, prompt):
+        """Mark a background generation whose reply the player was shown (a picked quick reply)"""
+        self._write({"attached": request_key(system_prompt, prompt), "time": round(time.time(), 3)})
+
+    def close(self):
+        with self.lock:
+            self.file.close()
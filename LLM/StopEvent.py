@@ -0,0 +1,22 @@
+import threading
+
+
+class StopEvent(threading.Event):
+    """
+    Stop signal for one generation.
+
+    set() means the caller has what it needs: the backend closes the stream
+    and still reports what arrived as the final response. cancel() means
+    nobody wants the reply any more (the dialogue ended or the speculation
+    was dropped): the backend stops without reporting anything, so a late
+    ('done', ...) can never be taken for the next request's reply, and the
+    truncated text is neither cached nor recorded.
+    """
+    def __init__(self):
+        super().__init__()
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the generation and drop its result"""
+        self.cancelled = True
+        self.set()
@@ -0,0 +1,255 @@
+import json
+import os
+import numpy as np
+import pygame
+
+from Setting.Configuration import ANIMATION_DIR, ANIMATION_FRAME_MS
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# Clip selection axes: what a character is doing and which way it faces
+MOTIONS = ("idle", "walk")
+DIRECTIONS = ("down", "left", "right", "up")
+IDLE, WALK = 0, 1
+DOWN, LEFT, RIGHT, UP = 0, 1, 2, 3
+
+_MAX_STEPS = 64     # Frame steps per update, bounds chains of one-shot clips
+
+
+class AnimationSheet:
+    """
+    Animation clips of one character sheet, shared by every character drawn with it.
+
+    A sheet file in Assets/animations defines states, each a clip of frames
+    cut from a strip image or given as separate images, with a duration in
+    milliseconds per frame. Clips loop unless "loop" is false, in which case
+    "next" names the state played afterwards. "select" maps every motion
+    (idle, walk) and facing (down, left, right, up) to a state; that table
+    is the transition graph for characters starting, stopping and turning.
+
+    Clips are flattened into NumPy tables (one frame list for the whole
+    sheet; start, length, total duration and next state per clip), so a
+    character only keeps (clip, frame, elapsed ms) and advance() steps any
+    number of characters with a few array operations. Frames advance by
+    elapsed time, not by rendered frames, so animation speed does not
+    depend on the frame rate.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.states = []            # clip id -> state name
+        self.frames = []            # frame -> Surface
+        self.frame_offsets = []     # frame -> (x, y) draw offset from the character position
+        self.frame_ms = []          # frame -> duration in ms
+        self.clip_start = []        # clip id -> first frame
+        self.clip_length = []       # clip id -> number of frames
+        self.clip_loops = []        # clip id -> bool
+        self.clip_next = []         # clip id -> clip played after a one-shot (itself when looping)
+        self.select = np.zeros((1, len(MOTIONS), len(DIRECTIONS)), dtype=np.int16)  # sheet, motion, facing -> clip
+        self.asset_cache = None
+        self.images = []            # sprite names held in the asset cache
+
+    @classmethod
+    def load(cls, file_name, asset_cache, directory=ANIMATION_DIR):
+        """
+        Load a sheet file
+
+        A state is either {"image": strip, "frame": [w, h], "frames": [i, ...]}
+        (frames default to the whole strip; "crop": [x, y, w, h] cuts the
+        same region out of every cell) or {"images": [file, ...]}. Optional
+        per state: "duration" or "durations" (ms), "flip", "loop", "next",
+        "offset". Sheet-wide "scale" or "size" resizes every frame and
+        "offset" is the default draw offset.
+
+        Args:
+            file_name (str): Sheet file inside directory, or an absolute path
+            asset_cache (AssetCache): Where the images are loaded and held
+            directory (str): Sheet directory
+
+        Returns:
+            AnimationSheet
+
+        Raises:
+            OSError: The sheet file can't be read
+            ValueError: The sheet is malformed or an image is missing
+        """
+        path = file_name if os.path.isabs(file_name) else os.path.join(directory, file_name)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        sheet = cls(os.path.splitext(os.path.basename(file_name))[0])
+        sheet.asset_cache = asset_cache
+        try:
+            next_names = []
+            for state, spec in data["states"].items():
+                frames = sheet._load_frames(spec, data)
+                durations = spec.get("durations") or [spec.get("duration", ANIMATION_FRAME_MS)] * len(frames)
+                if len(durations) != len(frames) or min(durations) <= 0:
+                    raise ValueError(f"state {state}: need one positive duration per frame")
+                offset = tuple(spec.get("offset", data.get("offset", (0, 0))))
+                sheet._add_clip(state, frames, [offset] * len(frames), durations, spec.get("loop", True))
+                next_names.append(spec.get("next", state))
+            sheet.clip_next = [sheet.states.index(name) for name in next_names]
+            for m, motion in enumerate(MOTIONS):
+                for d, direction in enumerate(DIRECTIONS):
+                    sheet.select[0, m, d] = sheet.states.index(data["select"][motion][direction])
+        except (KeyError, IndexError, TypeError) as e:
+            sheet.release()
+            raise ValueError(f"Malformed animation sheet {file_name}: {e!r}") from e
+        except ValueError:
+            sheet.release()
+            raise
+        sheet._finish()
+        logger.debug("Animation sheet loaded", extra={"fields": {
+            "sheet": sheet.name, "states": len(sheet.states), "frames": len(sheet.frames)}})
+        return sheet
+
+    @classmethod
+    def still(cls, sprite, asset_cache, offset=(0, 0)):
+        """
+        A sheet with a single frame for every state, for sprites that aren't animated
+
+        Raises:
+            ValueError: The image is missing
+        """
+        sheet = cls(os.path.splitext(sprite)[0])
+        sheet.asset_cache = asset_cache
+        sheet._add_clip("still", [sheet._acquire(sprite)], [tuple(offset)], [ANIMATION_FRAME_MS], True)
+        sheet.clip_next = [0]
+        sheet._finish()
+        return sheet
+
+    @classmethod
+    def merge(cls, sheets):
+        """
+        Concatenate sheets into one table, so characters using different
+        sheets are advanced and drawn together; select[i] is sheets[i]'s table
+
+        Args:
+            sheets (list): AnimationSheets (they keep owning their images)
+
+        Returns:
+            AnimationSheet
+        """
+        merged = cls("+".join(sheet.name for sheet in sheets))
+        selects = []
+        for sheet in sheets:
+            first_clip, first_frame = len(merged.states), len(merged.frames)
+            merged.states.extend(f"{sheet.name}:{state}" for state in sheet.states)
+            merged.frames.extend(sheet.frames)
+            merged.frame_offsets.extend(map(tuple, sheet.frame_offsets.tolist()))
+            merged.frame_ms.extend(sheet.frame_ms.tolist())
+            merged.clip_start.extend((sheet.clip_start + first_frame).tolist())
+            merged.clip_length.extend(sheet.clip_length.tolist())
+            merged.clip_loops.extend(sheet.clip_loops.tolist())
+            merged.clip_next.extend((sheet.clip_next + first_clip).tolist())
+            selects.append(sheet.select + first_clip)
+        merged._finish()
+        if selects:
+            merged.select = np.concatenate(selects).astype(np.int16)
+        return merged
+
+    def _acquire(self, sprite):
+        image = self.asset_cache.acquire(sprite)
+        if image is None:
+            raise ValueError(f"missing image {sprite}")
+        self.images.append(sprite)
+        return image
+
+    def _load_frames(self, spec, data):
+        """Cut, scale and flip the frames of one state"""
+        if "images" in spec:
+            frames = [self._acquire(sprite) for sprite in spec["images"]]
+        else:
+            strip = self._acquire(spec["image"])
+            width, height = spec["frame"]
+            cells = range(strip.get_width() // width)
+            frames = [strip.subsurface((width * i, 0, width, height)) for i in spec.get("frames", cells)]
+            if "crop" in spec:
+                frames = [frame.subsurface(spec["crop"]) for frame in frames]
+        if "size" in data:
+            frames = [pygame.transform.scale(frame, data["size"]) for frame in frames]
+        elif data.get("scale", 1) != 1:
+            frames = [pygame.transform.scale_by(frame, data["scale"]) for frame in frames]
+        if spec.get("flip"):
+            frames = [pygame.transform.flip(frame, True, False) for frame in frames]
+        if not frames:
+            raise ValueError("state without frames")
+        return frames
+
+    def _add_clip(self, state, frames, offsets, durations, loops):
+        self.states.append(state)
+        self.clip_start.append(len(self.frames))
+        self.clip_length.append(len(frames))
+        self.clip_loops.append(bool(loops))
+        self.frames.extend(frames)
+        self.frame_offsets.extend(offsets)
+        self.frame_ms.extend(durations)
+
+    def _finish(self):
+        """Turn the clip lists into arrays"""
+        self.frame_offsets = np.array(self.frame_offsets, dtype=np.int32).reshape(-1, 2)
+        self.frame_ms = np.array(self.frame_ms, dtype=np.float32)
+        self.clip_start = np.array(self.clip_start, dtype=np.int32)
+        self.clip_length = np.array(self.clip_length, dtype=np.int32)
+        self.clip_loops = np.array(self.clip_loops, dtype=bool)
+        self.clip_next = np.array(self.clip_next, dtype=np.int16)
+        self.clip_total = np.array([self.frame_ms[start:start + length].sum()
+                                    for start, length in zip(self.clip_start, self.clip_length)], dtype=np.float32)
+
+    def release(self):
+        """Drop the sheet's references to its images"""
+        for sprite in self.images:
+            self.asset_cache.release(sprite)
+        self.images = []
+
+    def index(self, state):
+        """Clip id of a state name"""
+        return self.states.index(state)
+
+    def advance(self, clip, frame, elapsed, dt_ms):
+        """
+        Step many characters forward in time
+
+        Args:
+            clip (np.ndarray): Clip id per character
+            frame (np.ndarray): Frame within the clip per character
+            elapsed (np.ndarray): Milliseconds spent on the current frame per character
+            dt_ms (float): Elapsed time in milliseconds
+
+        Returns:
+            tuple: New (clip, frame, elapsed) arrays
+        """
+        clip, frame = clip.copy(), frame.copy()
+        elapsed = elapsed + np.float32(dt_ms)
+        # Whole loops change nothing; skipping them keeps long frames (a stall, a low frame rate) cheap
+        total = self.clip_total[clip]
+        wrapped = self.clip_loops[clip] & (elapsed >= total)
+        elapsed[wrapped] %= total[wrapped]
+        for _ in range(_MAX_STEPS):
+            duration = self.frame_ms[self.clip_start[clip] + frame]
+            due = np.nonzero(elapsed >= duration)[0]
+            if len(due) == 0:
+                break
+            elapsed[due] -= duration[due]
+            frame[due] += 1
+            ended = due[frame[due] >= self.clip_length[clip[due]]]
+            frame[ended] = 0
+            clip[ended] = self.clip_next[clip[ended]]
+        return clip, frame, elapsed
+
+    def step(self, clip, frame, elapsed, dt_ms):
+        """advance() for a single character, on plain numbers"""
+        elapsed += dt_ms
+        if self.clip_loops[clip] and elapsed >= self.clip_total[clip]:
+            elapsed %= float(self.clip_total[clip])
+        for _ in range(_MAX_STEPS):
+            duration = float(self.frame_ms[self.clip_start[clip] + frame])
+            if elapsed < duration:
+                break
+            elapsed -= duration
+            frame += 1
+            if frame >= self.clip_length[clip]:
+                frame = 0
+                clip = int(self.clip_next[clip])
+        return clip, frame, elapsed
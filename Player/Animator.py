@@ -0,0 +1,54 @@
+from Player.AnimationSheet import IDLE, WALK, DOWN
+
+
+class Animator:
+    """
+    Playback state of one character on a shared AnimationSheet.
+
+    Only the clip, the frame within it and the time spent on that frame are
+    kept here; frames, durations and transitions belong to the sheet.
+    NPCPopulation keeps the same three values in arrays for its crowd.
+    """
+    __slots__ = ("sheet", "sheet_id", "clip", "frame", "elapsed")
+
+    def __init__(self, sheet, sheet_id=0):
+        """
+        Args:
+            sheet (AnimationSheet): Clips to play
+            sheet_id (int): Row of sheet.select to use (for merged sheets)
+        """
+        self.sheet = sheet
+        self.sheet_id = sheet_id
+        self.clip = int(sheet.select[sheet_id, IDLE, DOWN])
+        self.frame = 0
+        self.elapsed = 0.0
+
+    def play(self, state):
+        """Start a state by name (a one-shot runs to its end before movement changes the clip again)"""
+        self.clip, self.frame, self.elapsed = self.sheet.index(state), 0, 0.0
+
+    def update(self, dt_ms, moving, facing):
+        """
+        Pick the clip for the character's motion and advance it
+
+        Args:
+            dt_ms (float): Elapsed time in milliseconds
+            moving (bool): Whether the character is walking
+            facing (int): DOWN, LEFT, RIGHT or UP
+        """
+        sheet = self.sheet
+        wanted = int(sheet.select[self.sheet_id, WALK if moving else IDLE, facing])
+        if wanted != self.clip and sheet.clip_loops[self.clip]:
+            self.clip, self.frame, self.elapsed = wanted, 0, 0.0
+        self.clip, self.frame, self.elapsed = sheet.step(self.clip, self.frame, self.elapsed, dt_ms)
+
+    @property
+    def image(self):
+        """Surface of the current frame"""
+        return self.sheet.frames[self.sheet.clip_start[self.clip] + self.frame]
+
+    @property
+    def offset(self):
+        """(x, y) draw offset of the current frame"""
+        x, y = self.sheet.frame_offsets[self.sheet.clip_start[self.clip] + self.frame]
+        return int(x), int(y)
@@ -1,7 +1,11 @@
 import pygame
 import math
 import random
+from LLM.PersonalityRegistry import PersonalityRegistry
 from Setting.Configuration import NPC_COLORS, WHITE, BLACK, RED
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
 
 
 class NPC:
@@ -31,46 +35,14 @@ class NPC:
     def start_dialogue(self):
         """Start dialogue with the player"""
         self.in_dialogue = True
-        print(f"Starting dialogue with {self.name}")
+        logger.info("Starting dialogue with %s", self.name)
         # Return a greeting message
         greeting = f"Hello! I'm {self.name}. How can I help you?"
         return greeting
     
     def get_personality_prompt(self):
-        """Generate a system prompt based on NPC's personality"""
-        personality_prompts = {
-            "friendly": f"You are a friendly NPC named {self.name}. "
-                       "Respond in a warm and kind tone. "
-                       "Be natural and engaging, like a real friend. "
-                       "Use normal punctuation only, avoid special symbols, "
-                       "and do not use colons or prefix your name in replies.",
-            
-            "wise": f"You are a wise NPC named {self.name}. "
-                    "Respond with wisdom and philosophical insight. "
-                    "Share meaningful life reflections. "
-                    "Use normal punctuation only, avoid special symbols, "
-                    "and do not use colons or prefix your name in replies.",
-            
-            "playful": f"You are a playful NPC named {self.name}. "
-                       "Respond in a cheerful and humorous tone. "
-                       "Feel free to make light jokes. "
-                       "Use normal punctuation only, avoid special symbols, "
-                       "and do not use colons or prefix your name in replies.",
-            
-            "mysterious": f"You are a mysterious NPC named {self.name}. "
-                          "Respond in an enigmatic and cryptic manner. "
-                          "Hint at hidden secrets of the room. "
-                          "Use normal punctuation only, avoid special symbols, "
-                          "and do not use colons or prefix your name in replies.",
-            
-            "programmer": f"You are a programmer NPC named {self.name}. "
-                          "Respond with a techie, logical personality. "
-                          "You can share insights about coding or life from a dev's perspective. "
-                          "Use normal punctuation only, avoid special symbols, "
-                          "do not use colons, and never repeat your name like 'Li Zhongjie:' in replies."
-        }
-        # Return the prompt for the given personality, default to 'friendly'
-        return personality_prompts.get(self.personality, personality_prompts["friendly"])
+        """Generate a system prompt based on NPC's personality (see Assets/personalities)"""
+        return PersonalityRegistry.shared().prompt(self.personality, self.name, self.character_type)
 
     def end_dialogue(self):
         """End the current dialogue"""
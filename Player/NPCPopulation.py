@@ -0,0 +1,509 @@
+import math
+import numpy as np
+
+from Player.NPC import NPC
+from Player.AnimationSheet import AnimationSheet, IDLE as ANIM_IDLE, WALK, DOWN, LEFT, RIGHT, UP
+from Env.Pathfinder import UNREACHABLE
+from LLM.PersonalityRegistry import PersonalityRegistry
+from Setting.Configuration import (
+    NPC_COLORS, NPC_WANDER_SPEED, NPC_WANDER_RADIUS, NPC_IDLE_TIME, NPC_WANDER_TIME,
+    NPC_ERRAND_CHANCE
+)
+
+# Behaviour states
+IDLE = 0
+WANDER = 1
+TALKING = 2
+SEEK = 3        # Walking a shared flow field toward a point of interest
+
+NPC_SIZE = 24   # Interaction box edge, same as NPC.width/height
+
+
+class NPCView(NPC):
+    """
+    Thin NPC facade over one row of an NPCPopulation.
+    Reads and writes go straight to the population arrays, so the dialogue
+    code can keep using name, x/y, get_personality_prompt and end_dialogue.
+    """
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+        self.width = NPC_SIZE
+        self.height = NPC_SIZE
+        self.color = NPC_COLORS[index % len(NPC_COLORS)]
+
+    @property
+    def name(self):
+        return self.population.names[self.index]
+
+    @property
+    def character_type(self):
+        return self.population.types[self.index]
+
+    @property
+    def personality(self):
+        return self.population.personality_names[self.population.personality[self.index]]
+
+    @property
+    def x(self):
+        return float(self.population.pos[self.index, 0])
+
+    @x.setter
+    def x(self, value):
+        self.population.pos[self.index, 0] = value
+
+    @property
+    def y(self):
+        return float(self.population.pos[self.index, 1])
+
+    @y.setter
+    def y(self, value):
+        self.population.pos[self.index, 1] = value
+
+    @property
+    def in_dialogue(self):
+        return self.population.state[self.index] == TALKING
+
+    @in_dialogue.setter
+    def in_dialogue(self, value):
+        self.population.set_talking(self.index, value)
+
+
+class NPCPopulation:
+    """
+    Struct-of-arrays store for every NPC in a room.
+
+    Positions, velocities, behaviour states, timers and personality ids live
+    in NumPy arrays and the idle/wander behaviour of the whole population is
+    advanced with a handful of vectorised operations per frame. Named story
+    NPCs are added with mobile=False and no sheet (they are baked into the
+    room's prop layer); ambient workers wander around their spawn point and,
+    with a Pathfinder, run errands to points of interest by following the
+    flow field shared by everyone heading to the same place.
+
+    Crowd NPCs are drawn from AnimationSheets. The room's sheets are merged
+    into one table and each NPC's playback is three array cells (clip,
+    frame, elapsed ms) plus its facing, advanced for everyone at once in
+    update().
+    """
+    # Arrays saved in world snapshots (see export_state)
+    SNAPSHOT_ARRAYS = ("pos", "vel", "home", "state", "timer", "personality", "mobile", "sheet_id",
+                       "facing", "anim_clip", "anim_frame", "anim_elapsed")
+
+    def __init__(self, capacity=16, collision_grid=None, tile_size=30, bounds=None, seed=None,
+                 pathfinder=None):
+        """
+        Create an empty population
+
+        Args:
+            capacity (int): Initial array capacity (grows by doubling)
+            collision_grid (list): Room collision grid (rows of bytearrays), optional
+            tile_size (int): Collision grid cell size in pixels
+            bounds (tuple): (min_x, min_y, max_x, max_y) wander limits in pixels
+            seed (int): Optional RNG seed
+            pathfinder (Pathfinder): Optional navigation service for errands
+        """
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+        self.tile_size = tile_size
+        self.bounds = bounds
+        self.grid = None
+        if collision_grid is not None:
+            self.grid = np.array([list(row) for row in collision_grid], dtype=bool)
+
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.home = np.zeros((capacity, 2), dtype=np.float32)
+        self.state = np.zeros(capacity, dtype=np.uint8)
+        self.timer = np.zeros(capacity, dtype=np.float32)
+        self.personality = np.zeros(capacity, dtype=np.uint8)
+        self.mobile = np.zeros(capacity, dtype=bool)
+        self.sheet_id = np.full(capacity, -1, dtype=np.int16)
+        self.facing = np.zeros(capacity, dtype=np.uint8)
+        self.anim_clip = np.zeros(capacity, dtype=np.int16)
+        self.anim_frame = np.zeros(capacity, dtype=np.int16)
+        self.anim_elapsed = np.zeros(capacity, dtype=np.float32)
+
+        self.names = []
+        self.types = []
+        self.personality_names = []  # personality id -> name
+        self.sheets = []        # sheet_id -> AnimationSheet
+        self.animation = None   # The sheets merged into one table
+        self._views = {}
+
+        # Errand destinations: flow fields are requested up front on the
+        # pathfinding pool and picked up here once they are ready
+        self.pathfinder = pathfinder
+        self.goal = np.full(capacity, -1, dtype=np.int16)
+        self.fields = []            # goal id -> FlowField
+        self.field_requests = {}    # tag -> Future[FlowField]
+        if pathfinder is not None:
+            for tag in pathfinder.poi_cells:
+                self.field_requests[tag] = pathfinder.request_flow_field(tag)
+
+    def _grow(self):
+        """Double array capacity"""
+        capacity = max(1, len(self.pos)) * 2
+        for attr in ("pos", "vel", "home", "state", "timer", "personality", "mobile", "sheet_id", "goal",
+                     "facing", "anim_clip", "anim_frame", "anim_elapsed"):
+            old = getattr(self, attr)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            if attr in ("sheet_id", "goal"):
+                new.fill(-1)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def add(self, x, y, name, character_type="animal", personality="friendly", mobile=False, sheet_id=-1):
+        """
+        Add one NPC and return its index
+
+        Args:
+            x, y (float): Position of the NPC's interaction box
+            name (str): Display name
+            character_type (str): e.g. "animal", "human"
+            personality (str): Personality name (see PersonalityRegistry; unknown names use the default)
+            mobile (bool): Whether the NPC wanders
+            sheet_id (int): Index into self.sheets, -1 to draw nothing
+        """
+        if self.count == len(self.pos):
+            self._grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.home[i] = (x, y)
+        self.vel[i] = 0
+        self.state[i] = IDLE
+        self.timer[i] = self.rng.uniform(*NPC_IDLE_TIME)
+        if personality not in self.personality_names:
+            self.personality_names.append(personality)
+        self.personality[i] = self.personality_names.index(personality)
+        self.mobile[i] = mobile
+        self.sheet_id[i] = sheet_id
+        self.facing[i] = DOWN
+        self.anim_clip[i] = self.animation.select[sheet_id, ANIM_IDLE, DOWN] if sheet_id >= 0 else 0
+        self.anim_frame[i] = 0
+        self.anim_elapsed[i] = 0
+        self.goal[i] = -1
+        self.names.append(name)
+        self.types.append(character_type)
+        self.count += 1
+        return i
+
+    def set_sheets(self, sheets):
+        """
+        Set the animation sheets crowd NPCs are drawn with (before spawning them)
+
+        Args:
+            sheets (list): AnimationSheets; sheet ids index this list
+        """
+        self.sheets = list(sheets)
+        self.animation = AnimationSheet.merge(self.sheets) if self.sheets else None
+        if self.animation is None:
+            self.sheet_id[:self.count] = -1
+
+    def spawn_crowd(self, count, sheet_ids, name_prefix="Office Worker"):
+        """
+        Add `count` wandering NPCs on random free cells of the collision grid
+
+        Args:
+            count (int): Number of NPCs
+            sheet_ids (list): Sheet ids to pick from
+            name_prefix (str): Names are "<prefix> <n>"
+        """
+        if self.grid is not None:
+            free = np.argwhere(~self.grid)
+        else:
+            free = np.zeros((0, 2), dtype=int)
+        if count <= 0 or len(free) == 0:
+            return
+
+        cells = free[self.rng.integers(0, len(free), count)]
+        jitter = self.rng.uniform(0, self.tile_size - NPC_SIZE, (count, 2))
+        xs = cells[:, 1] * self.tile_size + jitter[:, 0]
+        ys = cells[:, 0] * self.tile_size + jitter[:, 1] - NPC_SIZE
+        archetypes = PersonalityRegistry.shared().names()
+        personalities = self.rng.integers(0, len(archetypes), count)
+        sheets = self.rng.choice(sheet_ids, count)
+        start = self.count
+        for n in range(count):
+            self.add(xs[n], ys[n], f"{name_prefix} {start + n + 1}", "human",
+                     archetypes[personalities[n]], mobile=True, sheet_id=int(sheets[n]))
+
+    def export_state(self):
+        """
+        Copy the population out for a world snapshot (one bytes copy per array)
+
+        Returns:
+            tuple: ({array name: bytes}, {list name: [str]}); errand goals are
+                   saved as point-of-interest tags, since goal ids depend on the
+                   order flow fields finished in
+        """
+        n = self.count
+        arrays = {name: getattr(self, name)[:n].tobytes() for name in self.SNAPSHOT_ARRAYS}
+        lists = {
+            "names": list(self.names),
+            "types": list(self.types),
+            "personality_names": list(self.personality_names),
+            "goals": [self.fields[goal].key if goal >= 0 else "" for goal in self.goal[:n].tolist()],
+        }
+        return arrays, lists
+
+    @classmethod
+    def check_state(cls, arrays, lists):
+        """
+        Check that saved state fits this build's arrays, before anything is replaced
+
+        Raises:
+            ValueError: A list or array has the wrong length (or dtype)
+        """
+        count = len(lists["names"])
+        for name in ("types", "goals"):
+            if len(lists[name]) != count:
+                raise ValueError(f"{name}: {len(lists[name])} entries for {count} NPCs")
+        empty = cls(capacity=1)
+        for name in cls.SNAPSHOT_ARRAYS:
+            expected = count * getattr(empty, name)[0].nbytes
+            if len(arrays[name]) != expected:
+                raise ValueError(f"{name}: {len(arrays[name])} bytes for {count} NPCs, expected {expected}")
+
+    def import_state(self, arrays, lists):
+        """
+        Replace the population with one saved by export_state
+
+        Args:
+            arrays (dict): Array name -> bytes
+            lists (dict): List name -> strings
+        """
+        count = len(lists["names"])
+        while len(self.pos) < count:
+            self._grow()
+        for name in self.SNAPSHOT_ARRAYS:
+            target = getattr(self, name)
+            target[:count] = np.frombuffer(arrays[name], dtype=target.dtype).reshape((count,) + target.shape[1:])
+        self.count = count
+        self.names = list(lists["names"])
+        self.types = list(lists["types"])
+        self.personality_names = list(lists["personality_names"])
+
+        # Sheets the room no longer has draw nothing; clips are restarted if the sheet table changed
+        sheet_id = self.sheet_id[:count]
+        sheet_id[sheet_id >= len(self.sheets)] = -1
+        if self.animation is not None:
+            drawn = np.nonzero(sheet_id >= 0)[0]
+            stale = drawn[self.anim_clip[drawn] >= len(self.animation.states)]
+            self.anim_clip[stale] = self.animation.select[sheet_id[stale], ANIM_IDLE, DOWN]
+            self.anim_frame[stale] = 0
+            self.anim_elapsed[stale] = 0
+
+        # Errands resume once their flow field is ready again; until then the NPC idles
+        self.goal[:count] = -1
+        for index, tag in enumerate(lists["goals"]):
+            if tag and not self.send_to(index, tag):
+                self.state[index] = IDLE
+                self.vel[index] = 0
+                self.timer[index] = 0
+
+    def view(self, index):
+        """Return the (cached) NPCView for an index"""
+        view = self._views.get(index)
+        if view is None:
+            view = NPCView(self, index)
+            self._views[index] = view
+        return view
+
+    def set_talking(self, index, talking):
+        """Freeze an NPC for a conversation, or release it back to idle"""
+        if talking:
+            self.state[index] = TALKING
+            self.vel[index] = 0
+            self.goal[index] = -1
+        elif self.state[index] == TALKING:
+            self.state[index] = IDLE
+            self.timer[index] = self.rng.uniform(*NPC_IDLE_TIME)
+
+    def update(self, dt):
+        """
+        Advance idle/wander behaviour for every NPC
+
+        Args:
+            dt (float): Elapsed time in seconds
+        """
+        n = self.count
+        if n == 0 or dt <= 0:
+            return
+        pos, vel, home = self.pos[:n], self.vel[:n], self.home[:n]
+        state, timer = self.state[:n], self.timer[:n]
+
+        # State transitions for NPCs whose timer ran out
+        timer -= dt
+        expired = np.nonzero((timer <= 0) & self.mobile[:n] & (state != TALKING) & (state != SEEK))[0]
+        if len(expired):
+            starting = expired[state[expired] == IDLE]
+            stopping = expired[state[expired] == WANDER]
+
+            # Some idle NPCs go on an errand instead of wandering
+            goal_ids = self._ready_goal_ids()
+            if goal_ids and len(starting):
+                errand = self.rng.random(len(starting)) < NPC_ERRAND_CHANCE
+                runners = starting[errand]
+                starting = starting[~errand]
+                state[runners] = SEEK
+                self.goal[runners] = self.rng.choice(goal_ids, len(runners))
+
+            angles = self.rng.uniform(0, 2 * math.pi, len(starting))
+            vel[starting, 0] = np.cos(angles) * NPC_WANDER_SPEED
+            vel[starting, 1] = np.sin(angles) * NPC_WANDER_SPEED
+            state[starting] = WANDER
+            timer[starting] = self.rng.uniform(*NPC_WANDER_TIME, len(starting))
+
+            vel[stopping] = 0
+            state[stopping] = IDLE
+            timer[stopping] = self.rng.uniform(*NPC_IDLE_TIME, len(stopping))
+
+        self._steer_errands(n)
+        self._animate(n, dt)
+
+        wandering = state == WANDER
+        moving = wandering | (state == SEEK)
+        if not moving.any():
+            return
+
+        new_pos = pos + vel * (dt * moving)[:, None]
+
+        # Reject moves that leave the leash radius, the bounds or hit a solid cell
+        offset = new_pos - home
+        blocked = wandering & ((offset * offset).sum(axis=1) > NPC_WANDER_RADIUS * NPC_WANDER_RADIUS)
+        if self.bounds is not None:
+            min_x, min_y, max_x, max_y = self.bounds
+            blocked |= ((new_pos[:, 0] < min_x) | (new_pos[:, 1] < min_y) |
+                        (new_pos[:, 0] > max_x - NPC_SIZE) | (new_pos[:, 1] > max_y - NPC_SIZE))
+        if self.grid is not None:
+            rows, cols = self.grid.shape
+            foot_col = np.clip(((new_pos[:, 0] + NPC_SIZE / 2) // self.tile_size).astype(np.intp), 0, cols - 1)
+            foot_row = np.clip(((new_pos[:, 1] + NPC_SIZE) // self.tile_size).astype(np.intp), 0, rows - 1)
+            blocked |= self.grid[foot_row, foot_col]
+
+        blocked &= moving
+        new_pos[blocked] = pos[blocked]
+        vel[blocked] *= -1
+        pos[:] = new_pos
+
+    def _animate(self, n, dt):
+        """Turn walking NPCs toward their velocity and advance every NPC's clip"""
+        if self.animation is None:
+            return
+        drawn = np.nonzero(self.sheet_id[:n] >= 0)[0]
+        if len(drawn) == 0:
+            return
+        state, vel = self.state[drawn], self.vel[drawn]
+        walking = ((state == WANDER) | (state == SEEK)) & (vel != 0).any(axis=1)
+        vx, vy = vel[:, 0], vel[:, 1]
+        heading = np.where(np.abs(vx) >= np.abs(vy), np.where(vx < 0, LEFT, RIGHT), np.where(vy < 0, UP, DOWN))
+        facing = np.where(walking, heading, self.facing[drawn]).astype(np.uint8)
+        self.facing[drawn] = facing
+
+        # Follow the select table, except while a one-shot clip plays out
+        animation = self.animation
+        clip, frame, elapsed = self.anim_clip[drawn], self.anim_frame[drawn], self.anim_elapsed[drawn]
+        wanted = animation.select[self.sheet_id[drawn], walking.astype(np.intp) * WALK, facing]
+        switch = (wanted != clip) & animation.clip_loops[clip]
+        clip[switch] = wanted[switch]
+        frame[switch] = 0
+        elapsed[switch] = 0
+        clip, frame, elapsed = animation.advance(clip, frame, elapsed, dt * 1000.0)
+        self.anim_clip[drawn], self.anim_frame[drawn], self.anim_elapsed[drawn] = clip, frame, elapsed
+
+    def _ready_goal_ids(self):
+        """Register finished flow-field requests and return the usable goal ids"""
+        for tag, future in list(self.field_requests.items()):
+            if future.done():
+                del self.field_requests[tag]
+                field = future.result() if future.exception() is None else None
+                if field is not None:
+                    self.fields.append(field)
+        return list(range(len(self.fields)))
+
+    def send_to(self, index, tag):
+        """
+        Send one NPC walking to a point of interest (e.g. "printer")
+
+        Returns:
+            bool: False if the room has no ready flow field for that tag
+        """
+        for goal_id in self._ready_goal_ids():
+            if self.fields[goal_id].key == tag:
+                self.state[index] = SEEK
+                self.goal[index] = goal_id
+                return True
+        return False
+
+    def _steer_errands(self, n):
+        """Point every errand-running NPC along its goal's flow field"""
+        seeking = np.nonzero(self.state[:n] == SEEK)[0]
+        if len(seeking) == 0:
+            return
+        pos = self.pos
+        for goal_id in np.unique(self.goal[seeking]):
+            members = seeking[self.goal[seeking] == goal_id]
+            field = self.fields[goal_id]
+            rows, cols = field.distance.shape
+            foot_col = np.clip(((pos[members, 0] + NPC_SIZE / 2) // self.tile_size).astype(np.intp), 0, cols - 1)
+            foot_row = np.clip(((pos[members, 1] + NPC_SIZE) // self.tile_size).astype(np.intp), 0, rows - 1)
+            distance = field.distance[foot_row, foot_col]
+
+            done = members[(distance == 0) | (distance == UNREACHABLE)]
+            self.state[done] = IDLE
+            self.vel[done] = 0
+            self.goal[done] = -1
+            self.home[done] = pos[done]
+            self.timer[done] = self.rng.uniform(*NPC_IDLE_TIME, len(done))
+
+            walking = (distance != 0) & (distance != UNREACHABLE)
+            self.vel[members[walking]] = field.directions[foot_row[walking], foot_col[walking]] * NPC_WANDER_SPEED
+
+    def nearest(self, x, y, radius):
+        """
+        Find the closest NPC within radius of (x, y)
+
+        Returns:
+            NPCView or None
+        """
+        if self.count == 0:
+            return None
+        delta = self.pos[:self.count] - np.array((x, y), dtype=np.float32)
+        dist2 = (delta * delta).sum(axis=1)
+        index = int(np.argmin(dist2))
+        if dist2[index] < radius * radius:
+            return self.view(index)
+        return None
+
+    def within(self, x, y, radius):
+        """Return NPCViews for every NPC within radius of (x, y)"""
+        if self.count == 0:
+            return []
+        delta = self.pos[:self.count] - np.array((x, y), dtype=np.float32)
+        indices = np.nonzero((delta * delta).sum(axis=1) < radius * radius)[0]
+        return [self.view(int(i)) for i in indices]
+
+    def draw(self, screen, camera=(0, 0)):
+        """
+        Draw every visible NPC that has a sheet, sorted by depth
+
+        Args:
+            screen: Pygame surface to draw on
+            camera (tuple): World position of the screen's top-left corner
+        """
+        n = self.count
+        animation = self.animation
+        if n == 0 or animation is None:
+            return
+        drawn = np.nonzero(self.sheet_id[:n] >= 0)[0]
+        if len(drawn) == 0:
+            return
+        drawn = drawn[np.argsort(self.pos[drawn, 1], kind="stable")]
+
+        frames = animation.clip_start[self.anim_clip[drawn]] + self.anim_frame[drawn]
+        offsets = animation.frame_offsets[frames]
+        xs = (self.pos[drawn, 0] + (offsets[:, 0] - camera[0])).astype(np.int32).tolist()
+        ys = (self.pos[drawn, 1] + (offsets[:, 1] - camera[1])).astype(np.int32).tolist()
+        surfaces = animation.frames
+        screen.blits([(surfaces[f], (px, py)) for f, px, py in zip(frames.tolist(), xs, ys)], doreturn=False)
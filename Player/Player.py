@@ -1,5 +1,11 @@
 import pygame
-from Setting.Configuration import SCREEN_WIDTH, SCREEN_HEIGHT, PLAYER_BLUE, YELLOW
+from Env.AssetCache import AssetCache
+from Player.AnimationSheet import AnimationSheet, DIRECTIONS
+from Player.Animator import Animator
+from Setting.Configuration import SCREEN_WIDTH, SCREEN_HEIGHT, PLAYER_BLUE, YELLOW, PLAYER_ANIMATION
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
 
 
 class Player:
@@ -12,40 +18,24 @@ class Player:
         self.speed = 5
         self.direction = "down"
 
-        # Initialize animation-related attributes
-        self.anim_frame = 0
-        self.anim_timer = 0
-        self.character_images = {}
+        # Animation playback (None draws a placeholder rectangle)
+        self.animator = None
         self.load_character_images()
         
         # Add idle state detection
         self.last_direction = "down"
         self.is_moving = False
+        
+        # Items NPCs have handed over (<give .../> actions)
+        self.inventory = []
 
     def load_character_images(self):
-        """Load character sprites"""
+        """Load the player's animation sheet"""
         try:
-            self.character_images = {
-                # Walking animation (left/right)
-                'walk_a': pygame.image.load("assets/img/character_purple_walk_a.png").convert_alpha(),
-                'walk_b': pygame.image.load("assets/img/character_purple_walk_b.png").convert_alpha(),
-                # Climbing animation (up)
-                'climb_a': pygame.image.load("assets/img/character_purple_climb_a.png").convert_alpha(),
-                'climb_b': pygame.image.load("assets/img/character_purple_climb_b.png").convert_alpha(),
-                # Downward animations
-                'duck': pygame.image.load("assets/img/character_purple_duck.png").convert_alpha(),
-                'jump': pygame.image.load("assets/img/character_purple_jump.png").convert_alpha(),
-                # Idle state
-                'front': pygame.image.load("assets/img/character_purple_front.png").convert_alpha()
-            }
-            
-            # Resize all sprites to match player dimensions
-            for key in self.character_images:
-                self.character_images[key] = pygame.transform.scale(
-                    self.character_images[key], (self.width, self.height))
-        except Exception as e:
-            print(f"Failed to load character sprites: {e}")
-            self.character_images = {}
+            self.animator = Animator(AnimationSheet.load(PLAYER_ANIMATION, AssetCache()))
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to load character sprites: %s", e)
+            self.animator = None
 
     def move(self, dx, dy, obstacles=None):
         """Move the player, with collision and boundary checking"""
@@ -113,50 +103,22 @@ class Player:
         """Get the player's collision rectangle"""
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
+    def animate(self, dt):
+        """
+        Advance the walk/idle animation (simulation step)
+
+        Args:
+            dt (float): Elapsed time in seconds
+        """
+        if self.animator is not None:
+            facing = DIRECTIONS.index(self.direction if self.is_moving else self.last_direction)
+            self.animator.update(dt * 1000.0, self.is_moving, facing)
+
     def draw(self, screen):
         """Draw the player on the screen"""
-        # Use sprites if loaded, otherwise fall back to basic drawing
-        if hasattr(self, 'character_images') and self.character_images:
-            # Update animation frame (only when moving)
-            if self.is_moving:
-                self.anim_timer += 1
-                if self.anim_timer >= 10:  # Change frame every 10 ticks
-                    self.anim_frame = (self.anim_frame + 1) % 2
-                    self.anim_timer = 0
-            
-            # Select sprite based on movement state and direction
-            if not self.is_moving:
-                # Idle state: use last direction
-                if self.last_direction == "up":
-                    screen.blit(self.character_images['climb_a'], (self.x, self.y))
-                else:
-                    screen.blit(self.character_images['front'], (self.x, self.y))
-            elif self.direction == "right":
-                # Walking animation (right)
-                if self.anim_frame == 0:
-                    screen.blit(self.character_images['walk_a'], (self.x, self.y))
-                else:
-                    screen.blit(self.character_images['walk_b'], (self.x, self.y))
-            elif self.direction == "left":
-                # Flip walking animation for left movement
-                if self.anim_frame == 0:
-                    flipped_image = pygame.transform.flip(self.character_images['walk_a'], True, False)
-                    screen.blit(flipped_image, (self.x, self.y))
-                else:
-                    flipped_image = pygame.transform.flip(self.character_images['walk_b'], True, False)
-                    screen.blit(flipped_image, (self.x, self.y))
-            elif self.direction == "up":
-                # Climbing animation
-                if self.anim_frame == 0:
-                    screen.blit(self.character_images['climb_a'], (self.x, self.y))
-                else:
-                    screen.blit(self.character_images['climb_b'], (self.x, self.y))
-            elif self.direction == "down":
-                # Downward animation (alternating duck and jump)
-                if self.anim_frame == 0:
-                    screen.blit(self.character_images['duck'], (self.x, self.y))
-                else:
-                    screen.blit(self.character_images['jump'], (self.x, self.y))
+        if self.animator is not None:
+            offset_x, offset_y = self.animator.offset
+            screen.blit(self.animator.image, (self.x + offset_x, self.y + offset_y))
         else:
             # Fallback: draw a simple rectangle with directional face
             pygame.draw.rect(screen, PLAYER_BLUE, (self.x, self.y, self.width, self.height))
@@ -0,0 +1,156 @@
+import base64
+import itertools
+import json
+import queue
+import socket
+import threading
+
+from Setting.Configuration import SERVER_CONNECT_TIMEOUT
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class DialogueClient:
+    """
+    Game-side connection to a DialogueServer.
+
+    Stands in for OllamaAPI in DialogueSystem.send_message: the server owns
+    the prompt and the NPC memory, the game only forwards the player's line
+    and renders the streamed ('chunk'|'done'|'error', text) messages, which
+    arrive on the same response queue the local backend uses.
+    """
+    is_remote = True
+
+    def __init__(self, host, port):
+        """
+        Args:
+            host (str): Server host
+            port (int): Server port
+        """
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.session_id = None
+        self.pending = {}                  # request id -> response queue
+        self.replying = {}                 # NPC name -> request id of its reply in flight
+        self.request_ids = itertools.count(1)
+        self.send_lock = threading.Lock()
+        self.reader_thread = None
+
+    def connect(self, session_id=None, snapshot=None):
+        """
+        Open the connection and the server session (blocks until welcomed)
+
+        Args:
+            session_id (str): Session to resume on this server
+            snapshot (bytes): export_session() output from another server to continue from
+
+        Raises:
+            ConnectionError: The server refused the session
+        """
+        self.sock = socket.create_connection((self.host, self.port), timeout=SERVER_CONNECT_TIMEOUT)
+        self.stream = self.sock.makefile("rb")
+        hello = {"op": "hello", "session": session_id}
+        if snapshot is not None:
+            hello["snapshot"] = base64.b64encode(snapshot).decode("ascii")
+        self._send(hello)
+        welcome = json.loads(self.stream.readline())
+        if welcome["op"] != "welcome":
+            raise ConnectionError(welcome.get("text", "Session refused"))
+        self.session_id = welcome["session"]
+        self.sock.settimeout(None)
+        self.reader_thread = threading.Thread(target=self._read_loop, name="dialogue-client", daemon=True)
+        self.reader_thread.start()
+        logger.info("Connected to dialogue server", extra={"fields": {
+            "host": self.host, "port": self.port, "session": self.session_id}})
+        return self
+
+    def _send(self, message):
+        data = json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def can_admit(self, session):
+        """Rate limits are enforced by the server; its refusals arrive as errors"""
+        return True
+
+    @staticmethod
+    def _npc_spec(npc):
+        return {"name": npc.name, "character_type": npc.character_type, "personality": npc.personality}
+
+    def say(self, npc, message, response_queue):
+        """
+        Ask the server for an NPC reply; stream messages land in response_queue
+
+        Args:
+            npc: NPC being talked to
+            message (str): Player message
+            response_queue (queue.Queue): Receives ('chunk'|'done'|'error', text)
+        """
+        request_id = next(self.request_ids)
+        self.pending[request_id] = response_queue
+        self.replying[npc.name] = request_id
+        try:
+            self._send({"op": "say", "npc": self._npc_spec(npc), "message": message, "request": request_id})
+        except OSError as e:
+            self.pending.pop(request_id, None)
+            response_queue.put(('error', f'Dialogue server error: {e}'))
+
+    def end(self, npc_name):
+        """Tell the server the conversation with an NPC is over (its reply in flight is dropped)"""
+        self.pending.pop(self.replying.pop(npc_name, None), None)
+        try:
+            self._send({"op": "end", "npc": npc_name})
+        except OSError as e:
+            logger.warning("Could not reach dialogue server: %s", e)
+
+    def export_session(self, timeout=SERVER_CONNECT_TIMEOUT):
+        """
+        Fetch the session's NPC memory, to move the session to another server (see connect)
+
+        Returns:
+            bytes: Session snapshot
+
+        Raises:
+            ConnectionError: No answer within timeout
+        """
+        request_id = next(self.request_ids)
+        replies = queue.Queue()
+        self.pending[request_id] = replies
+        self._send({"op": "export", "request": request_id})
+        try:
+            op, text = replies.get(timeout=timeout)
+        except queue.Empty:
+            raise ConnectionError("Dialogue server did not answer the export") from None
+        finally:
+            self.pending.pop(request_id, None)
+        if op != "snapshot":
+            raise ConnectionError(text)
+        return base64.b64decode(text)
+
+    def _read_loop(self):
+        try:
+            for line in self.stream:
+                message = json.loads(line)
+                response_queue = self.pending.get(message.get("request"))
+                if response_queue is None:
+                    continue
+                response_queue.put((message["op"], message["text"]))
+                if message["op"] in ("done", "error", "snapshot"):
+                    self.pending.pop(message["request"], None)
+        except (OSError, ValueError) as e:
+            logger.warning("Dialogue server connection lost: %s", e)
+        # Unblock anyone still waiting on a reply
+        for response_queue in self.pending.values():
+            response_queue.put(('error', 'Dialogue server disconnected'))
+        self.pending.clear()
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
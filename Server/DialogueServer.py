@@ -0,0 +1,194 @@
+import asyncio
+import base64
+import binascii
+import json
+import time
+import uuid
+
+from LLM.BackendPool import BackendPool
+from Server.DialogueSession import DialogueSession
+from Setting.Configuration import (
+    SERVER_HOST, SERVER_PORT, OLLAMA_MODEL, RESPONSE_CACHE_ENABLED, SESSION_IDLE_TIMEOUT
+)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class DialogueServer:
+    """
+    Headless dialogue server: many player sessions in one process.
+
+    Protocol: newline-delimited JSON objects over a local TCP socket.
+    Client -> server:
+        {"op": "hello", "session": <id or null>}           open or resume a session
+        {"op": "hello", "snapshot": base64}                 open a session from another server's export
+        {"op": "start", "npc": {...}}                       begin talking to an NPC
+        {"op": "say", "npc": {...}, "message": str, "request": id}
+        {"op": "end", "npc": name}                          forget that conversation
+        {"op": "export", "request": id}                     serialise the session's NPC memory
+    Server -> client:
+        {"op": "welcome", "session": id}
+        {"op": "greeting", "npc": name, "text": str}
+        {"op": "chunk" | "done" | "error", "request": id, "text": str}
+        {"op": "snapshot", "request": id, "text": base64}   reply to export
+
+    Every session shares one BackendPool (HTTP connections + worker threads);
+    the event loop itself only moves small JSON lines around.
+    """
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, pool=None, **trace_options):
+        """
+        Args:
+            host (str): Interface to listen on
+            port (int): TCP port
+            pool (BackendPool): Shared backend pool (created on start if omitted)
+            trace_options: record_file / replay_file / replay_speed for the pool it creates
+        """
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.trace_options = trace_options
+        self.sessions = {}    # session id -> DialogueSession
+
+    def _create_pool(self):
+        response_cache = None
+        if RESPONSE_CACHE_ENABLED:
+            from LLM.ResponseCache import ResponseCache
+            response_cache = ResponseCache()
+        return BackendPool(OLLAMA_MODEL, response_cache=response_cache, **self.trace_options)
+
+    def run(self):
+        """Serve until interrupted"""
+        if self.pool is None:
+            self.pool = self._create_pool()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logger.info("Dialogue server stopped")
+        finally:
+            self.pool.shutdown()
+
+    async def serve(self):
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info("Dialogue server listening", extra={"fields": {
+            "host": self.host, "port": self.port, "pool": self.pool.size}})
+        reaper = asyncio.create_task(self._reap_idle_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+
+    async def _reap_idle_sessions(self):
+        """Drop detached sessions nobody resumed within SESSION_IDLE_TIMEOUT"""
+        while True:
+            await asyncio.sleep(SESSION_IDLE_TIMEOUT / 4)
+            now = time.monotonic()
+            for session_id, session in list(self.sessions.items()):
+                if session.emit_fn is None and not session.busy and now - session.last_active > SESSION_IDLE_TIMEOUT:
+                    del self.sessions[session_id]
+                    self.pool.scheduler.forget(session_id)
+                    logger.debug("Session expired", extra={"fields": {"session": session_id}})
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        outgoing = asyncio.Queue()
+        session = None
+
+        def emit(message):
+            # Called from pool threads as tokens stream in
+            loop.call_soon_threadsafe(outgoing.put_nowait, message)
+
+        async def send_loop():
+            while True:
+                message = await outgoing.get()
+                writer.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+
+        sender = asyncio.create_task(send_loop())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than the stream limit; the reader has dropped it
+                    outgoing.put_nowait({"op": "error", "request": None, "text": "Request too long"})
+                    continue
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request["op"]
+                except (ValueError, KeyError, TypeError):
+                    outgoing.put_nowait({"op": "error", "request": None, "text": "Malformed request"})
+                    continue
+
+                if op == "hello":
+                    try:
+                        session = self._open_session(request.get("session"), request.get("snapshot"))
+                    except ValueError as e:
+                        outgoing.put_nowait({"op": "error", "request": None, "text": f"Bad snapshot: {e}"})
+                        continue
+                    session.attach(emit)
+                    outgoing.put_nowait({"op": "welcome", "session": session.session_id})
+                elif session is None:
+                    outgoing.put_nowait({"op": "error", "request": request.get("request"), "text": "Say hello first"})
+                elif not self._well_formed(op, request):
+                    outgoing.put_nowait({"op": "error", "request": request.get("request"), "text": "Malformed request"})
+                elif op == "start":
+                    greeting = session.start(request["npc"])
+                    outgoing.put_nowait({"op": "greeting", "npc": request["npc"]["name"], "text": greeting})
+                elif op == "say":
+                    if not session.say(request["npc"], request["message"], request.get("request")):
+                        outgoing.put_nowait({"op": "error", "request": request.get("request"),
+                                             "text": "A reply is already being generated"})
+                elif op == "end":
+                    session.end(request["npc"])
+                elif op == "export":
+                    data = base64.b64encode(session.export_snapshot()).decode("ascii")
+                    outgoing.put_nowait({"op": "snapshot", "request": request.get("request"), "text": data})
+                else:
+                    outgoing.put_nowait({"op": "error", "request": request.get("request"), "text": f"Unknown op: {op}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session is not None:
+                session.attach(None)
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    def _well_formed(op, request):
+        """Check the fields an op reads, so a bad request gets an error instead of dropping the connection"""
+        npc = request.get("npc")
+        if op in ("start", "say") and not (isinstance(npc, dict) and isinstance(npc.get("name"), str)):
+            return False
+        if op == "say" and not isinstance(request.get("message"), str):
+            return False
+        if op == "end" and not isinstance(npc, str):
+            return False
+        return True
+
+    def _open_session(self, session_id, snapshot=None):
+        """
+        Resume a known session or create a new one
+
+        Args:
+            session_id (str): Session to resume, None for a new one
+            snapshot (str): Base64 export from another server to start the new session from
+
+        Raises:
+            ValueError: The snapshot can't be decoded
+        """
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            session_id = uuid.uuid4().hex
+            session = DialogueSession(session_id, self.pool)
+            if snapshot:
+                try:
+                    session.import_snapshot(base64.b64decode(snapshot, validate=True))
+                except binascii.Error as e:
+                    raise ValueError(str(e)) from e
+            self.sessions[session_id] = session
+            logger.info("Session opened", extra={"fields": {"session": session_id, "sessions": len(self.sessions)}})
+        return session
@@ -0,0 +1,196 @@
+import struct
+import threading
+import time
+
+from Init.WorldSnapshot import WorldSnapshot
+from LLM.ActionStreamParser import ActionStreamParser
+from LLM.PromptBuilder import PromptBuilder
+from LLM.StopEvent import StopEvent
+from Player.NPC import NPC
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class _EventSink:
+    """
+    Queue-like adapter handed to the backend pool: stream messages are
+    recorded in the session's NPC memory and forwarded to the connection
+    (the OllamaAPI/ResponseCache streaming code only ever calls put()).
+    Once the conversation has ended, the generation's messages are dropped.
+    """
+    def __init__(self, session, npc, request_id, stop_event):
+        self.session = session
+        self.npc = npc
+        self.request_id = request_id
+        self.stop_event = stop_event
+
+    def put(self, item):
+        if self.stop_event.cancelled:
+            return
+        msg_type, content = item
+        if msg_type == 'done':
+            self.session.finish(self.npc, content, self.stop_event)
+        elif msg_type == 'error':
+            self.session.fail(self.stop_event)
+        self.session.emit({"op": msg_type, "request": self.request_id, "text": content})
+
+
+class DialogueSession:
+    """
+    One player's dialogue state on the server: a conversation history per
+    NPC (NPC memory) and at most one generation in flight.
+
+    The session is transport-agnostic; `emit` is attached by whichever
+    connection currently owns it and may be called from pool threads.
+    """
+    def __init__(self, session_id, pool):
+        """
+        Args:
+            session_id (str): Identifier handed back to the client for resume
+            pool (BackendPool): Backend pool shared by every session
+        """
+        self.session_id = session_id
+        self.pool = pool
+        self.histories = {}       # NPC name -> conversation lines
+        self.npcs = {}            # NPC name -> NPC (for its personality prompt)
+        self.busy = False
+        self.generation = None    # (NPC name, StopEvent) of the generation in flight
+        self.emit_fn = None
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+
+    def attach(self, emit_fn):
+        """Route this session's events to a connection (None to detach)"""
+        with self.lock:
+            self.emit_fn = emit_fn
+            self.last_active = time.monotonic()
+
+    def emit(self, message):
+        with self.lock:
+            emit_fn = self.emit_fn
+        if emit_fn is not None:
+            emit_fn(message)
+
+    def _npc(self, spec):
+        """Return the NPC described by a client spec, remembering it by name"""
+        name = spec["name"]
+        npc = self.npcs.get(name)
+        if npc is None or npc.personality != spec.get("personality", "friendly"):
+            npc = NPC(0, 0, name, spec.get("character_type", "human"), spec.get("personality", "friendly"))
+            self.npcs[name] = npc
+        return npc
+
+    def start(self, spec):
+        """
+        Begin a conversation with an NPC (mirrors DialogueSystem.start_dialogue)
+
+        Returns:
+            str: Greeting line
+        """
+        npc = self._npc(spec)
+        greeting = f"Hello! I'm {npc.name}. How can I help you?"
+        self.histories[npc.name] = [greeting]
+        self.last_active = time.monotonic()
+        return greeting
+
+    def say(self, spec, message, request_id):
+        """
+        Queue a reply to a player message on the shared backend pool
+
+        Args:
+            spec (dict): NPC name, character_type and personality
+            message (str): Player message
+            request_id: Client token echoed on every streamed event
+
+        Returns:
+            bool: False if a generation is already running for this session
+        """
+        stop_event = StopEvent()
+        with self.lock:
+            if self.busy:
+                return False
+            self.busy = True
+            self.generation = (spec["name"], stop_event)
+        self.last_active = time.monotonic()
+
+        npc = self._npc(spec)
+        history = self.histories.setdefault(npc.name, [f"Hello! I'm {npc.name}. How can I help you?"])
+        prompt = PromptBuilder.build(history, npc.name, message)
+        context = PromptBuilder.recent_history(history)
+        history.append(f"Player: {message}")
+        del history[:-PromptBuilder.HISTORY_TURNS]    # only the prompt window is ever read
+
+        sink = _EventSink(self, npc, request_id, stop_event)
+        self.pool.generate(prompt, npc.get_personality_prompt(), sink,
+                           context=context, message=message, npc_name=npc.name,
+                           priority=self.pool.INTERACTIVE, session=self.session_id, stop_event=stop_event)
+        return True
+
+    def finish(self, npc, reply, stop_event):
+        """Record a completed reply in the NPC's memory"""
+        reply = PromptBuilder.remove_think_tags(ActionStreamParser.strip(reply))
+        with self.lock:
+            if stop_event.cancelled:
+                return
+            history = self.histories.setdefault(npc.name, [])
+            history.append(f"{npc.name}: {reply}")
+            del history[:-PromptBuilder.HISTORY_TURNS]
+            self.busy = False
+            self.generation = None
+        self.last_active = time.monotonic()
+
+    def fail(self, stop_event):
+        with self.lock:
+            if not stop_event.cancelled:
+                self.busy = False
+                self.generation = None
+
+    def export_snapshot(self):
+        """
+        Serialise the NPC memory (WorldSnapshot format), to resume the session on another server
+
+        Returns:
+            bytes: A full snapshot with "session/npcs" and one "session/history/<name>" section per NPC
+        """
+        npcs = []
+        for npc in self.npcs.values():
+            npcs += [npc.name, npc.character_type, npc.personality]
+        sections = {"session/npcs": WorldSnapshot.pack_strings(npcs)}
+        for name, history in list(self.histories.items()):
+            sections[f"session/history/{name}"] = WorldSnapshot.pack_strings(history)
+        return WorldSnapshot(sections).encode()
+
+    def import_snapshot(self, data):
+        """
+        Take over the NPC memory of an exported session
+
+        Raises:
+            ValueError: data is not a session snapshot
+        """
+        sections = WorldSnapshot.decode(data).sections
+        if "session/npcs" not in sections:
+            raise ValueError("Not a dialogue session snapshot")
+        prefix = "session/history/"
+        try:
+            npcs = WorldSnapshot.unpack_strings(sections["session/npcs"])
+            histories = {key[len(prefix):]: WorldSnapshot.unpack_strings(data)
+                         for key, data in sections.items() if key.startswith(prefix)}
+        except struct.error as e:
+            raise ValueError(f"Truncated session snapshot: {e}") from e
+        if len(npcs) % 3:
+            raise ValueError("Session snapshot NPC list is not (name, character type, personality) triples")
+        for i in range(0, len(npcs), 3):
+            self.npcs[npcs[i]] = NPC(0, 0, npcs[i], npcs[i + 1], npcs[i + 2])
+        self.histories = histories
+        self.last_active = time.monotonic()
+
+    def end(self, npc_name):
+        """Forget the conversation with an NPC and drop its reply in flight (mirrors DialogueSystem.end_dialogue)"""
+        with self.lock:
+            if self.generation is not None and self.generation[0] == npc_name:
+                self.generation[1].cancel()
+                self.generation = None
+                self.busy = False
+        self.histories.pop(npc_name, None)
+        self.last_active = time.monotonic()
@@ -1,68 +1,64 @@
 import os
-import pygame
+
+from Setting.FontRegistry import FontRegistry
+
 
 class ChineseFontManager:
-    """中文字体管理器 - 修复中文显示"""
+    """中文字体管理器 - 修复中文显示 (字体查找结果缓存到磁盘, 字体按需创建)"""
+    # Windows系统中文字体
+    WINDOWS_FONTS = (
+        'msyh.ttc',      # 微软雅黑
+        'simhei.ttf',    # 黑体
+        'simsun.ttc',    # 宋体
+        'SimSun',
+        'SimHei',
+        'Microsoft YaHei',
+    )
+    # Linux/macOS系统中文字体路径
+    FONT_PATHS = (
+        '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',  # 文泉驿微米黑
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',   # DejaVu Sans
+        '/System/Library/Fonts/PingFang.ttc',               # macOS苹方
+        '/System/Library/Fonts/Helvetica.ttc',              # macOS Helvetica
+        # 添加 Arial Unicode MS 常见路径
+        '/usr/share/fonts/truetype/arphic/arialuni.ttf',
+        '/System/Library/Fonts/Arial Unicode.ttf',
+        'C:/Windows/Fonts/ARIALUNI.TTF'
+    )
+    # 如果都失败了，使用系统默认字体 (尝试支持中文的)
+    SYSTEM_FONTS = ('microsoftyahei', 'simhei', 'arialunicode', 'arial')
+
     def __init__(self):
-        self.font = self.create_chinese_font(22)
-        self.small_font = self.create_chinese_font(18)
-        self.tiny_font = self.create_chinese_font(14)
-    
+        self.registry = FontRegistry.shared()
+        self._font_path = None
+
+    @property
+    def font(self):
+        return self.create_chinese_font(22)
+
+    @property
+    def small_font(self):
+        return self.create_chinese_font(18)
+
+    @property
+    def tiny_font(self):
+        return self.create_chinese_font(14)
+
+    @property
+    def font_path(self):
+        """解析后的字体文件 (空字符串表示 pygame 默认字体)"""
+        if self._font_path is None:
+            # Windows 优先按名称匹配, 其他系统先查找字体文件
+            names = tuple(name.lower() for name in self.WINDOWS_FONTS) if os.name == 'nt' else ()
+            if names:
+                path = self.registry.resolve((), names)
+                if not path:
+                    path = self.registry.resolve(self.FONT_PATHS, self.SYSTEM_FONTS)
+            else:
+                path = self.registry.resolve(self.FONT_PATHS, self.SYSTEM_FONTS)
+            self._font_path = path
+        return self._font_path
+
     def create_chinese_font(self, size=22):
         """创建支持中文的字体 - 修复中文乱码"""
-        try:
-            # Windows系统中文字体
-            if os.name == 'nt':
-                chinese_fonts = [
-                    'msyh.ttc',      # 微软雅黑
-                    'simhei.ttf',    # 黑体
-                    'simsun.ttc',    # 宋体
-                      'SimSun',
-                            'SimHei',
-                    'Microsoft YaHei',
-                ]
-                for font_name in chinese_fonts:
-                    try:
-                        font_path = pygame.font.match_font(font_name.lower())
-                        if font_path:
-                            print(f"使用中文字体 (Windows 系统匹配): {font_name}")
-                            return pygame.font.Font(font_path, size)
-                    except Exception as e:
-                        print(f"尝试加载 Windows 字体 {font_name} 失败: {e}")
-                        continue
-            
-            # Linux/macOS系统中文字体路径
-            chinese_font_paths = [
-                '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',  # 文泉驿微米黑
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',   # DejaVu Sans
-                '/System/Library/Fonts/PingFang.ttc',               # macOS苹方
-                '/System/Library/Fonts/Helvetica.ttc',              # macOS Helvetica
-                # 添加 Arial Unicode MS 常见路径
-                '/usr/share/fonts/truetype/arphic/arialuni.ttf',
-                '/System/Library/Fonts/Arial Unicode.ttf',
-                'C:/Windows/Fonts/ARIALUNI.TTF'
-            ]
-            
-            for font_path in chinese_font_paths:
-                if os.path.exists(font_path):
-                    try:
-                        print(f"使用中文字体文件: {font_path}")
-                        return pygame.font.Font(font_path, size)
-                    except Exception as e:
-                         print(f"尝试加载字体文件 {font_path} 失败: {e}")
-                         continue
-                        
-        except Exception as e:
-            print(f"字体加载过程中发生错误: {e}")
-        
-        # 如果都失败了，使用系统默认字体 (尝试支持中文的)
-        try:
-            print("尝试使用系统默认字体")
-            # 优先尝试支持中文的系统字体
-            return pygame.font.SysFont('microsoftyahei,simhei,arialunicode,arial', size)
-        except Exception as e_sysfont:
-            print(f"使用系统默认字体也失败了: {e_sysfont}")
-            # 最终回退，使用默认字体（可能不支持中文）
-            default_font = pygame.font.Font(None, size)
-            print("回退到 pygame 默认字体 (可能不支持中文)")
-            return default_font
\ No newline at end of file
+        return self.registry.get_font(self.font_path, size)
@@ -1,11 +1,165 @@
+import os
+
 # Game constants
 SCREEN_WIDTH = 900
 SCREEN_HEIGHT = 600
 FPS = 60
+RENDER_FRAMEBUFFER = True           # Draw the world at SCREEN_WIDTH x SCREEN_HEIGHT and scale it to a resizable window
+RENDER_INTEGER_SCALING = True       # Scale by whole factors only (letterboxed); False fills the window keeping aspect
+
+# Asset locations (resolved from the project root so the game runs from any cwd)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMG_DIR = os.path.join(PROJECT_ROOT, "Assets", "img")
+MAP_DIR = os.path.join(PROJECT_ROOT, "Assets", "maps")
+PERSONALITY_DIR = os.path.join(PROJECT_ROOT, "Assets", "personalities")
+ANIMATION_DIR = os.path.join(PROJECT_ROOT, "Assets", "animations")
+
+# Room / tile-map configuration
+DEFAULT_ROOM_MAP = "office.json"    # Map file inside MAP_DIR
+CHUNK_TILES = 8                     # Chunk edge length in tiles for pre-rendered static layers
+CHUNK_PRELOAD_LIMIT = 64            # Pre-render every chunk at load if the map has at most this many
+WORLD_FILE = "world.json"           # Room graph inside MAP_DIR
+WORLD_PRELOAD_DEPTH = 1             # Keep rooms this many exits away streamed in
+
+# NPC crowd behaviour
+NPC_WANDER_SPEED = 40.0             # Pixels per second while wandering
+NPC_WANDER_RADIUS = 120.0           # Max distance from spawn point in pixels
+NPC_IDLE_TIME = (2.0, 6.0)          # Seconds spent idle (min, max)
+NPC_WANDER_TIME = (1.0, 3.0)        # Seconds spent walking (min, max)
+NPC_SPRITE_OFFSET = (-7, -12)       # Sprite position relative to the NPC interaction box
+NPC_ERRAND_CHANCE = 0.3             # Chance an idle NPC walks to a point of interest instead of wandering
+
+# Character animation
+PLAYER_ANIMATION = "player.json"    # Player's sheet inside ANIMATION_DIR
+ANIMATION_FRAME_MS = 150            # Frame duration for sheets that don't give one
+
+# Pathfinding
+PATHFINDING_WORKERS = 2             # Worker threads shared by every room's Pathfinder
+PATH_CACHE_SIZE = 256               # A* results kept per room
 
 # OLLAMA configuration - using qwen3:8b model
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "qwen3:8b"
+OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+OLLAMA_PS_URL = "http://localhost:11434/api/ps"
+BACKEND_PROBE_TIMEOUT = 5           # Seconds before the background service probe gives up
+
+# Generation profile: backend options tuned for this host (python main.py --tune), loaded by OllamaAPI
+GENERATION_PROFILE_FILE = os.path.join(PROJECT_ROOT, "generation_profile.json")  # Overridden by LLMRPG_GENERATION_PROFILE
+TUNER_PROMPTS = 6                   # Representative prompts measured per candidate
+TUNER_MAX_TOKENS = 96               # Tokens generated per timing measurement
+TUNER_REPLY_TOKENS = 64             # Reply length the score (time to a full reply) is computed for
+TUNER_NUM_CTX = (2048, 4096, 8192)
+TUNER_NUM_BATCH = (128, 256, 512)
+TUNER_KEEP_ALIVE = "30m"            # Written to the profile: keeps the tuned model loaded between chats
+TUNER_TOLERANCE = 0.05              # Scores this close count as a tie; the smaller memory footprint wins
+TUNER_PREDICT_CAP = 1024            # Upper bound while measuring natural reply lengths for num_predict
+
+# NPC personalities (one JSON file per archetype in PERSONALITY_DIR, _shared.json applies to all)
+PERSONALITY_DEFAULT = "friendly"    # Used for unknown personality names
+PERSONALITY_RELOAD_INTERVAL = 1.0   # Seconds between checks for edited personality files
+
+# Dialogue server (headless multi-session mode: python main.py --server)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+BACKEND_POOL_SIZE = 8               # Concurrent generations shared by every session on the node
+LOCAL_BACKEND_CONCURRENCY = 2       # Concurrent generations when the game talks to OLLAMA directly
+SESSION_IDLE_TIMEOUT = 600          # Seconds a disconnected session is kept for resume
+SERVER_CONNECT_TIMEOUT = 5          # Seconds the game client waits for the server
+
+# Generation scheduler (one per backend; see LLM/GenerationScheduler.py)
+SCHEDULER_SESSION_RATE = 1.0        # Requests per second a session may sustain
+SCHEDULER_SESSION_BURST = 3         # Requests a session may send back to back
+SCHEDULER_RESERVED_INTERACTIVE = 1  # Backend slots only interactive replies may use
+SCHEDULER_QUEUE_BUDGETS = {         # Seconds a queued job may wait before it is shed
+    "interactive": 30.0,
+    "prefetch": 30.0,               # speculative replies stay useful while the player is typing
+    "ambient": 20.0,
+    "summary": 120.0,
+}
+
+# LLM worker process (python main.py --llm-worker: HTTP, JSON and reply parsing off the game process)
+LLM_WORKER_ENABLED = False          # Overridden by --llm-worker
+WORKER_FLUSH_INTERVAL = 1 / 60      # Seconds between text updates sent to the game (about once a frame)
+WORKER_START_TIMEOUT = 30.0         # Seconds to wait for a new worker to report ready
+WORKER_HEALTH_INTERVAL = 2.0        # Seconds between health pings
+WORKER_HEALTH_TIMEOUT = 10.0        # Seconds without a reply before the worker is restarted
+WORKER_RESTART_DELAY = 1.0          # Seconds before a restart, doubled per consecutive failure
+WORKER_RESTART_DELAY_MAX = 30.0
+
+# Ambient chatter (short lines NPCs say when the player walks past)
+AMBIENT_ENABLED = True
+AMBIENT_POOL_SIZE = 6               # Lines kept per NPC (a refill batch tops the pool up to this)
+AMBIENT_LOW_WATERMARK = 2           # Refill when fewer lines than this are left
+AMBIENT_LINE_TTL = 15 * 60          # Seconds before an unused line is considered stale
+AMBIENT_CHECK_INTERVAL = 2.0        # Seconds between pool checks
+AMBIENT_RETRY_DELAY = 60.0          # Seconds before retrying an NPC whose refill failed
+AMBIENT_BUBBLE_RADIUS = 90          # Player distance at which an NPC speaks
+AMBIENT_BUBBLE_SECONDS = 4.0        # How long a speech bubble stays up
+AMBIENT_BUBBLE_COOLDOWN = 20.0      # Seconds before the same NPC speaks again
+
+# Quick replies (suggested player lines with speculatively generated NPC answers)
+QUICK_REPLIES_ENABLED = True
+QUICK_REPLY_COUNT = 3               # Suggestions offered after each NPC answer (picked with F1-F3)
+QUICK_REPLY_MAX_CHARS = 150         # Same limit as typed input
+
+# Pre-generated dialogue (python main.py --pregen CORPUS; answered instantly, no backend call)
+PREGEN_DIALOGUE_FILE = os.path.join(PROJECT_ROOT, "Assets", "dialogue", "pregen.dlg")
+PREGEN_CONCURRENCY = 4              # Most generations the batch keeps in flight
+PREGEN_RETRIES = 3                  # Attempts after the first before a prompt is given up
+PREGEN_RETRY_DELAY = 2.0            # Seconds before a retry, doubled per attempt
+PREGEN_SLOWDOWN = 2.0               # Halve the batch window when TTFT exceeds the best seen by this factor
+
+# Dialogue transcript (scrollback over the whole conversation)
+TRANSCRIPT_MEMORY_ENTRIES = 200     # Newest entries kept in memory; older ones spill to disk
+TRANSCRIPT_SPILL_DIR = os.path.join(PROJECT_ROOT, "cache", "transcripts")
+TRANSCRIPT_WRAP_CHARS = 78          # Characters per wrapped line in the dialogue box
+TRANSCRIPT_LAYOUT_CACHE = 64        # Entries whose wrapped lines are kept
+TRANSCRIPT_SURFACE_CACHE = 64       # Rendered line surfaces kept
+TRANSCRIPT_COLLAPSE_THOUGHTS = True # Show <think> content as one line until expanded (Tab)
+
+# Text input (dialogue box)
+TEXT_INPUT_MAX_LENGTH = 150         # Characters a message may have
+TEXT_INPUT_GLYPH_CACHE = 512        # Rendered characters kept by the input box
+KEY_REPEAT_DELAY = 400              # ms a key is held before it repeats (while typing)
+KEY_REPEAT_INTERVAL = 35            # ms between repeats
+
+# Save games (binary world snapshots; F5 quicksaves, F9 quickloads, python main.py --load FILE)
+SAVE_DIR = os.path.join(PROJECT_ROOT, "saves")
+QUICKSAVE_FILE = "quicksave.snap"   # Inside SAVE_DIR
+AUTOSAVE_FILE = "autosave.snap"     # Inside SAVE_DIR; deltas are written next to it as <file>.delta
+AUTOSAVE_ENABLED = True
+AUTOSAVE_INTERVAL = 15.0            # Seconds between autosaves
+AUTOSAVE_FULL_EVERY = 10            # Every Nth autosave is a full snapshot, the others are deltas against it
+AUTOSAVE_BUDGET_MS = 2.0            # Main-thread capture time above which an autosave is logged as slow
+SNAPSHOT_TRANSCRIPT_CHUNK = 64      # Transcript entries per snapshot section (full chunks are encoded once)
+
+# Profiling (F10 starts and stops it, Shift+F10 also tracks allocations;
+# LLMRPG_PROFILE=1 or LLMRPG_PROFILE=alloc starts it at launch)
+PROFILE_DIR = os.path.join(PROJECT_ROOT, "profiles")
+PROFILE_SAMPLE_MS = 5               # Interval between stack samples of every thread
+PROFILE_MAX_DEPTH = 96              # Frames kept per sampled stack (innermost first)
+PROFILE_ALLOCATION_FRAMES = 8       # Frames per traced allocation, to find the game code behind it
+PROFILE_TOP_SITES = 10              # Allocation sites listed per subsystem
+
+# Startup
+STARTUP_WORKERS = 4                 # Threads loading fonts, world, sprites and LLM client in parallel
+
+# Font lookup cache (resolved font paths per platform and family list)
+FONT_CACHE_FILE = os.path.join(PROJECT_ROOT, "cache", "fonts.json")
+FONT_SURFACE_CACHE = 256            # Rendered text surfaces kept per font size (mixed-script fonts)
+
+# Response cache
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_FILE = os.path.join(PROJECT_ROOT, "cache", "responses.sqlite3")
+RESPONSE_CACHE_MEMORY_ENTRIES = 256         # Keys kept in the in-memory LRU
+RESPONSE_CACHE_MEMORY_BYTES = 4 * 1024**2   # Approximate text bytes kept in memory
+RESPONSE_CACHE_DISK_ENTRIES = 5000          # Variants kept on disk
+RESPONSE_CACHE_TTL = 7 * 24 * 3600          # Seconds before a cached reply expires
+RESPONSE_CACHE_CONTEXT_TURNS = 2            # Conversation lines before the message included in the key
+RESPONSE_CACHE_VARIANTS = 3                 # Variants collected per key before serving from cache
+RESPONSE_CACHE_NPC_VARIANTS = {}            # Per-NPC override by name, e.g. {"GTP": 5}; 0 disables
+RESPONSE_CACHE_REPLAY_CHUNKS_PER_SECOND = 40  # Replay speed for cache hits (0 = instant)
 
 # Color definitions 
 SKY_BLUE = (135, 206, 235)        # Sky blue background
@@ -30,4 +184,12 @@ GRAY = (54, 54, 54)                 # Dark gray
 DARK_GRAY = (50, 50, 50)            # Slightly darker gray
 WALL_COLOR = (150, 100, 50)         # Warm brown walls
 FLOOR_COLOR = (200, 180, 150)       # Light beige/tan floor
-FURNITURE_COLOR = (100, 70, 30)     # Darker brown for furniture
\ No newline at end of file
+FURNITURE_COLOR = (100, 70, 30)     # Darker brown for furniture
+
+# Logging configuration
+LOG_LEVEL = "INFO"                  # Overridden by LLMRPG_LOG_LEVEL
+LOG_FILE = None                     # Optional log file, overridden by LLMRPG_LOG_FILE
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_DATE_FORMAT = "%H:%M:%S"
+LOG_RATE_LIMIT_INTERVAL = 1.0       # Seconds per rate-limit window for noisy events
+LOG_RATE_LIMIT_BURST = 5            # Records allowed per call site per window
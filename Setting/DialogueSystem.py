@@ -1,12 +1,25 @@
 import pygame
-import threading
 import queue
-from Setting.Configuration import SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, BLACK, GRAY, RED, OLLAMA_MODEL
+from collections import OrderedDict
+from Setting.Configuration import (SCREEN_WIDTH, WHITE, BLACK, GRAY, RED, OLLAMA_MODEL,
+                                   TRANSCRIPT_WRAP_CHARS, TRANSCRIPT_SURFACE_CACHE, QUICK_REPLIES_ENABLED)
+from LLM.PregenDialogue import PregenDialogue
+from LLM.QuickReplies import QuickReplies
+from LLM.ReplyStream import ReplyStream
+from LLM.StopEvent import StopEvent
+from LLM.PromptBuilder import PromptBuilder
+from Setting.TextInput import TextInput
+from Setting.Transcript import Transcript, wrap
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
 
 
 class DialogueSystem:
     """Dialogue system for handling NPC conversations with streaming AI responses"""
     
+    SESSION = "local"  # Scheduler session key of the player at this keyboard
+    
     def __init__(self, font, small_font, tiny_font):
         """
         Initialize the dialogue system
@@ -27,12 +40,13 @@ class DialogueSystem:
         self.is_thinking = False             # Whether AI is generating response
         
         # Text content
-        self.player_input = ""               # Current player input
+        self.input = TextInput(small_font)   # Current player input (see player_input)
         self.npc_response = ""               # Final NPC response
         self.thinking_process = ""           # Live thinking process (with <think> tags)
         self.final_response = ""             # Cleaned final response
         self.processed_content = ""          # Accumulated raw content from stream
-        self.conversation_history = []       # History of conversation
+        self.transcript = Transcript()       # Whole conversation (ring buffer, spills to disk)
+        self.live_lines = []                 # Wrapped lines of the reply being streamed
         
         # Visual effects
         self.show_cursor = True              # Blinking cursor visibility
@@ -43,12 +57,34 @@ class DialogueSystem:
         # Display settings
         self.text_height = 18                # Height of each text line
         self.max_visible_lines = 10          # Max lines visible in dialogue box
+        self.line_surfaces = OrderedDict()   # (kind, line) -> rendered surface, LRU
+        self.line_colors = {
+            Transcript.PLAYER: (0, 100, 0),
+            Transcript.THOUGHT: (100, 100, 100),
+            Transcript.SYSTEM: (178, 34, 34),
+        }
         self.show_thinking_process = True    # Show thinking process vs final response
         self.think_removed = False           # Whether <think> tags have been processed
         
         # Communication
-        self.response_queue = queue.Queue()  # Thread-safe queue for AI responses
-        self.api_thread = None               # Background thread for API calls
+        self.response_queue = queue.Queue()  # Thread-safe queue for AI responses (a new one per request)
+        self.backend = None                  # Last LLM backend used (local API or dialogue server)
+        
+        # Structured actions in replies (<emotion happy/>, <walk printer/>, <give item/>, <end/>)
+        self.reply_stream = ReplyStream()
+        self.stop_event = None               # Set to cut the current generation short, cancel to drop it
+        self.actions = []                    # Actions not yet collected by the game
+        self.npc_emotion = ""                # Last <emotion/> of the current NPC
+        self.closing = False                 # NPC ended the conversation with <end/>
+        self.notice = ""                     # One-line game notice (e.g. received items)
+        
+        # Suggested player replies whose NPC answers are generated in the background
+        self.suggest_replies = QUICK_REPLIES_ENABLED
+        self.quick_replies = None
+        self.suggestion_surfaces = {}        # (label, ready) -> rendered chip
+        
+        # Replies written offline by `main.py --pregen` (PregenDialogue), answered without the backend
+        self.pregen = None
     
     def start_dialogue(self, npc):
         """
@@ -60,77 +96,165 @@ class DialogueSystem:
         Returns:
             str: Initial greeting message
         """
-        print(f"Starting dialogue with {npc.name}")
+        logger.info("Starting dialogue with %s", npc.name)
         self.active = True
         self.current_npc = npc
         self.player_input = ""
+        TextInput.focus()
         self.npc_response = ""
-        self.thinking_process = f"Hello! I'm {npc.name}. How can I help you?"
+        self.thinking_process = ""
         self.final_response = ""
         self.processed_content = ""
         self.input_active = True
         self.is_thinking = False
-        self.conversation_history = [self.thinking_process]
-        self.scroll_offset = 0
+        greeting = f"Hello! I'm {npc.name}. How can I help you?"
+        self.transcript.clear()
+        self.transcript.append(Transcript.GREETING, npc.name, greeting)
+        self.live_lines = []
         self.show_thinking_process = True
         self.think_removed = False
         self.auto_scroll = True
-        return self.thinking_process
+        self.update_scroll_position()
+        self.reset_actions()
+        self.cancel_quick_replies()
+        return greeting
     
+    def resume_dialogue(self, npc, entries, player_input="", collapse_thoughts=None):
+        """
+        Reopen a saved conversation (see WorldSnapshot)
+
+        Args:
+            npc: The NPC being talked to
+            entries (list): (kind, speaker, text) transcript entries, oldest first
+            player_input (str): Text that was typed but not sent
+            collapse_thoughts (bool): Saved thought folding, None to keep the current one
+        """
+        self.start_dialogue(npc)
+        self.transcript.clear()
+        if collapse_thoughts is not None and collapse_thoughts != self.transcript.collapse_thoughts:
+            self.transcript.toggle_thoughts()
+        for kind, speaker, text in entries:
+            self.transcript.append(kind, speaker, text)
+        self.player_input = player_input
+        self.update_scroll_position()
+
+    @property
+    def player_input(self):
+        """Text typed so far"""
+        return self.input.text
+
+    @player_input.setter
+    def player_input(self, text):
+        self.input.text = text
+
+    def handle_input_event(self, event):
+        """
+        Pass a text or editing key event to the input box
+
+        Returns:
+            bool: True if the input box used the event
+        """
+        if not self.input_active:
+            return False
+        handled, changed = self.input.handle_event(event)
+        if handled:
+            # Keep the caret steady while typing
+            self.show_cursor = True
+            self.cursor_timer = 0
+        if changed and self.quick_replies is not None:
+            self.quick_replies.filter(self.player_input)
+        return handled
+
     def add_input_char(self, char):
-        """Add a character to player input (with length limit)"""
-        if self.input_active and len(self.player_input) < 150:
-            self.player_input += char
+        """Insert text at the caret (with length limit)"""
+        if self.input_active and self.input.insert(char) and self.quick_replies is not None:
+            self.quick_replies.filter(self.player_input)
     
     def remove_input_char(self):
-        """Remove the last character from player input"""
-        if self.input_active and self.player_input:
-            self.player_input = self.player_input[:-1]
+        """Remove the character before the caret"""
+        if self.input_active and self.input.delete(self.input.caret - 1, self.input.caret):
+            if self.quick_replies is not None:
+                self.quick_replies.filter(self.player_input)
     
-    def send_message(self, ollama_api):
+    def send_message(self, backend):
         """
         Send player message and start AI response generation
         
         Args:
-            ollama_api: OllamaAPI instance for calling the LLM
-        """
-        if self.player_input.strip() and self.current_npc and not self.is_thinking:
-            user_message = self.player_input.strip()
-            print(f"Sending message: {user_message}")
-            
-            # Add to conversation history
-            self.conversation_history.append(f"Player: {user_message}")
-            
-            # Reset response fields and enter thinking state
-            self.npc_response = ""
-            self.thinking_process = "Thinking..."
-            self.final_response = ""
-            self.processed_content = ""
-            self.is_thinking = True
-            self.player_input = ""
-            self.input_active = False
-            self.scroll_offset = 0
-            self.show_thinking_process = True
-            self.think_removed = False
-            self.auto_scroll = True
+            backend: BackendPool (local) or DialogueClient (dialogue server)
             
-            # Start API call in background thread
-            def api_call():
-                system_prompt = self.current_npc.get_personality_prompt()
-                print("Conversation history:", self.conversation_history)
-                
-                # Use recent history only (last 10 messages)
-                recent_history = self.conversation_history[-10:] if len(self.conversation_history) > 10 else self.conversation_history
-                conversation_context = "\n".join(recent_history)
-                
-                full_prompt = f"{conversation_context}\nPlayer: {user_message}\n{self.current_npc.name}: "
-                
-                # Call streaming API
-                ollama_api.generate_response_stream(full_prompt, system_prompt, self.response_queue)
-            
-            self.api_thread = threading.Thread(target=api_call)
-            self.api_thread.daemon = True
-            self.api_thread.start()
+        Returns:
+            bool: True if the message was sent, False if nothing was sent
+                  (empty input, a reply in progress, or over the rate limit)
+        """
+        if not (self.player_input.strip() and self.current_npc and not self.is_thinking) or self.closing:
+            return False
+        # A suggested reply answered in the background costs the backend nothing more, nor does a stored one
+        speculation = self.quick_replies.match(self.player_input) if self.quick_replies else None
+        # (a dialogue server keeps the history itself, so it has to see every message)
+        pregen = self.pregen if not getattr(backend, "is_remote", False) else None
+        pregen_reply = pregen.lookup(self.current_npc.name, self.player_input) if pregen else None
+        if speculation is None and pregen_reply is None and not backend.can_admit(self.SESSION):
+            # Over the per-session rate limit: keep the typed message and wait
+            logger.debug("Message throttled")
+            return False
+        
+        user_message = self.player_input.strip()
+        logger.info("Sending message: %s", user_message)
+        
+        # The prompt is built from the history before the player's line
+        npc = self.current_npc
+        history = self.transcript.recent_lines(PromptBuilder.HISTORY_TURNS)
+        
+        # Add to the transcript
+        self.transcript.append(Transcript.PLAYER, None, user_message)
+        
+        # Reset response fields and enter thinking state
+        self.npc_response = ""
+        self.thinking_process = "Thinking..."
+        self.final_response = ""
+        self.processed_content = ""
+        self.is_thinking = True
+        self.player_input = ""
+        self.input_active = False
+        self.show_thinking_process = True
+        self.think_removed = False
+        self.auto_scroll = True
+        self.set_live_text(self.thinking_process)
+        self.reply_stream = ReplyStream()
+        self.stop_event = StopEvent()
+        self.notice = ""
+        # Whatever an abandoned request still streams goes to its own queue, which nobody reads
+        self.response_queue = queue.Queue()
+        
+        self.backend = backend
+        if pregen_reply is not None:
+            self.cancel_quick_replies()
+            PregenDialogue.replay(pregen_reply, self.response_queue)
+            return True
+        if self.quick_replies is not None:
+            speculation = self.quick_replies.take(user_message)
+            if speculation is not None:
+                logger.debug("Answering from a speculative reply", extra={"fields": {"ready": speculation.ready}})
+                self.stop_event = speculation.stop_event
+                speculation.attach(self.response_queue)
+                return True
+        
+        # A dialogue server keeps the conversation itself; just forward the message
+        if getattr(backend, "is_remote", False):
+            backend.say(npc, user_message, self.response_queue)
+            return True
+        
+        # Queue the generation on the shared scheduler (through the response cache when enabled);
+        # an LLM worker process parses the reply itself and sends display text
+        logger.debug("Conversation history", extra={"fields": {"turns": len(history)}})
+        options = {"parsed": True} if getattr(backend, "parses_replies", False) else {}
+        backend.generate(
+            PromptBuilder.build(history, npc.name, user_message), npc.get_personality_prompt(),
+            self.response_queue, context=PromptBuilder.recent_history(history), message=user_message,
+            npc_name=npc.name, priority=backend.INTERACTIVE, session=self.SESSION, stop_event=self.stop_event,
+            **options)
+        return True
     
     def remove_think_tags(self, text):
         """
@@ -142,20 +266,7 @@ class DialogueSystem:
         Returns:
             str: Cleaned text
         """
-        result = text
-        # Remove all <think>...</think> blocks
-        while "<think>" in result and "</think>" in result:
-            start_idx = result.find("<think>")
-            end_idx = result.find("</think>") + 8
-            if start_idx >= 0 and end_idx > start_idx:
-                result = result[:start_idx] + result[end_idx:]
-            else:
-                break
-        
-        # Replace remaining tags
-        result = result.replace("</think>", "")
-        result = result.replace("<think>", "Thinking...")
-        return result.strip()
+        return PromptBuilder.remove_think_tags(text)
     
     def update_thinking_process(self):
         """Process incoming AI response chunks from the queue"""
@@ -165,28 +276,43 @@ class DialogueSystem:
                     msg_type, content = self.response_queue.get_nowait()
                     
                     if msg_type == 'chunk':
-                        # Accumulate content
-                        self.processed_content += content
-                        
-                        # Process think tags
-                        cleaned_content = self.remove_think_tags(self.processed_content)
-                        
-                        # Update display based on think tag status
-                        if len(cleaned_content) != len(self.processed_content):
-                            self.think_removed = True
-                            if "Thinking..." in self.thinking_process:
-                                self.thinking_process = ""
+                        # Split off action tags as they complete; only visible text accumulates
+                        display, actions = self.reply_stream.feed(content)
+                        self.processed_content = self.reply_stream.raw
+                        for action in actions:
+                            self.handle_action(action)
+                        if self.reply_stream.complete and self.stop_event is not None:
+                            self.stop_event.set()
                         
-                        if self.think_removed:
-                            self.thinking_process = cleaned_content
-                            self.npc_response = cleaned_content
-                        else:
-                            self.thinking_process = self.processed_content
-                            self.npc_response = self.processed_content
-                        
-                        # Auto-scroll to newest content
-                        if self.auto_scroll:
-                            self.update_scroll_position()
+                        # Show the live <think> block until it closes, the answer after that
+                        self.think_removed = self.reply_stream.think_removed
+                        self.thinking_process = display
+                        self.npc_response = display
+                        self.set_live_text(self.thinking_process)
+                    
+                    elif msg_type == 'text':
+                        # Display text already assembled by the LLM worker process:
+                        # (offset to replace from, new text, whether thoughts were removed)
+                        start, text, think_removed = content
+                        self.processed_content = self.processed_content[:start] + text
+                        self.think_removed = think_removed
+                        self.thinking_process = self.processed_content
+                        self.npc_response = self.processed_content
+                        self.set_live_text(self.thinking_process)
+                    
+                    elif msg_type == 'action':
+                        self.handle_action(content)
+                    
+                    elif msg_type == 'done':
+                        # Generation finished: keep the cleaned reply and hand input back
+                        # (built from the parsed chunks, so action tags never reach the screen)
+                        self.finish_reply(*self.reply_stream.finish())
+                        break
+                    
+                    elif msg_type == 'final':
+                        # (reply, thoughts) from the LLM worker process
+                        self.finish_reply(*content)
+                        break
                     
                     elif msg_type == 'error':
                         # Handle errors
@@ -198,47 +324,147 @@ class DialogueSystem:
                         self.input_active = True
                         self.show_thinking_process = False
                         self.think_removed = True
-                        self.auto_scroll = False
+                        self.transcript.append(Transcript.SYSTEM, None, error_msg)
+                        self.set_live_text("")
                         break
                         
             except queue.Empty:
                 pass
     
+    def finish_reply(self, reply, thoughts):
+        """Record a completed reply in the transcript and hand input back"""
+        self.final_response = reply
+        self.npc_response = reply
+        if self.current_npc:
+            name = self.current_npc.name
+            self.transcript.append(Transcript.THOUGHT, name, thoughts)
+            self.transcript.append(Transcript.NPC, name, reply)
+        self.is_thinking = False
+        self.set_live_text("")
+        self.input_active = not self.closing
+        self.propose_quick_replies()
+    
+    def propose_quick_replies(self):
+        """Suggest next player lines and start answering them in the background (local backends only)"""
+        backend = self.backend
+        if not self.suggest_replies or self.closing or self.current_npc is None or backend is None:
+            return
+        if getattr(backend, "is_remote", False):
+            return  # the dialogue server keeps the conversation; it cannot be forked from here
+        if self.quick_replies is None or self.quick_replies.backend is not backend:
+            self.quick_replies = QuickReplies(backend)
+        self.quick_replies.propose(self.current_npc, self.transcript.recent_lines(PromptBuilder.HISTORY_TURNS))
+    
+    def cancel_quick_replies(self):
+        if self.quick_replies is not None:
+            self.quick_replies.cancel()
+    
+    def suggestions(self):
+        """
+        Suggested replies the player can pick
+        
+        Returns:
+            list: (text, answer ready) tuples
+        """
+        if self.quick_replies is None or not self.input_active:
+            return []
+        return [(speculation.text, speculation.ready) for speculation in self.quick_replies.suggestions]
+    
+    def pick_suggestion(self, index, backend):
+        """
+        Send suggestion number index as the player's message
+        
+        Returns:
+            bool: True if a message was sent
+        """
+        suggestions = self.suggestions()
+        if index >= len(suggestions):
+            return False
+        self.player_input = suggestions[index][0]
+        return self.send_message(backend)
+    
+    def handle_action(self, action):
+        """Apply the actions the dialogue box shows itself and queue all of them for the game"""
+        name, argument = action
+        logger.debug("NPC action", extra={"fields": {"action": name, "argument": argument}})
+        if name == "emotion":
+            self.npc_emotion = argument
+        elif name == "end":
+            self.closing = True
+        self.actions.append(action)
+    
+    def pop_actions(self):
+        """
+        Hand the actions received since the last call to the game
+        
+        Returns:
+            list: (name, argument) tuples in arrival order
+        """
+        actions, self.actions = self.actions, []
+        return actions
+    
+    def reset_actions(self):
+        """Forget action state from a previous conversation"""
+        if self.stop_event is not None:
+            self.stop_event.cancel()
+        self.stop_event = None
+        self.reply_stream = ReplyStream()
+        self.actions = []
+        self.npc_emotion = ""
+        self.closing = False
+        self.notice = ""
+    
+    def set_live_text(self, text):
+        """Re-wrap the reply being streamed (once per update, not per frame)"""
+        if text and self.current_npc:
+            self.live_lines = self.wrap_text(f"{self.current_npc.name}: {text}", TRANSCRIPT_WRAP_CHARS)
+        else:
+            self.live_lines = []
+        if self.auto_scroll:
+            self.update_scroll_position()
+    
+    def total_lines(self):
+        """Lines in the transcript plus the reply being streamed"""
+        return self.transcript.total_lines + len(self.live_lines)
+    
+    def max_scroll(self):
+        return max(0, self.total_lines() - self.max_visible_lines)
+    
     def update_scroll_position(self):
         """Update scroll position to show newest content"""
-        display_text = self.thinking_process if self.show_thinking_process else self.npc_response
-        lines = self.wrap_text(display_text, 25)
-        max_scroll = max(0, len(lines) - self.max_visible_lines)
-        self.scroll_offset = max_scroll
+        self.scroll_offset = self.max_scroll()
     
     def end_dialogue(self):
         """End the current dialogue session"""
-        print("Ending dialogue")
+        logger.info("Ending dialogue")
         self.active = False
         if self.current_npc:
             self.current_npc.end_dialogue()
+            if getattr(self.backend, "is_remote", False):
+                self.backend.end(self.current_npc.name)
         
         # Reset all dialogue state
         self.current_npc = None
         self.player_input = ""
+        self.input.blur()
         self.npc_response = ""
         self.thinking_process = ""
         self.final_response = ""
         self.processed_content = ""
         self.input_active = True
         self.is_thinking = False
-        self.conversation_history = []
+        self.cancel_quick_replies()
+        self.transcript.clear()
+        self.live_lines = []
+        self.line_surfaces.clear()
         self.scroll_offset = 0
         self.show_thinking_process = True
         self.think_removed = False
         self.auto_scroll = True
+        self.reset_actions()
         
-        # Clear response queue
-        while not self.response_queue.empty():
-            try:
-                self.response_queue.get_nowait()
-            except queue.Empty:
-                break
+        # Leave anything the cancelled request still sends in the old queue
+        self.response_queue = queue.Queue()
     
     def update_cursor(self):
         """Update blinking cursor state"""
@@ -247,20 +473,45 @@ class DialogueSystem:
             self.show_cursor = not self.show_cursor
             self.cursor_timer = 0
     
+    def scroll_by(self, lines):
+        """
+        Scroll the transcript
+        
+        Args:
+            lines (int): Lines to move, negative is up
+        """
+        self.scroll_offset = min(max(0, self.scroll_offset + lines), self.max_scroll())
+        # Manual scrolling stops following new content until the bottom is reached again
+        self.auto_scroll = self.scroll_offset >= self.max_scroll()
+    
     def scroll_up(self):
         """Scroll up one line"""
-        if self.scroll_offset > 0:
-            self.scroll_offset -= 1
-            self.auto_scroll = False  # Disable auto-scroll when manually scrolling
+        self.scroll_by(-1)
     
     def scroll_down(self):
         """Scroll down one line"""
-        display_text = self.thinking_process if self.show_thinking_process else self.npc_response
-        lines = self.wrap_text(display_text, 25)
-        max_scroll = max(0, len(lines) - self.max_visible_lines)
-        if self.scroll_offset < max_scroll:
-            self.scroll_offset += 1
-            self.auto_scroll = False  # Disable auto-scroll when manually scrolling
+        self.scroll_by(1)
+    
+    def page_up(self):
+        """Scroll up one page"""
+        self.scroll_by(-(self.max_visible_lines - 1))
+    
+    def page_down(self):
+        """Scroll down one page"""
+        self.scroll_by(self.max_visible_lines - 1)
+    
+    def scroll_to_end(self):
+        """Jump to the newest line and follow new content again"""
+        self.auto_scroll = True
+        self.update_scroll_position()
+    
+    def toggle_thoughts(self):
+        """Collapse or expand NPC thoughts in the transcript"""
+        self.transcript.toggle_thoughts()
+        if self.auto_scroll:
+            self.update_scroll_position()
+        else:
+            self.scroll_offset = min(self.scroll_offset, self.max_scroll())
     
     def wrap_text(self, text, max_chars_per_line):
         """
@@ -273,16 +524,55 @@ class DialogueSystem:
         Returns:
             list: List of text lines
         """
-        if not text:
-            return []
-        
-        lines = []
-        for i in range(0, len(text), max_chars_per_line):
-            line = text[i:i + max_chars_per_line]
-            lines.append(line)
+        return wrap(text, max_chars_per_line)
+    
+    def visible_lines(self):
+        """
+        The lines in view: a window of the transcript followed by the live reply
         
+        Returns:
+            list: (kind, text) per line
+        """
+        start = self.scroll_offset
+        count = self.max_visible_lines
+        lines = self.transcript.lines(start, count)
+        live_start = max(0, start - self.transcript.total_lines)
+        for line in self.live_lines[live_start:live_start + count - len(lines)]:
+            lines.append((Transcript.NPC, line))
         return lines
     
+    def render_line(self, kind, line):
+        """
+        Rendered surface of one transcript line (LRU cached, so a still view costs no text rendering)
+        
+        Returns:
+            pygame.Surface: Line surface, or None if it could not be rendered
+        """
+        key = (kind, line)
+        surface = self.line_surfaces.get(key)
+        if surface is not None:
+            self.line_surfaces.move_to_end(key)
+            return surface
+        color = self.line_colors.get(kind, BLACK)
+        try:
+            surface = self.small_font.render(line, True, color)
+            if surface.get_width() >= SCREEN_WIDTH - 80:
+                # Fallback for very wide text
+                surface = self.small_font.render(line[:len(line)//2], True, color)
+        except Exception as e:
+            logger.warning("Error rendering text: %s", e)
+            try:
+                # Replace only what cannot be drawn (unpaired surrogates, control characters)
+                safe_line = "".join(c if c.isprintable() and not "\ud800" <= c <= "\udfff" else "�"
+                                    for c in line)
+                surface = self.small_font.render(safe_line, True, color)
+            except Exception:
+                return None
+        self.line_surfaces[key] = surface
+        while len(self.line_surfaces) > TRANSCRIPT_SURFACE_CACHE:
+            self.line_surfaces.popitem(last=False)
+        return surface
+    
     def draw_dialogue_box(self, screen):
         """
         Draw the dialogue interface on screen
@@ -292,30 +582,34 @@ class DialogueSystem:
         """
         if not self.active:
             return
+        # Laid out against the bottom of the surface, so it keeps native size in any window
+        width, height = screen.get_size()
         
         # Draw semi-transparent dialogue box
-        dialogue_surface = pygame.Surface((SCREEN_WIDTH - 40, 260), pygame.SRCALPHA)
+        dialogue_surface = pygame.Surface((width - 40, 260), pygame.SRCALPHA)
         dialogue_surface.fill((200, 200, 200, 225))  # RGBA: 200 alpha = 78% opacity
-        screen.blit(dialogue_surface, (20, SCREEN_HEIGHT - 280))
+        screen.blit(dialogue_surface, (20, height - 280))
         
         # Draw border
-        dialogue_rect = pygame.Rect(20, SCREEN_HEIGHT - 280, SCREEN_WIDTH - 40, 260)
+        dialogue_rect = pygame.Rect(20, height - 280, width - 40, 260)
         pygame.draw.rect(screen, BLACK, dialogue_rect, 2)
 
         # Draw NPC name
         if self.current_npc:
             name_text = f"{self.current_npc.name}:"
+            if self.npc_emotion:
+                name_text = f"{self.current_npc.name} ({self.npc_emotion}):"
             try:
                 name_surface = self.font.render(name_text, True, (0, 0, 139))  # Dark blue
-                screen.blit(name_surface, (40, SCREEN_HEIGHT - 270))
+                screen.blit(name_surface, (40, height - 270))
             except Exception as e:
-                print(f"Error rendering NPC name: {e}")
+                logger.warning("Error rendering NPC name: %s", e)
         
         # Draw model info
         model_text = f"Model: {OLLAMA_MODEL}"
         try:
             model_surface = self.tiny_font.render(model_text, True, GRAY)
-            screen.blit(model_surface, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 270))
+            screen.blit(model_surface, (width - 150, height - 270))
         except:
             pass
         
@@ -323,82 +617,71 @@ class DialogueSystem:
         if self.is_thinking and not self.think_removed:
             try:
                 status_surface = self.tiny_font.render("Generating...", True, RED)
-                screen.blit(status_surface, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 250))
+                screen.blit(status_surface, (width - 150, height - 250))
             except:
                 pass
         else:
             try:
-                status_surface = self.tiny_font.render("Use ↑↓ to scroll", True, GRAY)
-                screen.blit(status_surface, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 250))
+                status_surface = self.tiny_font.render("↑↓ PgUp PgDn to scroll", True, GRAY)
+                screen.blit(status_surface, (width - 150, height - 250))
             except:
                 pass
         
-        # Determine which text to display
-        display_text = self.thinking_process if self.show_thinking_process else self.npc_response
-        
-        # Wrap text into lines
-        lines = self.wrap_text(display_text, 78)
-        
-        # Calculate visible range
-        start_line = self.scroll_offset
-        end_line = min(start_line + self.max_visible_lines, len(lines))
-        
-        # Draw visible lines
-        for i, line in enumerate(lines[start_line:end_line]):
-            y_pos = SCREEN_HEIGHT - 240 + i * self.text_height
-            if y_pos < SCREEN_HEIGHT - 60 and y_pos >= SCREEN_HEIGHT - 240:
-                try:
-                    text_surface = self.small_font.render(line, True, BLACK)
-                    if text_surface.get_width() < SCREEN_WIDTH - 80:
-                        screen.blit(text_surface, (40, y_pos))
-                    else:
-                        # Fallback for very wide text
-                        short_line = line[:len(line)//2]
-                        text_surface = self.small_font.render(short_line, True, BLACK)
-                        screen.blit(text_surface, (40, y_pos))
-                except Exception as e:
-                    print(f"Error rendering text: {e}")
-                    try:
-                        # ASCII-only fallback
-                        safe_line = "".join(c for c in line if ord(c) < 128)
-                        text_surface = self.small_font.render(safe_line, True, BLACK)
-                        screen.blit(text_surface, (40, y_pos))
-                    except:
-                        pass
+        # Draw only the lines in view (earlier turns are laid out on demand)
+        for i, (kind, line) in enumerate(self.visible_lines()):
+            y_pos = height - 240 + i * self.text_height
+            text_surface = self.render_line(kind, line)
+            if text_surface is not None:
+                screen.blit(text_surface, (40, y_pos))
         
         # Draw input box
-        input_y = SCREEN_HEIGHT - 60
-        pygame.draw.rect(screen, WHITE, (40, input_y, SCREEN_WIDTH - 80, 30))
-        pygame.draw.rect(screen, BLACK, (40, input_y, SCREEN_WIDTH - 80, 30), 1)
-        
-        # Draw input text with cursor
-        input_text = self.player_input
-        if self.input_active and self.show_cursor:
-            input_text += "|"
-        
-        # Ensure text fits in input box
-        max_width = SCREEN_WIDTH - 100
-        while True:
-            try:
-                input_surface = self.small_font.render(input_text, True, BLACK)
-                if input_surface.get_width() <= max_width or len(input_text) <= 1:
-                    break
-                input_text = input_text[:-1]
-            except:
-                break
+        input_y = height - 60
+        pygame.draw.rect(screen, WHITE, (40, input_y, width - 80, 30))
+        pygame.draw.rect(screen, BLACK, (40, input_y, width - 80, 30), 1)
         
-        try:
-            screen.blit(input_surface, (45, input_y + 5))
-        except:
-            pass
+        # Draw input text with cursor (scrolled to keep the cursor in view)
+        self.input.draw(screen, pygame.Rect(45, input_y + 4, width - 90, 22), self.input_active and self.show_cursor)
+        
+        # Suggested replies take the place of the instructions while they last
+        suggestions = self.suggestions()
+        if suggestions and not self.is_thinking and not self.closing:
+            self.draw_suggestions(screen, suggestions)
+            return
         
         # Draw input instructions
         if self.is_thinking and not self.think_removed:
             status_text = "Generating..."
+        elif self.closing:
+            status_text = f"{self.current_npc.name} has ended the conversation, press ESC to leave"
         else:
-            status_text = "Type message and press Enter to send, ESC to exit"
+            status_text = "Type message and press Enter to send, Tab for thoughts, ESC to exit"
+        if self.notice:
+            status_text = f"{self.notice}  |  {status_text}"
         try:
             hint_surface = self.tiny_font.render(status_text, True, (100, 100, 100))
-            screen.blit(hint_surface, (40, SCREEN_HEIGHT - 80))
+            screen.blit(hint_surface, (40, height - 80))
         except:
-            pass
\ No newline at end of file
+            pass
+    
+    def draw_suggestions(self, screen, suggestions):
+        """Draw the suggested replies as 'F1 ...' chips on the hint line (green once the answer is ready)"""
+        width, height = screen.get_size()
+        slot_width = (width - 80) // len(suggestions)
+        max_chars = max(8, slot_width // 7)
+        for i, (text, ready) in enumerate(suggestions):
+            label = f"F{i + 1} {text}"
+            if len(label) > max_chars:
+                label = label[:max_chars - 3] + "..."
+            key = (label, ready)
+            surface = self.suggestion_surfaces.get(key)
+            if surface is None:
+                if len(self.suggestion_surfaces) > 32:
+                    self.suggestion_surfaces.clear()
+                try:
+                    surface = self.tiny_font.render(label, True, (0, 110, 0) if ready else (100, 100, 100))
+                except Exception as e:
+                    logger.warning("Error rendering suggestion: %s", e)
+                    continue
+                self.suggestion_surfaces[key] = surface
+            screen.blit(surface, (40 + i * slot_width, height - 80))
+
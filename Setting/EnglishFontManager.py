@@ -1,23 +1,55 @@
 # EnglishFontManager.py
-import os
-import pygame
+
+from Setting.FontRegistry import FontRegistry
+
 
 class EnglishFontManager:
     """
     English Font Manager for Pygame - Optimized for English text.
     Prioritizes Arial and common sans-serif fonts across platforms.
     Falls back gracefully to system defaults.
+    Font lookup is cached on disk and fonts are created lazily through the
+    shared FontRegistry.
     """
+    # 1. Arial Unicode MS / Arial font files
+    FONT_PATHS = (
+        'C:/Windows/Fonts/ARIALUNI.TTF',           # Windows Arial Unicode
+        'C:/Windows/Fonts/arial.ttf',              # Standard Arial
+        '/usr/share/fonts/truetype/msttcorefonts/arial.ttf',  # Linux (if installed)
+        '/System/Library/Fonts/Arial.ttf',         # macOS Arial
+        '/System/Library/Fonts/Arial Unicode.ttf', # macOS fallback
+    )
+    # 2. System fonts with Arial priority, then common sans-serif alternatives
+    SYSTEM_FONTS = ('arial', 'helvetica', 'verdana', 'geneva', 'sans-serif')
+
     def __init__(self):
         """
-        Initialize the font manager with three standard sizes:
+        Initialize the font manager with three standard sizes (created on first use):
         - font: main text (22px)
         - small_font: UI elements (18px)
         - tiny_font: hints/status (14px)
         """
-        self.font = self.create_english_font(22)
-        self.small_font = self.create_english_font(18)
-        self.tiny_font = self.create_english_font(14)
+        self.registry = FontRegistry.shared()
+        self._font_path = None
+
+    @property
+    def font(self):
+        return self.create_english_font(22)
+
+    @property
+    def small_font(self):
+        return self.create_english_font(18)
+
+    @property
+    def tiny_font(self):
+        return self.create_english_font(14)
+
+    @property
+    def font_path(self):
+        """Resolved font file ("" for pygame's default font)"""
+        if self._font_path is None:
+            self._font_path = self.registry.resolve(self.FONT_PATHS, self.SYSTEM_FONTS)
+        return self._font_path
 
     def create_english_font(self, size=22):
         """
@@ -30,37 +62,4 @@ class EnglishFontManager:
         Returns:
             pygame.Font: A font object (Arial preferred), or fallback
         """
-        # 1. Try Arial Unicode MS (common on Windows)
-        arial_unicode_paths = [
-            'C:/Windows/Fonts/ARIALUNI.TTF',           # Windows Arial Unicode
-            'C:/Windows/Fonts/arial.ttf',              # Standard Arial
-            '/usr/share/fonts/truetype/msttcorefonts/arial.ttf',  # Linux (if installed)
-            '/System/Library/Fonts/Arial.ttf',         # macOS Arial
-            '/System/Library/Fonts/Arial Unicode.ttf', # macOS fallback
-        ]
-
-        for font_path in arial_unicode_paths:
-            if os.path.exists(font_path):
-                try:
-                    print(f"Using Arial font file: {font_path}")
-                    return pygame.font.Font(font_path, size)
-                except Exception as e:
-                    print(f"Failed to load {font_path}: {e}")
-                    continue
-
-        # 2. Try system fonts with Arial priority
-        try:
-            print("Attempting to use Arial via SysFont...")
-            # Try Arial first, then common sans-serif alternatives
-            return pygame.font.SysFont('arial, helvetica, verdana, geneva, sans-serif', size)
-        except Exception as e:
-            print(f"SysFont with Arial failed: {e}")
-
-        # 3. Final fallback: default pygame font
-        try:
-            print("Falling back to default system font.")
-            return pygame.font.Font(None, size)
-        except Exception:
-            # Double fallback in case even Font(None) fails
-            print("Using default font (via SysFont fallback).")
-            return pygame.font.SysFont(None, size)
\ No newline at end of file
+        return self.registry.get_font(self.font_path, size)
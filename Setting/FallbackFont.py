@@ -0,0 +1,151 @@
+# FallbackFont.py
+import unicodedata
+from collections import OrderedDict
+import pygame
+
+from Setting.Configuration import FONT_SURFACE_CACHE
+
+# U+FFFE is a non-character: no font maps it, so it renders as the font's missing-glyph box
+_MISSING = "\ufffe"
+
+
+class GlyphCoverage:
+    """
+    Which font of a fallback chain draws each code point.
+
+    A font covers a character if rendering it does not give the font's
+    missing-glyph box (pygame exposes no cmap lookup). The answer is
+    computed once per code point and shared by every size of the chain.
+    """
+    def __init__(self, fonts):
+        """
+        Args:
+            fonts (list): One pygame.font.Font per chain entry (any size), in preference order
+        """
+        self.fonts = fonts
+        self.missing = [self._pixels(font, _MISSING) for font in fonts]
+        self.index = {}     # code point -> chain position
+
+    @staticmethod
+    def _pixels(font, char):
+        try:
+            surface = font.render(char, True, (0, 0, 0))
+        except (pygame.error, UnicodeError, ValueError):
+            return None
+        return surface.get_size(), pygame.image.tobytes(surface, "RGBA")
+
+    def font_for(self, char):
+        """Chain position of the first font that has a glyph for char (0 if none has)"""
+        position = self.index.get(char)
+        if position is None:
+            position = 0
+            for i, font in enumerate(self.fonts):
+                pixels = self._pixels(font, char)
+                if pixels is not None and pixels != self.missing[i]:
+                    position = i
+                    break
+            self.index[char] = position
+        return position
+
+
+class FallbackFont:
+    """
+    A font made of a chain of fonts, used like pygame.font.Font.
+
+    render() splits the text into runs of characters drawn by the same
+    font (combining marks and format characters stay with the character
+    before them), renders each run and composes them on a shared baseline.
+    Text one font covers entirely, such as plain English, is rendered by
+    that font directly. Rendered surfaces are kept in an LRU, so text drawn
+    every frame is rendered once.
+    """
+    def __init__(self, fonts, coverage, cache_size=FONT_SURFACE_CACHE):
+        """
+        Args:
+            fonts (list): pygame.font.Font per chain entry at this size, in preference order
+            coverage (GlyphCoverage): Coverage of the same chain
+            cache_size (int): Rendered surfaces kept
+        """
+        self.fonts = fonts
+        self.coverage = coverage
+        self.cache_size = cache_size
+        self.surfaces = OrderedDict()   # (text, antialias, color, background) -> Surface
+        self.ascent = max(font.get_ascent() for font in fonts)
+        self.height = self.ascent + max(-font.get_descent() for font in fonts)
+
+    def runs(self, text):
+        """
+        Split text by font
+
+        Returns:
+            list: (pygame.font.Font, text) per run
+        """
+        if text.isascii():
+            return [(self.fonts[self.coverage.font_for("a")], text)]
+        runs = []
+        position = None
+        start = 0
+        for i, char in enumerate(text):
+            if position is not None and unicodedata.category(char) in ("Mn", "Me", "Cf"):
+                continue
+            current = self.coverage.font_for(char)
+            if current != position:
+                if position is not None:
+                    runs.append((self.fonts[position], text[start:i]))
+                position, start = current, i
+        if position is not None:
+            runs.append((self.fonts[position], text[start:]))
+        return runs
+
+    def render(self, text, antialias, color, background=None):
+        """Render text like pygame.font.Font.render, mixing fonts as needed"""
+        key = (text, antialias, tuple(color), tuple(background) if background else None)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        runs = self.runs(text)
+        if len(runs) == 1:
+            font, run = runs[0]
+            surface = self._render_run(font, run, antialias, color, background)
+        else:
+            parts = [(font, self._render_run(font, run, antialias, color, background)) for font, run in runs]
+            surface = pygame.Surface((sum(part.get_width() for _, part in parts), self.height), pygame.SRCALPHA)
+            if background:
+                surface.fill(background)
+            x = 0
+            for font, part in parts:
+                surface.blit(part, (x, self.ascent - font.get_ascent()))
+                x += part.get_width()
+
+        self.surfaces[key] = surface
+        while len(self.surfaces) > self.cache_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def _render_run(self, font, run, antialias, color, background):
+        try:
+            return font.render(run, antialias, color, background)
+        except pygame.error:
+            # Only zero-width characters (pygame refuses to render those)
+            return pygame.Surface((0, self.height), pygame.SRCALPHA)
+
+    def size(self, text):
+        """(width, height) text would be rendered at"""
+        runs = self.runs(text)
+        if len(runs) == 1:
+            return runs[0][0].size(runs[0][1])
+        return sum(font.size(run)[0] for font, run in runs), self.height
+
+    def get_height(self):
+        return self.height
+
+    def get_linesize(self):
+        return max(font.get_linesize() for font in self.fonts)
+
+    def get_ascent(self):
+        return self.ascent
+
+    def get_descent(self):
+        return self.ascent - self.height
@@ -0,0 +1,121 @@
+# FontRegistry.py
+import json
+import os
+import sys
+import threading
+import pygame
+
+from Setting.Configuration import FONT_CACHE_FILE
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+# Sentinel stored in the cache when only pygame's built-in font is available
+DEFAULT_FONT = ""
+
+
+class FontRegistry:
+    """
+    Shared font resolution and font object store.
+
+    Resolving a family list (probing font paths, then pygame.font.match_font,
+    which scans the system font directory) happens once per platform and
+    family list; the result is persisted in FONT_CACHE_FILE so later runs
+    skip the scan. Font objects are created lazily per (path, size) and
+    shared by every font manager.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, cache_file=FONT_CACHE_FILE):
+        self.cache_file = cache_file
+        self.resolved = {}      # cache key -> font path ("" = pygame default font)
+        self.fonts = {}         # (path, size) -> pygame.font.Font
+        self.lock = threading.RLock()
+        self._load_cache()
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide registry"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                self.resolved = json.load(f)
+        except (OSError, ValueError):
+            self.resolved = {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_path = self.cache_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.resolved, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning("Could not write font cache %s: %s", self.cache_file, e)
+
+    def resolve(self, font_paths=(), system_names=()):
+        """
+        Find the first usable font for a family list
+
+        Args:
+            font_paths (list): Font files to try in order
+            system_names (list): Family names for pygame.font.match_font
+
+        Returns:
+            str: Font file path, or "" for pygame's default font
+        """
+        key = "|".join([sys.platform, *font_paths, "--", *system_names])
+        with self.lock:
+            path = self.resolved.get(key)
+            if path is not None and (path == DEFAULT_FONT or os.path.exists(path)):
+                return path
+
+            path = DEFAULT_FONT
+            for candidate in font_paths:
+                if os.path.exists(candidate):
+                    path = candidate
+                    break
+            else:
+                for name in system_names:
+                    try:
+                        match = pygame.font.match_font(name)
+                    except Exception as e:
+                        logger.warning("Font lookup for %s failed: %s", name, e)
+                        match = None
+                    if match:
+                        path = match
+                        break
+
+            logger.info("Resolved font", extra={"fields": {"path": path or "pygame default"}})
+            self.resolved[key] = path
+            self._save_cache()
+            return path
+
+    def get_font(self, path, size):
+        """
+        Get a font object, creating it on first use
+
+        Args:
+            path (str): Font file path, or "" for pygame's default font
+            size (int): Font size
+
+        Returns:
+            pygame.font.Font: Shared font object
+        """
+        key = (path, size)
+        with self.lock:
+            font = self.fonts.get(key)
+            if font is None:
+                try:
+                    font = pygame.font.Font(path or None, size)
+                except Exception as e:
+                    logger.warning("Failed to load font %s: %s", path, e)
+                    font = pygame.font.Font(None, size)
+                self.fonts[key] = font
+            return font
@@ -0,0 +1,76 @@
+# Framebuffer.py
+import pygame
+
+from Setting.Configuration import RENDER_FRAMEBUFFER, RENDER_INTEGER_SCALING, BLACK
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+class Framebuffer:
+    """
+    Fixed-size world framebuffer scaled to a resizable window.
+
+    The room, sprites and characters are drawn into `world`, whose size
+    is the pixel grid the maps and sprites are authored for, whatever
+    the window size. present() scales it once per frame with
+    nearest-neighbour sampling into the centred `viewport`, by a whole
+    factor when RENDER_INTEGER_SCALING is set (letterboxed) and to the
+    largest fitting size otherwise; a window smaller than the framebuffer
+    is always fitted. Text and other UI are then drawn on `ui`, the
+    window area of the viewport, at native resolution; to_ui() maps world
+    positions into it.
+
+    With RENDER_FRAMEBUFFER off, world and ui are both the window and
+    nothing is scaled (the original fixed-size window).
+    """
+    def __init__(self, size, caption, enabled=RENDER_FRAMEBUFFER, integer_scaling=RENDER_INTEGER_SCALING):
+        """
+        Open the window
+
+        Args:
+            size (tuple): (width, height) of the world framebuffer and the initial window
+            caption (str): Window title
+            enabled (bool): Draw the world into a scaled framebuffer
+            integer_scaling (bool): Scale by whole factors only
+        """
+        self.size = size
+        self.enabled = enabled
+        self.integer_scaling = integer_scaling
+        self.window = pygame.display.set_mode(size, pygame.RESIZABLE if enabled else 0)
+        pygame.display.set_caption(caption)
+        self.world = pygame.Surface(size).convert() if enabled else self.window
+        self.resize()
+
+    def resize(self):
+        """Recompute the viewport for the current window size (call after a resize event)"""
+        self.window = pygame.display.get_surface()
+        if not self.enabled:
+            self.world = self.ui = self.window
+            self.scale = 1.0
+            self.viewport = self.window.get_rect()
+            return
+        window_width, window_height = self.window.get_size()
+        width, height = self.size
+        fit = min(window_width / width, window_height / height)
+        self.scale = float(int(fit)) if self.integer_scaling and fit >= 1 else fit
+        self.viewport = pygame.Rect(0, 0, max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+        self.viewport.center = self.window.get_rect().center
+        self.ui = self.window.subsurface(self.viewport)
+        # The letterbox stays black: only the viewport is drawn from now on
+        self.window.fill(BLACK)
+        logger.info("Framebuffer scaled", extra={"fields": {
+            "window": (window_width, window_height), "scale": round(self.scale, 3), "viewport": tuple(self.viewport)}})
+
+    def present(self):
+        """Copy the world into the window (before the UI is drawn)"""
+        if not self.enabled:
+            return
+        if self.scale == 1.0:
+            self.window.blit(self.world, self.viewport)
+        else:
+            pygame.transform.scale(self.world, self.viewport.size, self.ui)
+
+    def to_ui(self, x, y):
+        """Position in the world framebuffer -> position on the ui surface"""
+        return round(x * self.scale), round(y * self.scale)
@@ -0,0 +1,158 @@
+# LogManager.py
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+from Setting.Configuration import (
+    LOG_LEVEL, LOG_FORMAT, LOG_DATE_FORMAT, LOG_FILE,
+    LOG_RATE_LIMIT_INTERVAL, LOG_RATE_LIMIT_BURST
+)
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formatter that appends structured fields as key=value pairs.
+    Fields are passed through the standard `extra` argument:
+        logger.info("Detected NPC", extra={"fields": {"npc": name}})
+    """
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            pairs = " ".join(f"{key}={value!r}" for key, value in fields.items())
+            text = f"{text} | {pairs}"
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text = f"{text} (suppressed {suppressed} similar)"
+        return text
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repeated records from the same call site.
+    Each (logger, message template) pair may emit `burst` records per
+    `interval` seconds; the count of dropped records is attached to the
+    next record that gets through. Warnings and errors are never dropped.
+    """
+    def __init__(self, interval=LOG_RATE_LIMIT_INTERVAL, burst=LOG_RATE_LIMIT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # key -> [window_start, emitted, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.interval <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the raw record to the listener thread.
+    The stock handler formats the message in the calling thread; here
+    formatting and I/O both happen on the background listener.
+    """
+    def prepare(self, record):
+        return copy.copy(record)
+
+
+class LogManager:
+    """
+    Process-wide logging setup.
+    All loggers under the "llmrpg" namespace write to an in-memory queue;
+    a QueueListener thread formats records and writes them to stderr
+    (and optionally a file) so the render thread never blocks on I/O.
+    """
+    ROOT_NAME = "llmrpg"
+
+    _listener = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def setup(cls, level=None, log_file=None):
+        """
+        Install the queue handler and start the background writer (idempotent)
+
+        Args:
+            level (str): Log level name, overrides LLMRPG_LOG_LEVEL and LOG_LEVEL
+            log_file (str): Optional file path, overrides LLMRPG_LOG_FILE and LOG_FILE
+        """
+        with cls._lock:
+            if cls._listener is not None:
+                return
+
+            level = level or os.environ.get("LLMRPG_LOG_LEVEL", LOG_LEVEL)
+            log_file = log_file or os.environ.get("LLMRPG_LOG_FILE", LOG_FILE)
+
+            formatter = StructuredFormatter(LOG_FORMAT, LOG_DATE_FORMAT)
+            handlers = []
+
+            stream_handler = logging.StreamHandler(sys.stderr)
+            stream_handler.setFormatter(formatter)
+            handlers.append(stream_handler)
+
+            if log_file:
+                file_handler = logging.FileHandler(log_file, encoding="utf-8")
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = DeferredQueueHandler(log_queue)
+            queue_handler.addFilter(RateLimitFilter())
+
+            root = logging.getLogger(cls.ROOT_NAME)
+            root.setLevel(level.upper() if isinstance(level, str) else level)
+            root.addHandler(queue_handler)
+            root.propagate = False
+
+            cls._listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True)
+            cls._listener.start()
+            atexit.register(cls.shutdown)
+
+    @classmethod
+    def shutdown(cls):
+        """Flush pending records and stop the background writer"""
+        with cls._lock:
+            if cls._listener is None:
+                return
+            cls._listener.stop()
+            cls._listener = None
+            root = logging.getLogger(cls.ROOT_NAME)
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+
+
+def get_logger(name):
+    """
+    Get a per-module logger under the game's namespace
+
+    Args:
+        name (str): Module name, usually __name__
+
+    Returns:
+        logging.Logger: Logger routed through the background queue
+    """
+    LogManager.setup()
+    return logging.getLogger(f"{LogManager.ROOT_NAME}.{name}")
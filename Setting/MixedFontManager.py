@@ -0,0 +1,84 @@
+# MixedFontManager.py
+
+from Setting.ChineseFontManager import ChineseFontManager
+from Setting.EnglishFontManager import EnglishFontManager
+from Setting.FallbackFont import FallbackFont, GlyphCoverage
+from Setting.FontRegistry import FontRegistry, DEFAULT_FONT
+
+
+class MixedFontManager:
+    """
+    Font manager for text in any script the model answers in.
+
+    The fonts of EnglishFontManager, ChineseFontManager and an emoji/symbol
+    family form one fallback chain (duplicates removed, pygame's default
+    font last); each size is a FallbackFont over that chain, so English,
+    Chinese and emoji mix in one line. Glyph coverage is shared by all
+    sizes.
+    """
+    # Monochrome emoji and symbol fonts (bitmap-only colour emoji fonts cannot be scaled)
+    EMOJI_FONT_PATHS = (
+        'C:/Windows/Fonts/seguiemj.ttf',                          # Windows Segoe UI Emoji
+        'C:/Windows/Fonts/seguisym.ttf',                          # Windows Segoe UI Symbol
+        '/usr/share/fonts/truetype/noto/NotoEmoji-Regular.ttf',   # Linux Noto Emoji
+        '/usr/share/fonts/truetype/ancient-scripts/Symbola_hint.ttf',
+        '/System/Library/Fonts/Apple Symbols.ttf',                # macOS
+    )
+    EMOJI_SYSTEM_FONTS = ('segoeuiemoji', 'notoemoji', 'symbola', 'dejavusans')
+
+    def __init__(self):
+        """
+        Initialize the font manager with three standard sizes (created on first use):
+        - font: main text (22px)
+        - small_font: UI elements (18px)
+        - tiny_font: hints/status (14px)
+        """
+        self.registry = FontRegistry.shared()
+        self.english = EnglishFontManager()
+        self.chinese = ChineseFontManager()
+        self._font_paths = None
+        self._coverage = None
+        self.fonts = {}     # size -> FallbackFont
+
+    @property
+    def font(self):
+        return self.create_mixed_font(22)
+
+    @property
+    def small_font(self):
+        return self.create_mixed_font(18)
+
+    @property
+    def tiny_font(self):
+        return self.create_mixed_font(14)
+
+    @property
+    def font_paths(self):
+        """Resolved fallback chain, in preference order ("" is pygame's default font)"""
+        if self._font_paths is None:
+            chain = [self.english.font_path, self.chinese.font_path,
+                     self.registry.resolve(self.EMOJI_FONT_PATHS, self.EMOJI_SYSTEM_FONTS), DEFAULT_FONT]
+            self._font_paths = list(dict.fromkeys(chain))
+        return self._font_paths
+
+    @property
+    def coverage(self):
+        if self._coverage is None:
+            self._coverage = GlyphCoverage([self.registry.get_font(path, 18) for path in self.font_paths])
+        return self._coverage
+
+    def create_mixed_font(self, size=22):
+        """
+        Creates a font that falls back along the chain for characters the first font lacks
+
+        Args:
+            size (int): Font size
+
+        Returns:
+            FallbackFont: Used like pygame.font.Font
+        """
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = FallbackFont(
+                [self.registry.get_font(path, size) for path in self.font_paths], self.coverage)
+        return font
@@ -0,0 +1,268 @@
+# TextInput.py
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+import pygame
+
+from Setting.Configuration import (BLACK, TEXT_INPUT_MAX_LENGTH, TEXT_INPUT_GLYPH_CACHE,
+                                   KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL)
+
+_ZWJ = "\u200d"
+
+
+def clusters(text):
+    """
+    Split text into characters as the caret moves over them: combining marks,
+    format characters and emoji joined with ZWJ stay with the character before them
+    """
+    result = []
+    for char in text:
+        if result and (unicodedata.category(char) in ("Mn", "Me", "Cf") or result[-1].endswith(_ZWJ)):
+            result[-1] += char
+        else:
+            result.append(char)
+    return result
+
+
+class TextInput:
+    """
+    Single-line text field with a caret, horizontal scrolling and IME composition.
+
+    The text is kept as a list of characters (clusters()) with the advance
+    width of each and the running total of those widths, so measuring any
+    prefix is a lookup. Each distinct character is rendered once (an LRU of
+    glyph surfaces); an edit re-measures only the inserted characters and
+    re-adds the widths after the edit, and a frame blits just the characters
+    that fall inside the box. The cost of a keystroke or a frame therefore
+    does not grow with the text.
+
+    Committed text arrives as TEXTINPUT events and the IME's unfinished
+    composition as TEXTEDITING; the composition is drawn underlined at the
+    caret and is not part of the text.
+    """
+    def __init__(self, font, color=BLACK, max_length=TEXT_INPUT_MAX_LENGTH, glyph_cache=TEXT_INPUT_GLYPH_CACHE):
+        """
+        Args:
+            font: pygame.font.Font or FallbackFont
+            color (tuple): Text colour
+            max_length (int): Most characters (code points) the text may hold
+            glyph_cache (int): Rendered characters kept
+        """
+        self.font = font
+        self.color = color
+        self.max_length = max_length
+        self.glyph_cache = glyph_cache
+        self.glyphs = {}            # character -> (Surface, y offset); insertion order is the LRU order
+        self.chars = []             # clusters of the text
+        self.advances = []          # width of each cluster
+        self.offsets = [0]          # x of each cluster boundary (offsets[i] = width of chars[:i])
+        self.length = 0             # code points in the text
+        self.caret = 0              # cluster index
+        self.scroll_x = 0
+        self.composition = ""       # IME text being composed at the caret
+        self.composition_surface = None
+        self.text_rect = None       # Last rect handed to the IME
+
+    # Text
+
+    @property
+    def text(self):
+        return "".join(self.chars)
+
+    @text.setter
+    def text(self, value):
+        """Replace the text; the caret goes to the end"""
+        self.chars = []
+        self.advances = []
+        self.offsets = [0]
+        self.length = 0
+        self.caret = 0
+        self.composition = ""
+        self.composition_surface = None
+        self.insert(value[:self.max_length])
+
+    def insert(self, text):
+        """
+        Insert text at the caret (cut to max_length)
+
+        Returns:
+            bool: True if anything was inserted
+        """
+        text = text[:self.max_length - self.length]
+        new = clusters(text)
+        if not new:
+            return False
+        at = self.caret
+        self.chars[at:at] = new
+        self.advances[at:at] = [self._glyph(char)[0].get_width() for char in new]
+        self.length += len(text)
+        self.caret += len(new)
+        self._measure(at)
+        return True
+
+    def delete(self, start, end):
+        """Remove clusters [start, end) and put the caret at start"""
+        start, end = max(0, start), min(len(self.chars), end)
+        if start >= end:
+            return False
+        self.length -= sum(len(char) for char in self.chars[start:end])
+        del self.chars[start:end]
+        del self.advances[start:end]
+        self.caret = start
+        self._measure(start)
+        return True
+
+    def _measure(self, start):
+        """Redo the running widths from cluster start on"""
+        del self.offsets[start + 1:]
+        self.offsets.extend(accumulate(self.advances[start:], initial=self.offsets[start]))
+        del self.offsets[start + 1]     # accumulate() repeats its initial value
+
+    def _glyph(self, char):
+        """(Surface, y offset) of one cluster, rendered on first use"""
+        glyph = self.glyphs.pop(char, None)
+        if glyph is None:
+            try:
+                surface = self.font.render(char, True, self.color)
+            except pygame.error:
+                # Zero-width characters
+                surface = pygame.Surface((0, self.font.get_height()), pygame.SRCALPHA)
+            # A FallbackFont draws a single character with one font of its chain: put it on the shared baseline
+            runs = self.font.runs(char) if hasattr(self.font, "runs") else None
+            y = self.font.get_ascent() - runs[0][0].get_ascent() if runs else 0
+            glyph = (surface, y)
+            if len(self.glyphs) >= self.glyph_cache:
+                del self.glyphs[next(iter(self.glyphs))]
+        self.glyphs[char] = glyph
+        return glyph
+
+    # Caret
+
+    def _word_start(self, index):
+        """Start of the word before index (skipping the spaces before it)"""
+        while index > 0 and self.chars[index - 1].isspace():
+            index -= 1
+        while index > 0 and not self.chars[index - 1].isspace():
+            index -= 1
+        return index
+
+    def _word_end(self, index):
+        """End of the word after index (skipping the spaces before it)"""
+        count = len(self.chars)
+        while index < count and self.chars[index].isspace():
+            index += 1
+        while index < count and not self.chars[index].isspace():
+            index += 1
+        return index
+
+    def handle_event(self, event):
+        """
+        Apply a TEXTINPUT, TEXTEDITING or editing KEYDOWN event
+
+        Keys: Left/Right (Ctrl: by word), Home/End, Backspace/Delete (Ctrl: by word).
+
+        Returns:
+            tuple: (handled, text changed)
+        """
+        if event.type == pygame.TEXTINPUT:
+            self.composition = ""
+            self.composition_surface = None
+            # Control characters (Tab, Enter) are keys here, not text
+            return True, self.insert("".join(char for char in event.text if unicodedata.category(char) != "Cc"))
+        if event.type == pygame.TEXTEDITING:
+            self.composition = event.text
+            self.composition_surface = self.font.render(event.text, True, self.color) if event.text else None
+            return True, False
+        if event.type != pygame.KEYDOWN or self.composition:
+            # While composing, keys belong to the IME
+            return False, False
+
+        word = event.mod & pygame.KMOD_CTRL
+        key = event.key
+        if key == pygame.K_LEFT:
+            self.caret = self._word_start(self.caret) if word else max(0, self.caret - 1)
+        elif key == pygame.K_RIGHT:
+            self.caret = self._word_end(self.caret) if word else min(len(self.chars), self.caret + 1)
+        elif key == pygame.K_HOME:
+            self.caret = 0
+        elif key == pygame.K_END:
+            self.caret = len(self.chars)
+        elif key == pygame.K_BACKSPACE:
+            start = self._word_start(self.caret) if word else self.caret - 1
+            return True, self.delete(start, self.caret)
+        elif key == pygame.K_DELETE:
+            end = self._word_end(self.caret) if word else self.caret + 1
+            return True, self.delete(self.caret, end)
+        else:
+            return False, False
+        return True, False
+
+    # Focus
+
+    @staticmethod
+    def focus():
+        """Start receiving text (with key repeat) from the keyboard and IME; no-op without a display"""
+        if pygame.display.get_init():
+            pygame.key.set_repeat(KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL)
+            pygame.key.start_text_input()
+
+    def blur(self):
+        """Stop text input, so the IME stays out of the way of movement keys"""
+        if pygame.display.get_init():
+            pygame.key.set_repeat()
+            pygame.key.stop_text_input()
+        self.composition = ""
+        self.composition_surface = None
+        self.text_rect = None
+
+    # Drawing
+
+    def draw(self, screen, rect, show_caret=True):
+        """
+        Draw the visible part of the text inside rect, scrolled so the caret shows
+
+        Args:
+            screen: Pygame surface to draw on
+            rect (pygame.Rect): Text area
+            show_caret (bool): Caret visible this frame (blinking)
+        """
+        offsets = self.offsets
+        caret_x = offsets[self.caret]
+        composition_width = self.composition_surface.get_width() if self.composition_surface else 0
+        end_x = caret_x + composition_width
+        if caret_x < self.scroll_x:
+            self.scroll_x = max(0, caret_x - rect.width // 4)
+        elif end_x > self.scroll_x + rect.width - 2:
+            self.scroll_x = end_x - rect.width + 2
+        self.scroll_x = max(0, min(self.scroll_x, max(0, offsets[-1] + composition_width - rect.width + 2)))
+
+        # Characters overlapping [scroll_x, scroll_x + width); those after the caret move right of the composition
+        left = self.scroll_x
+        first = max(0, bisect_right(offsets, left) - 1)
+        last = min(len(self.chars), bisect_right(offsets, left + rect.width))
+        x0 = rect.x - left
+        blits = []
+        for i in range(first, last):
+            surface, y = self._glyph(self.chars[i])
+            shift = composition_width if i >= self.caret else 0
+            blits.append((surface, (x0 + offsets[i] + shift, rect.y + y)))
+
+        clip = screen.get_clip()
+        screen.set_clip(rect)
+        screen.blits(blits, doreturn=False)
+        caret_px = x0 + caret_x
+        if self.composition_surface is not None:
+            screen.blit(self.composition_surface, (caret_px, rect.y))
+            underline_y = rect.y + self.font.get_height() - 1
+            pygame.draw.line(screen, self.color, (caret_px, underline_y), (caret_px + composition_width, underline_y))
+        if show_caret:
+            caret_px += composition_width
+            pygame.draw.line(screen, self.color, (caret_px, rect.y + 1), (caret_px, rect.y + self.font.get_height() - 2))
+        screen.set_clip(clip)
+
+        # Tell the IME where the text is, so its candidate window opens next to it
+        abs_x, abs_y = screen.get_abs_offset()
+        text_rect = (abs_x + rect.x, abs_y + rect.y, rect.width, rect.height)
+        if text_rect != self.text_rect:
+            self.text_rect = text_rect
+            pygame.key.set_text_input_rect(text_rect)
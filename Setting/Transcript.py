@@ -0,0 +1,252 @@
+import json
+import os
+import tempfile
+import unicodedata
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque
+
+from Setting.Configuration import (TRANSCRIPT_MEMORY_ENTRIES, TRANSCRIPT_SPILL_DIR, TRANSCRIPT_WRAP_CHARS,
+                                   TRANSCRIPT_LAYOUT_CACHE, TRANSCRIPT_COLLAPSE_THOUGHTS)
+from Setting.LogManager import get_logger
+
+logger = get_logger(__name__)
+
+
+def wrap(text, max_chars_per_line):
+    """
+    Wrap text into lines of at most max_chars_per_line characters
+    (wide characters, such as Chinese, count as two)
+
+    Args:
+        text (str): Text to wrap (newlines start a new line)
+        max_chars_per_line (int): Maximum characters per line
+
+    Returns:
+        list: List of text lines
+    """
+    if not text:
+        return []
+    lines = []
+    for paragraph in text.split("\n"):
+        if not paragraph:
+            lines.append("")
+            continue
+        if paragraph.isascii():
+            for i in range(0, len(paragraph), max_chars_per_line):
+                lines.append(paragraph[i:i + max_chars_per_line])
+            continue
+        start = columns = 0
+        for i, char in enumerate(paragraph):
+            width = 2 if unicodedata.east_asian_width(char) in "WF" else 1
+            if columns + width > max_chars_per_line and i > start:
+                lines.append(paragraph[start:i])
+                start, columns = i, 0
+            columns += width
+        lines.append(paragraph[start:])
+    return lines
+
+
+class Transcript:
+    """
+    The whole conversation with one NPC, for scrollback.
+
+    The newest entries live in a ring buffer; older ones are appended to a
+    spill file under cache/ and read back only when scrolled into view. Per
+    entry only a few bytes of index are kept (file offset, kind, wrapped
+    line count, first line), so a long session costs the same memory as a
+    short one apart from that index.
+
+    Lines are addressed as one virtual list: lines(start, count) finds the
+    first entry by bisecting the line index and wraps just the entries that
+    are visible (with a small LRU of wrapped entries), so the cost of a
+    frame depends on the size of the view, not on the length of the
+    conversation.
+    """
+    PLAYER = "player"
+    NPC = "npc"
+    GREETING = "greeting"    # NPC's opening line, in the prompt without a name
+    THOUGHT = "thought"      # <think> content of an NPC reply
+    SYSTEM = "system"        # errors and notices, not part of the prompt
+
+    _KINDS = (PLAYER, NPC, GREETING, THOUGHT, SYSTEM)
+
+    def __init__(self, wrap_chars=TRANSCRIPT_WRAP_CHARS, memory_entries=TRANSCRIPT_MEMORY_ENTRIES,
+                 spill_dir=TRANSCRIPT_SPILL_DIR, layout_cache=TRANSCRIPT_LAYOUT_CACHE):
+        """
+        Args:
+            wrap_chars (int): Characters per wrapped line
+            memory_entries (int): Entries kept in memory before spilling to disk
+            spill_dir (str): Directory for the spill file
+            layout_cache (int): Wrapped entries kept in the layout LRU
+        """
+        self.wrap_chars = wrap_chars
+        self.memory_entries = max(1, memory_entries)
+        self.spill_dir = spill_dir
+        self.layout_cache = layout_cache
+        self.collapse_thoughts = TRANSCRIPT_COLLAPSE_THOUGHTS
+        self.spill_file = None
+        self.spill_path = None
+        self.generation = 0               # Bumped by clear(); entries never change within a generation
+        self.clear()
+
+    def clear(self):
+        """Forget the conversation (and delete the spill file)"""
+        self._close_spill()
+        self.generation += 1
+        self.recent = deque()             # (kind, speaker, text) of the newest entries
+        self.spilled = 0                  # entries [0, spilled) are on disk
+        self.offsets = array('q')         # spill file offset of each spilled entry
+        self.kinds = array('b')           # index into _KINDS per entry
+        self.line_counts = array('l')     # wrapped lines per entry (thoughts expanded)
+        self.starts = array('q')          # first virtual line of each entry
+        self.total_lines = 0
+        self.layouts = OrderedDict()      # entry index -> wrapped lines
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def append(self, kind, speaker, text):
+        """
+        Add an entry at the end of the transcript
+
+        Args:
+            kind (str): One of PLAYER, NPC, GREETING, THOUGHT, SYSTEM
+            speaker (str): Name shown in front of the text (None for none)
+            text (str): Entry text
+        """
+        if kind == self.THOUGHT and not text.strip():
+            return
+        entry = (kind, speaker, text)
+        self.recent.append(entry)
+        self.kinds.append(self._KINDS.index(kind))
+        self.line_counts.append(len(self._wrap_entry(entry, collapsed=False)))
+        self.starts.append(self.total_lines)
+        self.total_lines += self._visible_count(len(self.kinds) - 1)
+        while len(self.recent) > self.memory_entries:
+            self._spill(self.recent.popleft())
+
+    def _visible_count(self, index):
+        if self.collapse_thoughts and self._KINDS[self.kinds[index]] == self.THOUGHT:
+            return 1
+        return self.line_counts[index]
+
+    def toggle_thoughts(self):
+        """Collapse or expand every thought; the line index is rebuilt"""
+        self.collapse_thoughts = not self.collapse_thoughts
+        self.layouts.clear()
+        total = 0
+        for i in range(len(self.kinds)):
+            self.starts[i] = total
+            total += self._visible_count(i)
+        self.total_lines = total
+
+    # Spill file
+
+    def _spill(self, entry):
+        if self.spill_file is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            fd, self.spill_path = tempfile.mkstemp(prefix="transcript-", suffix=".jsonl", dir=self.spill_dir)
+            self.spill_file = os.fdopen(fd, "w+b")
+            logger.debug("Transcript spilling to disk", extra={"fields": {"path": self.spill_path}})
+        self.spill_file.seek(0, os.SEEK_END)
+        self.offsets.append(self.spill_file.tell())
+        self.spill_file.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.spilled += 1
+
+    def _close_spill(self):
+        if self.spill_file is None:
+            return
+        self.spill_file.close()
+        try:
+            os.remove(self.spill_path)
+        except OSError as e:
+            logger.warning("Could not remove transcript spill file %s: %s", self.spill_path, e)
+        self.spill_file = None
+        self.spill_path = None
+
+    def close(self):
+        self._close_spill()
+
+    def entry(self, index):
+        """(kind, speaker, text) of entry index, read from disk if it was spilled"""
+        if index >= self.spilled:
+            return self.recent[index - self.spilled]
+        self.spill_file.flush()
+        self.spill_file.seek(self.offsets[index])
+        return tuple(json.loads(self.spill_file.readline().decode("utf-8")))
+
+    # Layout
+
+    def _wrap_entry(self, entry, collapsed):
+        kind, speaker, text = entry
+        if kind == self.THOUGHT:
+            if collapsed:
+                return [f"  ({speaker} thought for {len(text)} characters, Tab to expand)"]
+            return ["  " + line for line in wrap(f"(thinking) {text}", self.wrap_chars - 2)]
+        if kind == self.PLAYER:
+            return wrap(f"You: {text}", self.wrap_chars)
+        if speaker:
+            return wrap(f"{speaker}: {text}", self.wrap_chars)
+        return wrap(text, self.wrap_chars)
+
+    def _layout(self, index):
+        lines = self.layouts.get(index)
+        if lines is not None:
+            self.layouts.move_to_end(index)
+            return lines
+        kind = self._KINDS[self.kinds[index]]
+        lines = self._wrap_entry(self.entry(index), self.collapse_thoughts and kind == self.THOUGHT)
+        self.layouts[index] = lines
+        while len(self.layouts) > self.layout_cache:
+            self.layouts.popitem(last=False)
+        return lines
+
+    def lines(self, start, count):
+        """
+        A window of the virtual line list
+
+        Args:
+            start (int): First line
+            count (int): Maximum number of lines
+
+        Returns:
+            list: (kind, text) per line
+        """
+        result = []
+        if start >= self.total_lines or count <= 0:
+            return result
+        index = max(0, bisect_right(self.starts, start) - 1)
+        skip = start - self.starts[index]
+        while index < len(self.kinds) and len(result) < count:
+            kind = self._KINDS[self.kinds[index]]
+            for line in self._layout(index)[skip:skip + count - len(result)]:
+                result.append((kind, line))
+            skip = 0
+            index += 1
+        return result
+
+    # Prompt
+
+    def recent_lines(self, count):
+        """
+        The newest conversation lines in prompt form ("Player: ...", "Name: ...")
+
+        Args:
+            count (int): Maximum number of lines (should not exceed memory_entries)
+
+        Returns:
+            list: Oldest first
+        """
+        lines = []
+        for kind, speaker, text in reversed(self.recent):
+            if len(lines) >= count:
+                break
+            if kind == self.PLAYER:
+                lines.append(f"Player: {text}")
+            elif kind == self.NPC:
+                lines.append(f"{speaker}: {text}")
+            elif kind == self.GREETING:
+                lines.append(text)
+        lines.reverse()
+        return lines
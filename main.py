@@ -1,13 +1,98 @@
-import pygame
+import time
+
+# Startup metric: time from launch to first interactive frame
+LAUNCH_TIME = time.perf_counter()
+
+import argparse
+import importlib.util
 import sys
 
-from Init.Game import Game
+from Setting.Configuration import SERVER_HOST, SERVER_PORT, LLM_WORKER_ENABLED, PREGEN_CONCURRENCY
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="LLM RPG Game")
+    parser.add_argument("--server", action="store_true",
+                        help="run the headless multi-session dialogue server instead of the game")
+    parser.add_argument("--host", default=SERVER_HOST, help="dialogue server interface (with --server)")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="dialogue server port (with --server)")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="use a running dialogue server for NPC replies")
+    parser.add_argument("--record", metavar="FILE", help="record every LLM generation to a trace file")
+    parser.add_argument("--replay", metavar="FILE", help="answer from a recorded trace instead of OLLAMA")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="multiplier for recorded chunk timings (0 = as fast as possible)")
+    parser.add_argument("--llm-worker", action="store_true", default=LLM_WORKER_ENABLED,
+                        help="run the LLM client and reply parsing in a separate process")
+    parser.add_argument("--tune", action="store_true",
+                        help="measure backend options on this host and write the generation profile")
+    parser.add_argument("--tune-trace", metavar="FILE", action="append", default=[],
+                        help="take the tuning prompts from a recorded trace (repeatable)")
+    parser.add_argument("--pregen", metavar="CORPUS",
+                        help="generate NPC replies for a corpus of player messages into a dialogue file")
+    parser.add_argument("--pregen-out", metavar="FILE", help="dialogue file written by --pregen")
+    parser.add_argument("--pregen-concurrency", type=int, default=PREGEN_CONCURRENCY,
+                        help="most generations --pregen keeps in flight")
+    parser.add_argument("--load", metavar="FILE",
+                        help="restore a world snapshot (quicksave, autosave or one copied from another machine)")
+    parser.add_argument("--bench-replay", metavar="FILE",
+                        help="replay a trace through the dialogue pipeline headless and print a report")
+    return parser.parse_args()
+
+
+def trace_options(args):
+    return {"record_file": args.record, "replay_file": args.replay, "replay_speed": args.replay_speed}
+
+
+def run_server(args):
+    """Headless mode: no window, no pygame display"""
+    from Server.DialogueServer import DialogueServer
+    print(f"Dialogue server on {args.host}:{args.port} (Ctrl+C to stop)")
+    DialogueServer(args.host, args.port, **trace_options(args)).run()
+
+
+def run_replay_benchmark(args):
+    """Headless regression run over a recorded trace; prints a JSON report"""
+    import json
+    from Init.ReplayBenchmark import ReplayBenchmark
+    report = ReplayBenchmark(args.bench_replay, args.replay_speed).run()
+    print(json.dumps(report, indent=2))
+
+
+def run_tuner(args):
+    """Sweep backend options against OLLAMA and write the generation profile"""
+    import json
+    from Init.OptionTuner import OptionTuner
+    from Setting.Configuration import OLLAMA_MODEL
+    profile = OptionTuner(OLLAMA_MODEL, args.tune_trace).run()
+    print(json.dumps({key: profile[key] for key in ("model", "options", "keep_alive", "measurements", "seconds")},
+                     indent=2))
+
+
+def run_pregen(args):
+    """Batch-generate NPC replies for a corpus; resumes from the checkpoint of an interrupted run"""
+    import json
+    from Init.DialoguePregen import DialoguePregen
+    report = DialoguePregen(args.pregen, args.pregen_out, args.pregen_concurrency, **trace_options(args)).run()
+    print(json.dumps(report, indent=2))
 
-# Initialize pygame
-pygame.init()
 
 # Run the game
 if __name__ == "__main__":
+    args = parse_args()
+    if args.server:
+        run_server(args)
+        sys.exit(0)
+    if args.tune:
+        run_tuner(args)
+        sys.exit(0)
+    if args.bench_replay:
+        run_replay_benchmark(args)
+        sys.exit(0)
+    if args.pregen:
+        run_pregen(args)
+        sys.exit(0)
+
     try:
         print("=" * 60)
         print("LLM RPG Game - AI Dialogue Version (qwen3:8b)")
@@ -25,18 +110,27 @@ if __name__ == "__main__":
         print("8. Press ESC to exit the conversation")
         print("=" * 60)
         
-        # Check for required dependencies
-        try:
-            import pygame
-            import requests
-            print("✓ Required dependencies are installed")
-        except ImportError as e:
-            print(f"⚠ Missing dependency: {e}")
-            print("Please run: pip install pygame requests")
+        # Check for required dependencies (without importing them; they load on first use)
+        missing = [name for name in ("pygame", "requests", "numpy") if importlib.util.find_spec(name) is None]
+        if missing:
+            print(f"⚠ Missing dependency: {', '.join(missing)}")
+            print("Please run: pip install pygame requests numpy")
             input("Press Enter to exit...")
             sys.exit(1)
+        print("✓ Required dependencies are installed")
+        
+        import pygame
+        from Init.Game import Game
+        
+        # Initialize pygame
+        pygame.init()
         
-        game = Game()
+        server_address = None
+        if args.connect:
+            host, _, port = args.connect.rpartition(":")
+            server_address = (host or SERVER_HOST, int(port))
+        game = Game(LAUNCH_TIME, server_address, llm_worker=args.llm_worker, load_file=args.load,
+                    **trace_options(args))
         game.run()
         
     except Exception as e:
@@ -46,6 +140,7 @@ if __name__ == "__main__":
         print("\nPlease ensure the following:")
         print("1. pygame is installed: pip install pygame")
         print("2. requests is installed: pip install requests")
-        print("3. OLLAMA service is running")
-        print("4. qwen3:8b model is downloaded: ollama pull qwen3:8b")
+        print("3. numpy is installed: pip install numpy")
+        print("4. OLLAMA service is running")
+        print("5. qwen3:8b model is downloaded: ollama pull qwen3:8b")
         input("Press Enter to exit...")
\ No newline at end of file